@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 
+from decouple import config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "feedback_app.db_router.ReplicaPinningMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -84,12 +87,96 @@ WSGI_APPLICATION = "feedback_api.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DB_PROFILE selects the database setup:
+#   sqlite       - SQLite tuned for concurrent use (default)
+#   sqlite-basic - plain SQLite without pragmas or persistent connections
+#   postgres     - PostgreSQL with persistent connections; DB_POOL=true uses
+#                  Django's connection pool instead (requires psycopg[pool])
+DB_PROFILE = config("DB_PROFILE", default="sqlite")
+
+if DB_PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": config("DB_NAME", default="feedback"),
+            "USER": config("DB_USER", default="postgres"),
+            "PASSWORD": config("DB_PASSWORD", default=""),
+            "HOST": config("DB_HOST", default="localhost"),
+            "PORT": config("DB_PORT", default="5432"),
+            "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
     }
-}
+    if config("DB_POOL", default=False, cast=bool):
+        # Pooled connections are returned to the pool, not kept per thread
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+            "max_size": config("DB_POOL_MAX_SIZE", default=20, cast=int),
+            "timeout": config("DB_POOL_TIMEOUT", default=10, cast=int),
+        }
+elif DB_PROFILE == "sqlite-basic":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": config("DB_NAME", default=str(BASE_DIR / "db.sqlite3")),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": config("DB_NAME", default=str(BASE_DIR / "db.sqlite3")),
+            "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # Seconds to wait for a lock before raising "database is locked"
+                "timeout": 20,
+                # Take the write lock when a transaction starts, so concurrent
+                # writers queue on the busy timeout instead of failing to upgrade
+                "transaction_mode": "IMMEDIATE",
+                # Applied on every new connection
+                "init_command": (
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=NORMAL;"
+                    "PRAGMA busy_timeout=20000;"
+                    "PRAGMA mmap_size=268435456;"
+                    "PRAGMA cache_size=-65536;"
+                    "PRAGMA temp_store=MEMORY"
+                ),
+            },
+        }
+    }
+
+
+# Optional read replica for analytics, dashboard and export reads (see
+# feedback_app/db_router.py). Locally, DB_REPLICA_NAME names a second SQLite
+# file kept in sync by `manage.py sync_replica`.
+if DB_PROFILE == "postgres":
+    if config("DB_REPLICA_HOST", default=""):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": config("DB_REPLICA_HOST"),
+            "PORT": config("DB_REPLICA_PORT", default=DATABASES["default"]["PORT"]),
+            "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        }
+elif config("DB_REPLICA_NAME", default=""):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": config("DB_REPLICA_NAME"),
+        "OPTIONS": dict(DATABASES["default"].get("OPTIONS", {})),
+    }
+    # Only readers use the replica; don't take write locks on it
+    DATABASES["replica"]["OPTIONS"].pop("transaction_mode", None)
+
+if "replica" in DATABASES:
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["feedback_app.db_router.ReplicaRouter"]
+
+# Seconds a user's reads stay on the primary after they write
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=10, cast=int)
 
 
 # Password validation
@@ -137,7 +224,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'feedback_app.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -170,11 +257,106 @@ CORS_ALLOW_CREDENTIALS = True
 ASGI_APPLICATION = "feedback_api.asgi.application"
 
 # Channel layers for WebSocket support
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}
+# CHANNEL_LAYER=memory only works with a single ASGI process; use redis (or
+# sqlite for a single host without Redis) when running several workers.
+CHANNEL_LAYER = config("CHANNEL_LAYER", default="memory")
+
+if CHANNEL_LAYER == "redis":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [config("REDIS_URL", default="redis://localhost:6379/1")],
+                "capacity": 1000,
+            },
+        },
+    }
+elif CHANNEL_LAYER == "sqlite":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "feedback_app.channel_layers.SQLiteChannelLayer",
+            "CONFIG": {
+                "path": config("CHANNEL_LAYER_PATH", default=str(BASE_DIR / "channels.sqlite3")),
+                "capacity": 1000,
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+
+# Cache shared by all workers when REDIS_URL is set; per-process memory otherwise.
+# Holds the per-user unread notification counters (see feedback_app/notifications.py).
+if config("REDIS_URL", default=""):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": config("REDIS_URL"),
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# New-response notifications to the same form owner can be batched into one
+# digest per window (seconds); 0 (the default) sends one notification per
+# response. With a window, pending responses are stored in the database and
+# only `manage.py flush_notifications` sends the digests: run it alongside
+# the web workers before turning this on.
+NOTIFICATION_COALESCE_WINDOW = config("NOTIFICATION_COALESCE_WINDOW", default=0.0, cast=float)
+
+# Read notifications older than this are moved to ArchivedNotification by
+# the archive_notifications management command (run it from cron).
+NOTIFICATION_RETENTION_DAYS = config("NOTIFICATION_RETENTION_DAYS", default=90, cast=int)
+
+# Seconds a token -> user lookup stays cached (see feedback_app/authentication.py)
+AUTH_TOKEN_CACHE_TIMEOUT = config("AUTH_TOKEN_CACHE_TIMEOUT", default=60, cast=int)
+
+# Seconds a compiled form navigation graph stays cached. Entries are keyed by
+# the form's schema_version, so edits never serve a stale graph (see feedback_app/navigation.py)
+NAVIGATION_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Word frequency of text answers (see feedback_app/text_analytics.py): each
+# question keeps a count-min sketch of TERM_SKETCH_WIDTH x TERM_SKETCH_DEPTH
+# counters and its TERM_TOP_K most frequent terms and phrases.
+TERM_SKETCH_WIDTH = 1024
+TERM_SKETCH_DEPTH = 4
+TERM_TOP_K = 50
+
+# Form analytics keep this many of the most recent answers per free-text
+# question, each cut to ANALYTICS_TEXT_MAX_LENGTH characters (see FormAnalytics)
+ANALYTICS_TEXT_SAMPLE_SIZE = 100
+ANALYTICS_TEXT_MAX_LENGTH = 500
+
+# Public submissions are rate limited per client IP and per form with token
+# buckets ("N/second|minute|hour|day", None for no limit) kept in this
+# process ('local') or in the shared cache ('cache'), see feedback_app/throttling.py.
+# Retries carrying the same Idempotency-Key header within
+# SUBMISSION_IDEMPOTENCY_TTL seconds, and identical submissions from the same
+# client within SUBMISSION_DEDUP_WINDOW seconds, return the stored response.
+SUBMISSION_THROTTLE_BACKEND = config("SUBMISSION_THROTTLE_BACKEND", default="local")
+# Reverse proxies in front of the app that append to X-Forwarded-For. The
+# client address for the limits above is the entry the outermost one added;
+# 0 uses REMOTE_ADDR, as anything else in the header can be spoofed.
+SUBMISSION_NUM_PROXIES = config("SUBMISSION_NUM_PROXIES", default=0, cast=int)
+SUBMISSION_RATE_PER_IP = config("SUBMISSION_RATE_PER_IP", default="60/minute")
+SUBMISSION_RATE_PER_FORM = config("SUBMISSION_RATE_PER_FORM", default="1200/minute")
+SUBMISSION_IDEMPOTENCY_TTL = 24 * 60 * 60
+SUBMISSION_DEDUP_WINDOW = 60
+
+# Public submissions: 'direct' writes each one in its own transaction;
+# 'buffered' appends them to a durable log under SUBMISSION_INGEST_DIR that
+# `manage.py flush_submissions` writes out in batches (see feedback_app/ingest.py).
+SUBMISSION_INGEST_MODE = config("SUBMISSION_INGEST_MODE", default="direct")
+SUBMISSION_INGEST_DIR = BASE_DIR / 'ingest'
+SUBMISSION_INGEST_BATCH_SIZE = 500
+SUBMISSION_INGEST_ROTATE_BYTES = 64 * 1024 * 1024
 
 # Celery configuration
 CELERY_BROKER_URL = "redis://localhost:6379/0"
@@ -191,5 +373,14 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Static files
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Rendered export cache (see feedback_app/export_cache.py)
+EXPORT_CACHE_ENABLED = True
+EXPORT_CACHE_DIR = BASE_DIR / 'export_cache'
+EXPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# ETag / Last-Modified validators on the dashboard's read endpoints, so
+# polls of unchanged data get a 304 (see feedback_app/http_cache.py)
+HTTP_CACHE_ENABLED = True
+
 AUTH_USER_MODEL = "feedback_app.CustomUser"
 
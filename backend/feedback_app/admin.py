@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import FeedbackForm, Question, FeedbackResponse, Answer, FormAnalytics, Notification, CustomUser
+from . import search
+from .models import FeedbackForm, Question, FeedbackResponse, Answer, FormAnalytics, Notification, CustomUser, ArchivedNotification, SectionFunnel, FormTemplate, FormVersion
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -51,7 +52,13 @@ class FeedbackResponseAdmin(admin.ModelAdmin):
 class AnswerAdmin(admin.ModelAdmin):
     list_display = ['response', 'question', 'answer_text']
     list_filter = ['question__question_type']
-    search_fields = ['answer_text', 'question__text', 'response__form__title']
+    search_fields = ['answer_text']
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index instead of a LIKE scan over every answer
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search.matching_answer_ids(search_term)), False
 
 
 @admin.register(FormAnalytics)
@@ -64,6 +71,33 @@ class FormAnalyticsAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(FormTemplate)
+class FormTemplateAdmin(admin.ModelAdmin):
+    list_display = ['title', 'form_type', 'created_by', 'is_shared', 'question_count', 'created_at']
+    list_filter = ['form_type', 'is_shared']
+    search_fields = ['title', 'created_by__username']
+    readonly_fields = ['source_form', 'schema', 'section_count', 'question_count', 'created_at']
+
+
+@admin.register(FormVersion)
+class FormVersionAdmin(admin.ModelAdmin):
+    list_display = ['form', 'number', 'created_at']
+    search_fields = ['form__title']
+    readonly_fields = ['form', 'number', 'schema', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SectionFunnel)
+class SectionFunnelAdmin(admin.ModelAdmin):
+    list_display = ['section', 'form', 'reached', 'completed', 'exited']
+    readonly_fields = ['form', 'section', 'reached', 'completed', 'exited']
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ['user', 'notification_type', 'title', 'is_read', 'created_at']
@@ -71,3 +105,12 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ['title', 'message', 'user__username']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
+
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ['user', 'notification_type', 'title', 'created_at', 'archived_at']
+    list_filter = ['notification_type', 'created_at']
+    search_fields = ['title', 'message', 'user__username']
+    readonly_fields = ['created_at', 'archived_at']
+    date_hierarchy = 'created_at'
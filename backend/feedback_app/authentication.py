@@ -0,0 +1,64 @@
+"""
+Token authentication backed by a short-lived token -> user cache.
+
+Both DRF requests (CachedTokenAuthentication) and WebSocket handshakes
+(TokenAuthMiddleware) resolve tokens through get_token_user(), so a
+dashboard polling several endpoints costs no authtoken/user queries once
+its token is cached. Entries are dropped when the token is deleted (logout,
+user delete) and when the user is saved (approval changes), see signals.py;
+AUTH_TOKEN_CACHE_TIMEOUT bounds staleness for changes made with update().
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def _token_cache_key(key):
+    # Token keys are credentials; never use them verbatim as cache keys
+    return "auth:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_token_user(key):
+    """Return (user, token) for a token key, or None if the token does not exist"""
+    cache_key = _token_cache_key(key)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        token = Token.objects.select_related('user').get(key=key)
+    except Token.DoesNotExist:
+        return None
+    cached = (token.user, token)
+    cache.set(cache_key, cached, getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60))
+    return cached
+
+
+def invalidate_token(key):
+    cache.delete(_token_cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    """Drop cached entries for every token of a user"""
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    cache.delete_many([_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that resolves tokens through the token cache"""
+
+    def authenticate_credentials(self, key):
+        cached = get_token_user(key)
+        if cached is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user, token = cached
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (user, token)
@@ -0,0 +1,257 @@
+"""
+SQLite channel layer for single-host deployments without Redis.
+
+Messages and group memberships live in two tables of one SQLite file
+shared by every ASGI worker on the host. Receivers poll with a backoff
+between poll_interval and max_poll_interval. Process-specific channels
+(the "!" names from new_channel) are claimed receive_batch_size messages
+at a time into a per-process buffer; any other channel is claimed one
+message per receive(), since any worker may read it. A receive cancelled
+while its claim runs puts the claimed rows back. Capacity, including
+per-channel channel_capacity, applies to send() and group_send() alike;
+group messages to a full channel are dropped.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """
+    Cross-process channel layer backed by a local SQLite file.
+
+    Every ASGI worker on the host opens the same database file, so a
+    group_send from one process reaches consumers connected to another
+    without running Redis. Intended for single-host deployments and tests;
+    use channels_redis when workers span machines.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(self, path="channels.sqlite3", expiry=60, group_expiry=86400,
+                 capacity=100, channel_capacity=None, poll_interval=0.01, max_poll_interval=0.1, receive_batch_size=100):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.receive_batch_size = receive_batch_size
+        self.client_prefix = uuid.uuid4().hex
+        # All database work runs on one thread with one connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-channel-layer")
+        self._local = threading.local()
+        self._last_cleanup = 0.0
+        self._buffers = {}
+
+    # ------------------------
+    # Database helpers
+    # ------------------------
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            # Lets group fan-out apply channel_capacity per member inside the INSERT ... SELECT
+            conn.create_function("channel_capacity", 1, self.get_capacity, deterministic=True)
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS channel_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    expires REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS channel_messages_channel ON channel_messages (channel, id);
+                CREATE TABLE IF NOT EXISTS channel_groups (
+                    grp TEXT NOT NULL,
+                    channel TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    PRIMARY KEY (grp, channel)
+                );
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _cleanup(self, conn, now):
+        # Expired messages and group memberships are purged at most once a second
+        if now - self._last_cleanup < 1:
+            return
+        self._last_cleanup = now
+        conn.execute("DELETE FROM channel_messages WHERE expires < ?", (now,))
+        conn.execute("DELETE FROM channel_groups WHERE expires < ?", (now,))
+
+    # ------------------------
+    # Channel layer API
+    # ------------------------
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.valid_channel_name(channel)
+        await self._run(self._send, channel, json.dumps(message), self.get_capacity(channel))
+
+    def _send(self, channel, body, capacity):
+        conn = self._connection()
+        now = time.time()
+        self._cleanup(conn, now)
+        with conn:
+            queued = conn.execute(
+                "SELECT COUNT(*) FROM channel_messages WHERE channel = ? AND expires >= ?", (channel, now)
+            ).fetchone()[0]
+            if queued >= capacity:
+                raise ChannelFull(channel)
+            conn.execute(
+                "INSERT INTO channel_messages (channel, body, expires) VALUES (?, ?, ?)",
+                (channel, body, now + self.expiry),
+            )
+
+    async def receive(self, channel):
+        self.valid_channel_name(channel)
+        buffered = self._buffers.get(channel)
+        delay = self.poll_interval
+        while not buffered:
+            buffered = await self._claim(channel)
+            if not buffered:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_poll_interval)
+        body = buffered.pop(0)
+        if buffered:
+            self._buffers[channel] = buffered
+        else:
+            self._buffers.pop(channel, None)
+        return json.loads(body)
+
+    async def _claim(self, channel):
+        # Only this process reads its process-specific channels, so those are
+        # claimed in batches and buffered here; a normal channel may be read by
+        # any worker, and a message claimed into one worker's buffer would die
+        # with it, so those are claimed one at a time
+        limit = self.receive_batch_size if "!" in channel else 1
+        claim = asyncio.get_running_loop().run_in_executor(self._executor, self._pop_batch, channel, limit)
+        try:
+            rows = await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            # The DELETE may already have run: put whatever it took back
+            claim.add_done_callback(self._requeue_claimed)
+            raise
+        return [body for _, _, body, _ in rows]
+
+    def _pop_batch(self, channel, limit):
+        # Claim up to `limit` queued messages of the channel in one statement
+        conn = self._connection()
+        rows = conn.execute(
+            """
+            DELETE FROM channel_messages WHERE id IN (
+                SELECT id FROM channel_messages WHERE channel = ? AND expires >= ? ORDER BY id LIMIT ?
+            ) RETURNING id, channel, body, expires
+            """,
+            (channel, time.time(), limit),
+        ).fetchall()
+        # RETURNING gives no ordering guarantee
+        return sorted(rows)
+
+    def _requeue_claimed(self, claim):
+        if claim.cancelled() or claim.exception() is not None or not claim.result():
+            return
+        try:
+            self._executor.submit(self._requeue, claim.result())
+        except RuntimeError:
+            # The layer has been closed
+            pass
+
+    def _requeue(self, rows):
+        # Reinserted under their old ids, so they keep their place in the channel
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO channel_messages (id, channel, body, expires) VALUES (?, ?, ?, ?)", rows
+            )
+
+    async def new_channel(self, prefix="specific"):
+        return f"{prefix}.{self.client_prefix}!{uuid.uuid4().hex}"
+
+    async def flush(self):
+        self._buffers.clear()
+        await self._run(self._flush)
+
+    def _flush(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM channel_messages")
+            conn.execute("DELETE FROM channel_groups")
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+    # ------------------------
+    # Groups extension
+    # ------------------------
+    async def group_add(self, group, channel):
+        self.valid_group_name(group)
+        self.valid_channel_name(channel)
+        await self._run(self._group_add, group, channel)
+
+    def _group_add(self, group, channel):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO channel_groups (grp, channel, expires) VALUES (?, ?, ?)",
+            (group, channel, time.time() + self.group_expiry),
+        )
+
+    async def group_discard(self, group, channel):
+        self.valid_group_name(group)
+        self.valid_channel_name(channel)
+        await self._run(self._group_discard, group, channel)
+
+    def _group_discard(self, group, channel):
+        conn = self._connection()
+        conn.execute("DELETE FROM channel_groups WHERE grp = ? AND channel = ?", (group, channel))
+
+    async def group_send(self, group, message):
+        await self.group_send_many([(group, message)])
+
+    async def group_send_many(self, group_messages):
+        """
+        Fan out several (group, message) pairs in a single transaction.
+
+        Each fan-out is one INSERT ... SELECT over the group's members, so the
+        cost does not grow with a round trip per recipient. Members already at
+        their capacity (get_capacity, as for send) are skipped, matching how
+        the other layers drop group messages for full channels.
+        """
+        payload = []
+        for group, message in group_messages:
+            assert isinstance(message, dict), "message is not a dict"
+            self.valid_group_name(group)
+            payload.append((group, json.dumps(message)))
+        if payload:
+            await self._run(self._group_send_many, payload)
+
+    def _group_send_many(self, payload):
+        conn = self._connection()
+        now = time.time()
+        self._cleanup(conn, now)
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO channel_messages (channel, body, expires)
+                SELECT g.channel, ?, ? FROM channel_groups g
+                WHERE g.grp = ? AND g.expires >= ?
+                AND (SELECT COUNT(*) FROM channel_messages m WHERE m.channel = g.channel AND m.expires >= ?)
+                    < channel_capacity(g.channel)
+                """,
+                [(body, now + self.expiry, group, now, now) for group, body in payload],
+            )
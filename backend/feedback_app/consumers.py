@@ -2,7 +2,6 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from .models import Notification
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -65,11 +64,18 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'data': event.get('data', {})
         }))
         
-        # Update unread count
-        unread_count = await self.get_unread_count()
+        # The sender carries the updated unread count in the event
+        if 'unread_count' in event:
+            await self.send(text_data=json.dumps({
+                'type': 'notification_count',
+                'unread_count': event['unread_count']
+            }))
+    
+    async def notification_count(self, event):
+        """Send an updated unread count to WebSocket"""
         await self.send(text_data=json.dumps({
             'type': 'notification_count',
-            'unread_count': unread_count
+            'unread_count': event['unread_count']
         }))
     
     async def analytics_update(self, event):
@@ -91,32 +97,21 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     
     @database_sync_to_async
     def get_unread_count(self):
-        """Get count of unread notifications"""
-        return Notification.objects.filter(
-            user=self.user, 
-            is_read=False
-        ).count()
+        """Get count of unread notifications (cached; see notifications.py)"""
+        from .notifications import get_unread_count
+        return get_unread_count(self.user.id)
     
     @database_sync_to_async
     def mark_notification_as_read(self, notification_id):
         """Mark a specific notification as read"""
-        try:
-            notification = Notification.objects.get(
-                id=notification_id, 
-                user=self.user
-            )
-            notification.is_read = True
-            notification.save()
-        except Notification.DoesNotExist:
-            pass
+        from .notifications import mark_as_read
+        mark_as_read(self.user.id, notification_id)
     
     @database_sync_to_async
     def mark_all_notifications_as_read(self):
         """Mark all notifications as read"""
-        Notification.objects.filter(
-            user=self.user, 
-            is_read=False
-        ).update(is_read=True)
+        from .notifications import mark_all_as_read
+        mark_all_as_read(self.user.id)
 
 
 class FormAnalyticsConsumer(AsyncWebsocketConsumer):
@@ -156,20 +151,41 @@ class FormAnalyticsConsumer(AsyncWebsocketConsumer):
 
 
 # Utility function to send notifications to groups
-def send_notification_to_group(group_name, notification_type, title, message, data=None):
+def build_notification_event(notification_type, title, message, data=None, unread_count=None):
+    """Channel layer event handled by NotificationConsumer.notification_message"""
+    event = {
+        'type': 'notification_message',
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'data': data or {}
+    }
+    if unread_count is not None:
+        event['unread_count'] = unread_count
+    return event
+
+
+def send_notification_to_group(group_name, notification_type, title, message, data=None, unread_count=None):
     """Send notification to a specific group"""
     from channels.layers import get_channel_layer
     from asgiref.sync import async_to_sync
     
+    event = build_notification_event(notification_type, title, message, data, unread_count)
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(group_name, event)
+
+
+def send_unread_count(group_name, unread_count):
+    """Push an updated unread notification count to a specific group"""
+    from channels.layers import get_channel_layer
+    from asgiref.sync import async_to_sync
+    
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
         group_name,
         {
-            'type': 'notification_message',
-            'notification_type': notification_type,
-            'title': title,
-            'message': message,
-            'data': data or {}
+            'type': 'notification_count',
+            'unread_count': unread_count
         }
     )
 
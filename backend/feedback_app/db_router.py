@@ -0,0 +1,126 @@
+"""
+Read replica routing.
+
+Views decorated with ``read_from_replica`` (analytics, dashboard and
+exports) send their reads to the ``replica`` database alias when one is
+configured; everything else, and every write, uses ``default``. A user who
+has just written something is pinned to ``default`` for
+REPLICA_PIN_SECONDS so they always read their own writes, whatever the
+replica lag.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+
+REPLICA_ALIAS = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+def pin_user(user_id):
+    """Route the user's reads to the primary until the replica has caught up"""
+    cache.set(_pin_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def read_from_replica(view_func):
+    """Serve the reads of a view (function or viewset method) from the replica"""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        # Viewset methods get (self, request, ...), function views (request, ...)
+        request = args[1] if len(args) > 1 and hasattr(args[1], 'user') else args[0]
+        user = getattr(request, 'user', None)
+        if not replica_configured() or (user is not None and user.is_authenticated and is_pinned(user.pk)):
+            return view_func(*args, **kwargs)
+
+        token = _use_replica.set(True)
+        try:
+            return view_func(*args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside a replica-routed view, for reads that
+    decide a write (get_or_create) and must not see a lagging copy
+    """
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and is never migrated directly
+        return db == 'default'
+
+
+class ReplicaPinningMiddleware:
+    """Pin users to the primary after any request that may have written data"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Stay async for async views such as the public submit endpoint
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._may_have_written(request):
+            self._pin_request_user(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._may_have_written(request):
+            # Resolving request.user may hit the session store
+            await sync_to_async(self._pin_request_user)(request)
+        return response
+
+    def _may_have_written(self, request):
+        return request.method not in SAFE_METHODS and replica_configured()
+
+    def _pin_request_user(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_user(user.pk)
@@ -0,0 +1,144 @@
+"""
+On-disk cache of rendered exports.
+
+Artifacts are addressed by a hash of (scope, export type, data versions of
+the forms involved). A form's data version is bumped on every response and
+schema change, so an entry can never go stale: a new version simply
+produces a new key. Hits are served straight from disk with a FileResponse
+and the directory is kept under EXPORT_CACHE_MAX_BYTES by evicting the
+least recently used artifacts.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+
+_eviction_lock = threading.Lock()
+
+
+def _cache_dir():
+    path = Path(getattr(settings, 'EXPORT_CACHE_DIR', Path(settings.BASE_DIR) / 'export_cache'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _max_bytes():
+    return getattr(settings, 'EXPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+
+def make_key(scope, export_type, versions):
+    """Content address for an export: scope, export type and (form id, data version) pairs"""
+    digest = hashlib.sha256()
+    digest.update(f"{scope}|{export_type}".encode())
+    for form_id, data_version in versions:
+        digest.update(f"|{form_id}:{data_version}".encode())
+    return digest.hexdigest()
+
+
+def lookup(key):
+    """Return (artifact path, metadata) for a cached export, or None on a miss"""
+    directory = _cache_dir()
+    data_path = directory / f"{key}.bin"
+    meta_path = directory / f"{key}.json"
+    try:
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        # Touch the artifact so LRU eviction sees it as recently used
+        os.utime(data_path)
+    except (OSError, ValueError):
+        return None
+    return data_path, meta
+
+
+def store(key, response):
+    """Persist a rendered export response under ``key`` and evict down to the size limit"""
+    directory = _cache_dir()
+    meta = {
+        'content_type': response.get('Content-Type', 'application/octet-stream'),
+        'content_disposition': response.get('Content-Disposition', ''),
+    }
+    # Write to temp files and rename so readers never see a partial artifact
+    for suffix, payload in (('.bin', response.content), ('.json', json.dumps(meta).encode())):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(payload)
+        os.replace(tmp_path, directory / f"{key}{suffix}")
+    evict(_max_bytes())
+
+
+def evict(max_bytes):
+    """Delete least recently used artifacts until the cache fits in ``max_bytes``"""
+    with _eviction_lock:
+        directory = _cache_dir()
+        entries = []
+        total = 0
+        for path in directory.glob('*.bin'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            for stale in (path, path.with_suffix('.json')):
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+            total -= size
+
+
+def file_response(path, meta):
+    """Serve a cached artifact; FileResponse lets the server use sendfile where available"""
+    response = FileResponse(open(path, 'rb'), content_type=meta['content_type'])
+    if meta.get('content_disposition'):
+        response['Content-Disposition'] = meta['content_disposition']
+    response['X-Export-Cache'] = 'HIT'
+    return response
+
+
+def cached_export(export_type):
+    """
+    Cache the output of an export action.
+
+    Detail actions are keyed on the form being exported; list actions on
+    every form returned by the viewset's ``get_export_forms()``.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(viewset, request, *args, **kwargs):
+            if not getattr(settings, 'EXPORT_CACHE_ENABLED', True):
+                return view_func(viewset, request, *args, **kwargs)
+
+            if kwargs.get('pk') is not None:
+                form = viewset.get_object()
+                scope = f"form:{form.id}"
+                versions = [(form.id, form.data_version)]
+            else:
+                scope = f"user:{request.user.id}"
+                versions = viewset.get_export_forms().order_by('id').values_list('id', 'data_version')
+
+            key = make_key(scope, export_type, versions)
+            cached = lookup(key)
+            if cached:
+                return file_response(*cached)
+
+            response = view_func(viewset, request, *args, **kwargs)
+            # Only cache successful, fully rendered exports (errors come back as DRF Responses)
+            if type(response) is HttpResponse and response.status_code == 200:
+                store(key, response)
+                response['X-Export-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
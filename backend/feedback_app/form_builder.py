@@ -0,0 +1,538 @@
+"""
+Form builder writes.
+
+The builder submits a form's whole section/question/option tree on every
+save. save_form_tree diffs that tree against the stored one in memory and
+applies the difference with bulk_create, bulk_update and one delete per
+model, so the number of queries per save does not grow with the form.
+
+apply_operations is the incremental alternative: a list of small
+add/update/move/delete operations addressed by frontend_id, checked
+against the form's schema_version so two editors cannot silently
+overwrite each other.
+
+Per-row post_save/post_delete signals are silenced during both kinds of
+write; the form's schema (and data) version is bumped once instead.
+"""
+from contextvars import ContextVar
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import FeedbackForm, Question, QuestionOption, Section
+
+
+SECTION_FIELDS = ['title', 'description', 'order', 'next_section_on_submit']
+QUESTION_FIELDS = ['section', 'text', 'question_type', 'is_required', 'order', 'options', 'enable_option_navigation']
+OPTION_FIELDS = ['text', 'next_section']
+
+_bulk_write = ContextVar('form_bulk_write', default=False)
+
+
+def in_bulk_write():
+    """True while the builder is writing; schema signals skip their per-row version bumps"""
+    return _bulk_write.get()
+
+
+def _assign(obj, values):
+    """Set attributes on obj, returning True if any of them changed"""
+    changed = False
+    for field, value in values.items():
+        if getattr(obj, field) != value:
+            setattr(obj, field, value)
+            changed = True
+    return changed
+
+
+def save_form_tree(form, sections_data, is_new=False):
+    """
+    Write the submitted sections (with nested questions and option links)
+    of ``form``.
+
+    Sections and questions are matched to stored rows by frontend_id, then
+    by database id; option links by id within their question. Unmatched
+    submitted items are created; stored sections and questions with a
+    frontend_id that are no longer submitted are deleted, as are option
+    links dropped from a question. Navigation targets are frontend ids.
+    """
+    token = _bulk_write.set(True)
+    try:
+        with transaction.atomic(savepoint=False):
+            _write_tree(form, sections_data, is_new)
+            if not is_new:
+                FeedbackForm.bump_schema_version(form.pk)
+    finally:
+        _bulk_write.reset(token)
+
+
+def serialize_tree(form, include_ids=False):
+    """
+    The section/question/option tree of ``form`` in the shape save_form_tree
+    takes, with navigation as frontend ids. Rows without a frontend_id get a
+    stable one derived from their id so links to them survive the round trip.
+    ``include_ids`` adds the database ids of sections and questions.
+    """
+    sections = list(Section.objects.filter(form=form).order_by('order', 'id'))
+    questions = list(Question.objects.filter(section__form=form).order_by('order', 'id'))
+    options = list(QuestionOption.objects.filter(question__section__form=form).order_by('id'))
+
+    section_refs = {section.id: section.frontend_id or f"section-{section.id}" for section in sections}
+    links_by_question = {}
+    for option in options:
+        links_by_question.setdefault(option.question_id, []).append({
+            'text': option.text,
+            'next_section': section_refs.get(option.next_section_id),
+        })
+    questions_by_section = {}
+    for question in questions:
+        questions_by_section.setdefault(question.section_id, []).append({
+            **({'id': question.id} if include_ids else {}),
+            'frontend_id': question.frontend_id or f"question-{question.id}",
+            'text': question.text,
+            'question_type': question.question_type,
+            'is_required': question.is_required,
+            'order': question.order,
+            'options': question.options,
+            'enable_option_navigation': question.enable_option_navigation,
+            'option_links': links_by_question.get(question.id, []),
+        })
+
+    return [
+        {
+            **({'id': section.id} if include_ids else {}),
+            'frontend_id': section_refs[section.id],
+            'title': section.title,
+            'description': section.description,
+            'order': section.order,
+            'next_section_on_submit': section_refs.get(section.next_section_on_submit_id),
+            'questions': questions_by_section.get(section.id, []),
+        }
+        for section in sections
+    ]
+
+
+def _write_tree(form, sections_data, is_new):
+    if is_new:
+        stored_sections, stored_questions, stored_options = [], [], []
+    else:
+        stored_sections = list(form.sections.all())
+        stored_questions = list(Question.objects.filter(section__form=form))
+        stored_options = list(QuestionOption.objects.filter(question__section__form=form))
+
+    # ---- Sections ----
+    sections_by_frontend = {s.frontend_id: s for s in stored_sections if s.frontend_id}
+    sections_by_id = {str(s.id): s for s in stored_sections}
+    section_frontend_id_mapping = {}
+    kept_section_ids = set()
+    new_sections = []
+    sections_to_update = {}
+    section_plan = []
+
+    for section_data in sections_data:
+        frontend_id = section_data.get('frontend_id')
+        section = sections_by_frontend.get(frontend_id) if frontend_id else None
+        if section is None and section_data.get('id') is not None:
+            section = sections_by_id.get(str(section_data['id']))
+
+        if section is None or section.pk in kept_section_ids:
+            section = Section(
+                form=form,
+                frontend_id=frontend_id,
+                title=section_data.get('title', ''),
+                description=section_data.get('description', ''),
+                order=section_data.get('order', 0),
+            )
+            new_sections.append(section)
+        else:
+            kept_section_ids.add(section.pk)
+            if _assign(section, {
+                'title': section_data.get('title', section.title),
+                'description': section_data.get('description', section.description),
+                'order': section_data.get('order', section.order),
+            }):
+                sections_to_update[section.pk] = section
+
+        if frontend_id:
+            section_frontend_id_mapping[frontend_id] = section
+        section_plan.append((section, section_data))
+
+    Section.objects.bulk_create(new_sections)
+
+    # Navigation can point at sections created above, so it is resolved once all have ids
+    for section, section_data in section_plan:
+        target = section_data.get('next_section_on_submit')
+        if isinstance(target, Section):
+            # The serializer validates this field as a primary key
+            target = target if target.form_id == form.pk else None
+        else:
+            target = section_frontend_id_mapping.get(target or '')
+        if target is not None and section.next_section_on_submit_id != target.pk:
+            section.next_section_on_submit = target
+            sections_to_update[section.pk] = section
+
+    if sections_to_update:
+        Section.objects.bulk_update(list(sections_to_update.values()), SECTION_FIELDS)
+
+    # ---- Questions ----
+    questions_by_frontend = {q.frontend_id: q for q in stored_questions if q.frontend_id}
+    questions_by_id = {str(q.id): q for q in stored_questions}
+    kept_question_ids = set()
+    new_questions = []
+    questions_to_update = []
+    option_plan = []
+
+    for section, section_data in section_plan:
+        for question_data in section_data.get('questions', []):
+            frontend_id = question_data.get('frontend_id')
+            question = questions_by_frontend.get(frontend_id) if frontend_id else None
+            if question is None and question_data.get('id') is not None:
+                question = questions_by_id.get(str(question_data['id']))
+
+            if question is None or question.pk in kept_question_ids:
+                question = Question(
+                    section=section,
+                    frontend_id=frontend_id,
+                    text=question_data.get('text', ''),
+                    question_type=question_data.get('question_type', 'text'),
+                    is_required=question_data.get('is_required', False),
+                    order=question_data.get('order', 0),
+                    options=question_data.get('options', []),
+                    enable_option_navigation=question_data.get('enable_option_navigation', False),
+                )
+                new_questions.append(question)
+            else:
+                kept_question_ids.add(question.pk)
+                # Compare ids: reading question.section would load each stored section
+                moved = question.section_id != section.pk
+                if moved:
+                    question.section = section
+                if _assign(question, {
+                    'text': question_data.get('text', question.text),
+                    'question_type': question_data.get('question_type', question.question_type),
+                    'is_required': question_data.get('is_required', question.is_required),
+                    'order': question_data.get('order', question.order),
+                    'options': question_data.get('options', question.options),
+                    'enable_option_navigation': question_data.get(
+                        'enable_option_navigation', question.enable_option_navigation
+                    ),
+                }) or moved:
+                    questions_to_update.append(question)
+
+            # A new form only stores option links for questions with navigation enabled
+            if not is_new or question.enable_option_navigation:
+                option_plan.append((question, question_data.get('option_links', [])))
+
+    Question.objects.bulk_create(new_questions)
+    if questions_to_update:
+        Question.objects.bulk_update(questions_to_update, QUESTION_FIELDS)
+
+    # ---- Option links ----
+    options_by_question = {}
+    for option in stored_options:
+        options_by_question.setdefault(option.question_id, {})[str(option.id)] = option
+    kept_option_ids = set()
+    new_options = []
+    options_to_update = []
+
+    for question, option_links_data in option_plan:
+        existing = options_by_question.get(question.pk, {})
+        for option_link_data in option_links_data:
+            next_section_frontend_id = option_link_data.get('next_section')
+            next_section = section_frontend_id_mapping.get(next_section_frontend_id) if next_section_frontend_id else None
+
+            option = existing.get(str(option_link_data.get('id')))
+            if option is None or option.pk in kept_option_ids:
+                new_options.append(QuestionOption(
+                    question=question,
+                    text=option_link_data.get('text', ''),
+                    next_section=next_section,
+                ))
+                continue
+
+            kept_option_ids.add(option.pk)
+            changed = _assign(option, {'text': option_link_data.get('text', option.text)})
+            if option.next_section_id != (next_section.pk if next_section else None):
+                option.next_section = next_section
+                changed = True
+            if changed:
+                options_to_update.append(option)
+
+    QuestionOption.objects.bulk_create(new_options)
+    if options_to_update:
+        QuestionOption.objects.bulk_update(options_to_update, OPTION_FIELDS)
+
+    # ---- Removals ----
+    # Option links dropped from a question that is still on the form
+    synced_question_ids = {question.pk for question, _ in option_plan}
+    option_ids_to_delete = [
+        option.pk for option in stored_options
+        if option.question_id in synced_question_ids and option.pk not in kept_option_ids
+    ]
+    if option_ids_to_delete:
+        QuestionOption.objects.filter(pk__in=option_ids_to_delete).delete()
+
+    question_ids_to_delete = [
+        q.pk for q in stored_questions if q.frontend_id and q.pk not in kept_question_ids
+    ]
+    if question_ids_to_delete:
+        Question.objects.filter(pk__in=question_ids_to_delete).delete()
+
+    section_ids_to_delete = [
+        s.pk for s in stored_sections if s.frontend_id and s.pk not in kept_section_ids
+    ]
+    if section_ids_to_delete:
+        Section.objects.filter(pk__in=section_ids_to_delete).delete()
+
+
+# ------------------------
+# Schema patches
+# ------------------------
+# An operation is a dict:
+#   {"op": "add", "type": "question", "parent": "<section frontend_id>", "value": {...}}
+#   {"op": "update", "type": "section", "frontend_id": "...", "value": {...}}
+#   {"op": "move", "type": "question", "frontend_id": "...", "parent": "...", "order": 0}
+#   {"op": "delete", "type": "option_link", "id": 12}
+# Sections and questions are addressed by frontend_id, option links (which
+# have none) by id; an added option link's parent is its question's
+# frontend_id. Section references in values (next_section_on_submit,
+# next_section) are frontend ids too.
+
+PATCH_FIELDS = {
+    'section': ['title', 'description', 'next_section_on_submit'],
+    'question': ['text', 'question_type', 'is_required', 'options', 'enable_option_navigation'],
+    'option_link': ['text', 'next_section'],
+}
+SECTION_REFERENCES = {'next_section_on_submit', 'next_section'}
+
+
+class SchemaConflict(Exception):
+    """The form changed since the client read it"""
+
+    def __init__(self, current_version):
+        super().__init__(f"Form schema is at version {current_version}")
+        self.current_version = current_version
+
+
+class InvalidOperation(Exception):
+    """An operation cannot be applied; nothing of the patch is written"""
+
+    def __init__(self, index, message):
+        super().__init__(message)
+        self.index = index
+
+
+def apply_operations(form, schema_version, operations):
+    """
+    Apply schema patch operations to ``form`` in one transaction.
+
+    ``schema_version`` is the version the client edited; if the form has
+    moved on, SchemaConflict is raised and nothing is written. Returns the
+    new schema version and one result per operation.
+    """
+    token = _bulk_write.set(True)
+    try:
+        with transaction.atomic():
+            # Compare-and-swap the version first so concurrent patches serialize on the form row
+            swapped = FeedbackForm.objects.filter(pk=form.pk, schema_version=schema_version).update(
+                schema_version=F('schema_version') + 1,
+                data_version=F('data_version') + 1,
+                data_updated_at=timezone.now(),
+            )
+            if not swapped:
+                current = FeedbackForm.objects.filter(pk=form.pk).values_list('schema_version', flat=True).first()
+                raise SchemaConflict(current)
+
+            patcher = _SchemaPatcher(form)
+            results = []
+            for index, operation in enumerate(operations):
+                try:
+                    results.append(patcher.apply(operation))
+                except KeyError as e:
+                    raise InvalidOperation(index, f"Missing {e}")
+                except ValidationError as e:
+                    raise InvalidOperation(index, '; '.join(e.messages))
+                except (TypeError, ValueError, AttributeError) as e:
+                    raise InvalidOperation(index, f"Invalid operation: {e}")
+                except InvalidOperation as e:
+                    raise InvalidOperation(index, str(e))
+    finally:
+        _bulk_write.reset(token)
+    return schema_version + 1, results
+
+
+class _SchemaPatcher:
+    """Applies operations one at a time, loading only the rows they address"""
+
+    def __init__(self, form):
+        self.form = form
+        self.sections = {}
+        self.questions = {}
+
+    def apply(self, operation):
+        op = operation['op']
+        kind = operation['type']
+        if kind not in PATCH_FIELDS:
+            raise InvalidOperation(None, f"Unknown type '{kind}'")
+        handler = getattr(self, f"_{op}_{kind}", None) if op in ('add', 'update', 'move', 'delete') else None
+        if handler is None:
+            raise InvalidOperation(None, f"Unsupported operation '{op}' on {kind}")
+        return handler(operation)
+
+    # ---- lookups ----
+
+    def section(self, frontend_id):
+        if frontend_id not in self.sections:
+            try:
+                self.sections[frontend_id] = Section.objects.get(form=self.form, frontend_id=frontend_id)
+            except Section.DoesNotExist:
+                raise InvalidOperation(None, f"No section '{frontend_id}'")
+        return self.sections[frontend_id]
+
+    def question(self, frontend_id):
+        if frontend_id not in self.questions:
+            try:
+                self.questions[frontend_id] = Question.objects.get(section__form=self.form, frontend_id=frontend_id)
+            except Question.DoesNotExist:
+                raise InvalidOperation(None, f"No question '{frontend_id}'")
+        return self.questions[frontend_id]
+
+    def option_link(self, option_id):
+        try:
+            return QuestionOption.objects.get(question__section__form=self.form, pk=option_id)
+        except (QuestionOption.DoesNotExist, ValueError):
+            raise InvalidOperation(None, f"No option link {option_id}")
+
+    def _values(self, kind, operation, placement=()):
+        """The allowed fields of an operation's value, with section references resolved"""
+        value = operation.get('value') or {}
+        unknown = set(value) - set(PATCH_FIELDS[kind]) - set(placement)
+        if unknown:
+            raise InvalidOperation(None, f"Unknown fields for {kind}: {', '.join(sorted(unknown))}")
+        values = {field: value[field] for field in PATCH_FIELDS[kind] if field in value}
+        for field in SECTION_REFERENCES & set(values):
+            values[field] = self.section(values[field]) if values[field] else None
+        return values
+
+    def _save(self, obj, fields=None):
+        # FKs are resolved above and lengths/choices are checked here without extra queries
+        obj.clean_fields(exclude=['form', 'section', 'question', 'next_section_on_submit', 'next_section'])
+        obj.save(update_fields=fields)
+
+    def _make_room(self, queryset, order):
+        """Shift siblings at or after ``order`` down one place and return the insert position"""
+        if order is None:
+            last = queryset.aggregate(last=Max('order'))['last']
+            return 0 if last is None else last + 1
+        queryset.filter(order__gte=order).update(order=F('order') + 1)
+        return order
+
+    # ---- sections ----
+
+    def _add_section(self, operation):
+        value = operation.get('value') or {}
+        frontend_id = value.get('frontend_id')
+        if not frontend_id:
+            raise InvalidOperation(None, "A new section needs a frontend_id")
+        if frontend_id in self.sections or Section.objects.filter(form=self.form, frontend_id=frontend_id).exists():
+            raise InvalidOperation(None, f"Section '{frontend_id}' already exists")
+        section = Section(
+            form=self.form, frontend_id=frontend_id,
+            **self._values('section', operation, placement=('frontend_id', 'order'))
+        )
+        section.order = self._make_room(Section.objects.filter(form=self.form), value.get('order'))
+        self._save(section)
+        self.sections[frontend_id] = section
+        return {'op': 'add', 'type': 'section', 'frontend_id': frontend_id, 'id': section.pk}
+
+    def _update_section(self, operation):
+        section = self.section(operation['frontend_id'])
+        values = self._values('section', operation)
+        for field, value in values.items():
+            setattr(section, field, value)
+        self._save(section, list(values))
+        return {'op': 'update', 'type': 'section', 'frontend_id': section.frontend_id}
+
+    def _move_section(self, operation):
+        section = self.section(operation['frontend_id'])
+        siblings = Section.objects.filter(form=self.form).exclude(pk=section.pk)
+        section.order = self._make_room(siblings, operation.get('order'))
+        section.save(update_fields=['order'])
+        return {'op': 'move', 'type': 'section', 'frontend_id': section.frontend_id, 'order': section.order}
+
+    def _delete_section(self, operation):
+        section = self.section(operation['frontend_id'])
+        # Questions of the section go with it (cascade)
+        self.questions = {fid: q for fid, q in self.questions.items() if q.section_id != section.pk}
+        del self.sections[section.frontend_id]
+        section.delete()
+        return {'op': 'delete', 'type': 'section', 'frontend_id': operation['frontend_id']}
+
+    # ---- questions ----
+
+    def _add_question(self, operation):
+        section = self.section(operation['parent'])
+        value = operation.get('value') or {}
+        frontend_id = value.get('frontend_id')
+        if not frontend_id:
+            raise InvalidOperation(None, "A new question needs a frontend_id")
+        if frontend_id in self.questions or Question.objects.filter(
+            section__form=self.form, frontend_id=frontend_id
+        ).exists():
+            raise InvalidOperation(None, f"Question '{frontend_id}' already exists")
+        question = Question(
+            section=section, frontend_id=frontend_id,
+            **self._values('question', operation, placement=('frontend_id', 'order'))
+        )
+        if question.options is None:
+            question.options = []
+        question.order = self._make_room(section.questions.all(), value.get('order'))
+        self._save(question)
+        self.questions[frontend_id] = question
+        return {'op': 'add', 'type': 'question', 'frontend_id': frontend_id, 'id': question.pk}
+
+    def _update_question(self, operation):
+        question = self.question(operation['frontend_id'])
+        values = self._values('question', operation)
+        for field, value in values.items():
+            setattr(question, field, value)
+        self._save(question, list(values))
+        return {'op': 'update', 'type': 'question', 'frontend_id': question.frontend_id}
+
+    def _move_question(self, operation):
+        question = self.question(operation['frontend_id'])
+        section = self.section(operation['parent']) if operation.get('parent') else None
+        if section is not None:
+            question.section = section
+        siblings = Question.objects.filter(section_id=question.section_id).exclude(pk=question.pk)
+        question.order = self._make_room(siblings, operation.get('order'))
+        question.save(update_fields=['section', 'order'])
+        return {'op': 'move', 'type': 'question', 'frontend_id': question.frontend_id, 'order': question.order}
+
+    def _delete_question(self, operation):
+        question = self.question(operation['frontend_id'])
+        del self.questions[question.frontend_id]
+        question.delete()
+        return {'op': 'delete', 'type': 'question', 'frontend_id': operation['frontend_id']}
+
+    # ---- option links ----
+
+    def _add_option_link(self, operation):
+        question = self.question(operation['parent'])
+        option = QuestionOption(question=question, **self._values('option_link', operation))
+        self._save(option)
+        return {'op': 'add', 'type': 'option_link', 'id': option.pk}
+
+    def _update_option_link(self, operation):
+        option = self.option_link(operation['id'])
+        values = self._values('option_link', operation)
+        for field, value in values.items():
+            setattr(option, field, value)
+        self._save(option, list(values))
+        return {'op': 'update', 'type': 'option_link', 'id': option.pk}
+
+    def _delete_option_link(self, operation):
+        option = self.option_link(operation['id'])
+        option.delete()
+        return {'op': 'delete', 'type': 'option_link', 'id': operation['id']}
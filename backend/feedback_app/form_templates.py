@@ -0,0 +1,49 @@
+"""
+Form templates.
+
+publish() freezes a form's tree into a FormTemplate; instantiate() creates
+a new form from one. The template is never modified afterwards, and each
+instance gets its own rows, written with save_form_tree's bulk inserts:
+a handful of queries whatever the size of the template.
+"""
+from django.db import transaction
+
+from .form_builder import save_form_tree, serialize_tree
+from .models import FeedbackForm, FormTemplate
+
+
+def publish(form, user, title=None, description=None, is_shared=False):
+    """Snapshot ``form`` as a new template owned by ``user``"""
+    schema = serialize_tree(form)
+    return FormTemplate.objects.create(
+        title=title or form.title,
+        description=form.description if description is None else description,
+        form_type=form.form_type,
+        created_by=user,
+        source_form=form,
+        is_shared=is_shared,
+        schema=schema,
+        section_count=len(schema),
+        question_count=sum(len(section['questions']) for section in schema),
+    )
+
+
+def instantiate(template, user, title=None):
+    """Create a new form for ``user`` with a copy of the template's sections, questions and option links"""
+    with transaction.atomic():
+        form = FeedbackForm.objects.create(
+            title=title or template.title,
+            description=template.description,
+            form_type=template.form_type,
+            created_by=user,
+            template=template,
+        )
+        save_form_tree(form, template.schema, is_new=True)
+    return form
+
+
+def usable_by(user):
+    """Templates ``user`` may instantiate: their own and shared ones"""
+    if user.is_superuser:
+        return FormTemplate.objects.all()
+    return FormTemplate.objects.filter(created_by=user) | FormTemplate.objects.filter(is_shared=True)
@@ -0,0 +1,99 @@
+"""
+Section funnel.
+
+Each response stores the sections its respondent went through
+(FeedbackResponse.section_path, from the navigation graph) and whether it
+answered every question on that path. SectionFunnel rows keep running
+reached/completed/exited counters per section, bumped with a handful of
+UPDATEs per batch of responses, so reading a form's funnel costs
+O(sections) whatever the number of responses.
+
+Counters follow the schema in place when a response was recorded; after
+restructuring a form run `manage.py rebuild_funnel` to recount.
+"""
+from collections import Counter
+
+from django.db.models import F
+
+from .models import SectionFunnel
+from .navigation import get_graph
+
+
+class Trace:
+    """A response's path through the form and the sections it completed"""
+
+    __slots__ = ('section_path', 'completed_sections', 'is_complete')
+
+    def __init__(self, graph, answers):
+        path = graph.path(answers)
+        self.section_path = [graph.section_ids[i] for i in path]
+        self.completed_sections = [
+            graph.section_ids[i] for i in path
+            if all(question_id in answers for question_id in graph.section_questions[i])
+        ]
+        self.is_complete = len(self.completed_sections) == len(path)
+
+
+def trace(form, answers):
+    """Trace of a respondent with ``answers`` ({question id: answer text}) through ``form``"""
+    return Trace(get_graph(form), answers)
+
+
+def record(form_id, traces):
+    """Add the traces of newly stored responses of one form to its section counters"""
+    reached = Counter()
+    completed = Counter()
+    exited = Counter()
+    for response_trace in traces:
+        reached.update(response_trace.section_path)
+        completed.update(response_trace.completed_sections)
+        if response_trace.section_path:
+            exited[response_trace.section_path[-1]] += 1
+    if not reached:
+        return
+
+    SectionFunnel.objects.bulk_create(
+        [SectionFunnel(form_id=form_id, section_id=section_id) for section_id in reached],
+        ignore_conflicts=True,
+    )
+    # One UPDATE per distinct combination of increments: a few per batch, not one per section
+    sections_by_increment = {}
+    for section_id in reached:
+        increment = (reached[section_id], completed[section_id], exited[section_id])
+        sections_by_increment.setdefault(increment, []).append(section_id)
+    for (reached_by, completed_by, exited_by), section_ids in sections_by_increment.items():
+        SectionFunnel.objects.filter(section_id__in=section_ids).update(
+            reached=F('reached') + reached_by,
+            completed=F('completed') + completed_by,
+            exited=F('exited') + exited_by,
+        )
+
+
+def get_funnel(form):
+    """Per-section reach, completion and exit figures of ``form`` in navigation order"""
+    graph = get_graph(form)
+    counters = {
+        row['section_id']: row
+        for row in SectionFunnel.objects.filter(form=form).values('section_id', 'reached', 'completed', 'exited')
+    }
+    order = graph.topological_order if graph.topological_order is not None else range(len(graph.section_ids))
+
+    total = counters.get(graph.section_ids[0], {}).get('reached', 0) if graph.section_ids else 0
+    steps = []
+    for i in order:
+        section_id = graph.section_ids[i]
+        row = counters.get(section_id, {})
+        reached = row.get('reached', 0)
+        completed = row.get('completed', 0)
+        steps.append({
+            'section_id': section_id,
+            'frontend_id': graph.section_frontend_ids[i],
+            'title': graph.section_titles[i],
+            'reached': reached,
+            'completed': completed,
+            'exited': row.get('exited', 0),
+            'dropped': reached - completed,
+            'reach_rate': round(reached / total * 100, 2) if total else 0.0,
+            'completion_rate': round(completed / reached * 100, 2) if reached else 0.0,
+        })
+    return {'total_responses': total, 'is_branching': graph.is_branching, 'sections': steps}
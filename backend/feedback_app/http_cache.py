@@ -0,0 +1,186 @@
+"""
+Conditional GET for the dashboard's read endpoints.
+
+The React dashboard polls the form list, form detail, analytics and
+dashboard summary. Each of those views is wrapped in ``conditional``,
+whose state function describes what the response depends on using only
+cheap queries: the forms' data versions (bumped on every edit, schema
+change and response, see signals.py) and the clock where a view depends
+on it (expiry, "today", the last 24 hours). From that come a strong ETag
+and a Last-Modified date; when the client's If-None-Match or
+If-Modified-Since still matches, a 304 is returned before the view runs
+any of its heavy queries.
+
+304s and full responses are counted per endpoint in the default cache
+and reported by ``metrics()``.
+"""
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import FeedbackResponse
+
+
+RESOURCES = ('form_list', 'form_detail', 'form_analytics', 'question_analytics', 'dashboard')
+
+METRICS_PREFIX = 'http_cache:'
+
+
+def _start_of_today():
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+
+
+def _expired(expires_at, now):
+    return expires_at is not None and expires_at < now
+
+
+def form_list_state(viewset, request, *args, **kwargs):
+    """The user's forms with their versions, and which have expired since"""
+    now = timezone.now()
+    rows = viewset.filter_queryset(viewset.get_queryset()).order_by('id').values_list(
+        'id', 'data_version', 'data_updated_at', 'expires_at'
+    )
+    parts, changes = [], []
+    for form_id, data_version, data_updated_at, expires_at in rows:
+        expired = _expired(expires_at, now)
+        parts.append((str(form_id), data_version, expired))
+        changes.append(max(data_updated_at, expires_at) if expired else data_updated_at)
+    return parts, max(changes, default=None)
+
+
+def form_state(viewset, request, *args, **kwargs):
+    """One form: its version and whether it has expired"""
+    form = viewset.get_object()
+    now = timezone.now()
+    expired = _expired(form.expires_at, now)
+    last_modified = max(form.data_updated_at, form.expires_at) if expired else form.data_updated_at
+    return [str(form.id), form.data_version, expired], last_modified
+
+
+def form_daily_state(viewset, request, *args, **kwargs):
+    """One form, for views that also break its data down by day (respondents per day)"""
+    parts, last_modified = form_state(viewset, request, *args, **kwargs)
+    return parts + [str(timezone.localdate())], max(last_modified, _start_of_today())
+
+
+def dashboard_state(view, request, *args, **kwargs):
+    """The forms summarised, plus the clock: the last 24 hours and today"""
+    forms = view.get_forms(request)
+    if forms is None:
+        return None
+    rows = list(forms.order_by('id').values_list('id', 'data_version', 'data_updated_at'))
+    # The 24 hour count drops whenever a response ages out of the window
+    window = timedelta(hours=24)
+    aged_out = FeedbackResponse.objects.filter(
+        form__in=forms, submitted_at__lt=timezone.now() - window
+    ).aggregate(latest=Max('submitted_at'))['latest']
+
+    parts = [
+        [(str(form_id), data_version) for form_id, data_version, _ in rows],
+        str(timezone.localdate()),
+        aged_out.isoformat() if aged_out else None,
+    ]
+    changes = [data_updated_at for _, _, data_updated_at in rows] + [_start_of_today()]
+    if aged_out:
+        changes.append(aged_out + window)
+    return parts, max(changes)
+
+
+def _etag(resource, request, parts):
+    renderer = getattr(request, 'accepted_renderer', None)
+    key = json.dumps([
+        resource,
+        request.user.pk,
+        request.get_full_path(),
+        getattr(renderer, 'format', None),
+        parts,
+    ], default=str)
+    return quote_etag(hashlib.sha256(key.encode()).hexdigest())
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Per user, and always revalidated
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+
+
+def _count(resource, outcome):
+    key = f"{METRICS_PREFIX}{resource}:{outcome}"
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted in between; losing one count is fine
+            pass
+
+
+def conditional(resource, state):
+    """
+    Answer conditional GETs to a view (viewset method or APIView.get).
+
+    ``state(view, request, *args, **kwargs)`` returns (parts, last_modified):
+    JSON-serialisable parts that change whenever the response would, and
+    the datetime it last changed. It may return None to skip validation,
+    e.g. when the view is about to fail anyway.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not getattr(settings, 'HTTP_CACHE_ENABLED', True):
+                return view_func(view, request, *args, **kwargs)
+
+            current = state(view, request, *args, **kwargs)
+            if current is None:
+                return view_func(view, request, *args, **kwargs)
+            parts, changed_at = current
+            etag = _etag(resource, request, parts)
+            last_modified = int(changed_at.timestamp()) if changed_at is not None else None
+
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                if not_modified.status_code == 304:
+                    _set_validators(not_modified, etag, last_modified)
+                    _count(resource, 'hits')
+                return not_modified
+
+            response = view_func(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+                _count(resource, 'misses')
+            return response
+        return wrapper
+    return decorator
+
+
+def metrics():
+    """304s (hits) and full responses (misses) per endpoint, with hit ratios"""
+    counts = cache.get_many([
+        f"{METRICS_PREFIX}{resource}:{outcome}" for resource in RESOURCES for outcome in ('hits', 'misses')
+    ])
+
+    def summary(hits, misses):
+        total = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+    endpoints = {
+        resource: summary(
+            counts.get(f"{METRICS_PREFIX}{resource}:hits", 0), counts.get(f"{METRICS_PREFIX}{resource}:misses", 0)
+        )
+        for resource in RESOURCES
+    }
+    return {
+        **summary(sum(e['hits'] for e in endpoints.values()), sum(e['misses'] for e in endpoints.values())),
+        'endpoints': endpoints,
+    }
+
@@ -0,0 +1,361 @@
+"""
+Buffered ingestion of public submissions.
+
+With SUBMISSION_INGEST_MODE = 'buffered', validated submissions are not
+written to the database by the request. Each one is given its response id
+up front, appended to a local append-only log (one JSON line, fsynced
+before the submitter is acknowledged) and later written to the database by
+a single writer (``manage.py flush_submissions``) in group-committed
+batches: one transaction and a handful of bulk INSERTs per batch instead of
+one small transaction per submission.
+
+Crash recovery and exactly-once flushing:
+
+* Records are only acknowledged once they are durable in the log; a torn
+  last line left by a crash mid-append is never acknowledged and is skipped
+  until it is completed.
+* The read offset of each log segment is stored in a side file that is
+  only advanced after the batch transaction commits. A crash in between
+  replays the batch, and records whose response id already exists are
+  skipped, so every record is written exactly once.
+* A batch's statistics (analytics, respondents, data version) are
+  updated in the transaction that writes its responses, so a replay that
+  skips a written record never leaves its statistics behind.
+* A record that cannot be written (e.g. its form was deleted) is moved to
+  rejected.log instead of blocking the queue, once the offset past it has
+  been stored, so a replay never logs it twice.
+
+Responses keep the time they were queued as their submitted_at.
+
+The active log is rotated into sealed segments once it grows past
+SUBMISSION_INGEST_ROTATE_BYTES; fully flushed segments are deleted.
+"""
+import fcntl
+import json
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import funnel
+from . import respondents
+from . import text_analytics
+from . import versions
+from .models import Answer, FeedbackForm, FeedbackResponse, FormAnalytics
+
+
+ACTIVE_LOG = 'submissions.log'
+SEGMENT_PREFIX = 'submissions-'
+
+
+def is_buffered():
+    return getattr(settings, 'SUBMISSION_INGEST_MODE', 'direct') == 'buffered'
+
+
+def _ingest_dir():
+    path = Path(getattr(settings, 'SUBMISSION_INGEST_DIR', Path(settings.BASE_DIR) / 'ingest'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _file_lock(name, mode):
+    """flock on a lock file in the ingest directory"""
+    fd = os.open(_ingest_dir() / name, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, mode)
+        yield
+    finally:
+        os.close(fd)
+
+
+# ------------------------
+# Appending
+# ------------------------
+def append_submission(form_id, answers, ip_address=None, user_agent='', idempotency_key=None, form_version_id=None):
+    """
+    Durably queue a validated submission and return its response id.
+
+    ``answers`` is a list of dicts with question_id, answer_text and
+    answer_value; ``form_version_id`` the FormVersion they were validated
+    against.
+    """
+    response_id = uuid.uuid4()
+    record = {
+        'id': str(response_id),
+        'form_id': str(form_id),
+        'answers': answers,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'idempotency_key': idempotency_key,
+        'form_version_id': form_version_id,
+        'queued_at': timezone.now().isoformat(),
+    }
+    line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+
+    # Appenders share the rotation lock so a segment is never sealed mid-write
+    with _file_lock('rotate.lock', fcntl.LOCK_SH):
+        fd = os.open(_ingest_dir() / ACTIVE_LOG, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # A single O_APPEND write keeps concurrent appenders from interleaving
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return response_id
+
+
+# ------------------------
+# Flushing
+# ------------------------
+def _read_offset(log_path):
+    try:
+        return int(Path(f"{log_path}.offset").read_text())
+    except (OSError, ValueError):
+        return 0
+
+
+def _write_offset(log_path, offset):
+    fd, tmp_path = tempfile.mkstemp(dir=log_path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        fh.write(str(offset))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, f"{log_path}.offset")
+
+
+def _rotate_if_needed(directory):
+    active = directory / ACTIVE_LOG
+    try:
+        size = active.stat().st_size
+    except OSError:
+        return
+    if size < getattr(settings, 'SUBMISSION_INGEST_ROTATE_BYTES', 64 * 1024 * 1024):
+        return
+    with _file_lock('rotate.lock', fcntl.LOCK_EX):
+        segment = directory / f"{SEGMENT_PREFIX}{time.time_ns()}.log"
+        os.replace(active, segment)
+        # The read position moves with the segment
+        if Path(f"{active}.offset").exists():
+            os.replace(f"{active}.offset", f"{segment}.offset")
+
+
+def _read_batch(log_path, offset, batch_size, rejected):
+    """
+    Complete records from ``offset``; returns (records, offset after them).
+    Malformed lines are added to ``rejected``.
+    """
+    records = []
+    with open(log_path, 'rb') as fh:
+        fh.seek(offset)
+        while len(records) < batch_size:
+            line = fh.readline()
+            if not line.endswith(b'\n'):
+                # End of log, or a record still being written
+                break
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                uuid.UUID(record['id'])
+                uuid.UUID(record['form_id'])
+                if not isinstance(record['answers'], list):
+                    raise TypeError('answers is not a list')
+            except (ValueError, KeyError, TypeError):
+                rejected.append((line.decode(errors='replace'), 'malformed record'))
+                continue
+            records.append(record)
+    return records, offset
+
+
+def _reject(rejected):
+    """Append (record, reason) pairs to rejected.log"""
+    if not rejected:
+        return
+    with open(_ingest_dir() / 'rejected.log', 'a') as fh:
+        for record, reason in rejected:
+            fh.write(json.dumps({'reason': reason, 'record': record}) + '\n')
+
+
+def _queued_at(record):
+    try:
+        return datetime.fromisoformat(record['queued_at'])
+    except (KeyError, TypeError, ValueError):
+        return timezone.now()
+
+
+def _write_records(records, rejected):
+    """
+    Insert a batch of records in the current transaction, skipping ones
+    already written. Records whose form is gone are added to ``rejected``.
+    Returns the list of (form, response) pairs created.
+    """
+    ids = [record['id'] for record in records]
+    existing = {str(pk) for pk in FeedbackResponse.objects.filter(id__in=ids).values_list('id', flat=True)}
+    pending = [record for record in records if record['id'] not in existing]
+    if not pending:
+        return []
+
+    forms = FeedbackForm.objects.in_bulk({record['form_id'] for record in pending})
+    missing = [record for record in pending if uuid.UUID(record['form_id']) not in forms]
+    if missing:
+        rejected.extend((record, 'form no longer exists') for record in missing)
+        pending = [record for record in pending if uuid.UUID(record['form_id']) in forms]
+
+    # Paths through each form, for the responses and the section funnel
+    traces = {}
+    for record in pending:
+        form = forms[uuid.UUID(record['form_id'])]
+        traces[record['id']] = funnel.trace(form, {
+            answer['question_id']: answer.get('answer_text', '') for answer in record['answers']
+        })
+    # Records queued before versions were stored with them get the current one
+    unversioned = {uuid.UUID(record['form_id']) for record in pending if record.get('form_version_id') is None}
+    version_ids = {form_id: versions.current_version_id(forms[form_id]) for form_id in unversioned}
+
+    responses = FeedbackResponse.objects.bulk_create([
+        FeedbackResponse(
+            id=uuid.UUID(record['id']),
+            form_id=uuid.UUID(record['form_id']),
+            form_version_id=record.get('form_version_id') or version_ids[uuid.UUID(record['form_id'])],
+            submitted_at=_queued_at(record),
+            ip_address=record.get('ip_address'),
+            user_agent=record.get('user_agent') or '',
+            idempotency_key=record.get('idempotency_key'),
+            section_path=traces[record['id']].section_path,
+            is_complete=traces[record['id']].is_complete,
+        )
+        for record in pending
+    ])
+    Answer.objects.bulk_create([
+        Answer(
+            response_id=uuid.UUID(record['id']),
+            question_id=answer['question_id'],
+            question_ref=answer['question_id'],
+            answer_text=answer.get('answer_text', ''),
+            answer_value=answer.get('answer_value') or {},
+        )
+        for record in pending
+        for answer in record['answers']
+    ])
+
+    text_analytics.record(
+        (answer['question_id'], answer.get('answer_text', '')) for record in pending for answer in record['answers']
+    )
+
+    traces_by_form = {}
+    for record in pending:
+        traces_by_form.setdefault(uuid.UUID(record['form_id']), []).append(traces[record['id']])
+    for form_id, form_traces in traces_by_form.items():
+        funnel.record(form_id, form_traces)
+    return [(forms[response.form_id], response) for response in responses]
+
+
+def _refresh_forms(created):
+    """
+    New data version and statistics, once per form per batch rather than
+    per response, and the responses' pending notifications
+    """
+    from .notifications import record_pending_responses
+
+    responses_by_form = {}
+    for form, response in created:
+        responses_by_form.setdefault(form.id, (form, []))[1].append(response)
+    for form_id, (form, responses) in responses_by_form.items():
+        FeedbackForm.bump_data_version(form_id)
+        FormAnalytics.record_responses(form, [response.pk for response in responses])
+        respondents.record(form_id, responses)
+    record_pending_responses(created)
+
+
+def flush_once(batch_size=None):
+    """
+    Write every complete queued record to the database in batches.
+    Returns the number of responses created.
+    """
+    from .notifications import notify_new_response
+
+    batch_size = batch_size or getattr(settings, 'SUBMISSION_INGEST_BATCH_SIZE', 500)
+    directory = _ingest_dir()
+    _rotate_if_needed(directory)
+
+    # Sealed segments first (oldest first), then the active log
+    logs = sorted(directory.glob(f"{SEGMENT_PREFIX}*.log"))
+    if (directory / ACTIVE_LOG).exists():
+        logs.append(directory / ACTIVE_LOG)
+
+    created_total = 0
+    for log_path in logs:
+        offset = _read_offset(log_path)
+        while True:
+            rejected = []  # (record, reason), logged once the offset has moved past them
+            records, next_offset = _read_batch(log_path, offset, batch_size, rejected)
+            if next_offset == offset:
+                break
+
+            created = []
+            if records:
+                try:
+                    batch_rejected = []
+                    with transaction.atomic():
+                        created = _write_records(records, batch_rejected)
+                        _refresh_forms(created)
+                    rejected.extend(batch_rejected)
+                except IntegrityError:
+                    # One bad record must not block the queue: retry one by one
+                    created = []
+                    for record in records:
+                        record_rejected = []
+                        try:
+                            with transaction.atomic():
+                                written = _write_records([record], record_rejected)
+                                _refresh_forms(written)
+                        except IntegrityError as exc:
+                            rejected.append((record, str(exc)))
+                            continue
+                        created.extend(written)
+                        rejected.extend(record_rejected)
+
+            # Only advance once the batch is committed
+            _write_offset(log_path, next_offset)
+            offset = next_offset
+            _reject(rejected)
+            created_total += len(created)
+
+            for form, response in created:
+                notify_new_response(form, response)
+
+        if log_path.name != ACTIVE_LOG:
+            os.remove(log_path)
+            try:
+                os.remove(f"{log_path}.offset")
+            except OSError:
+                pass
+
+    return created_total
+
+
+@contextmanager
+def writer_lock():
+    """
+    Held by the flushing process. Yields False if another writer is already
+    running.
+    """
+    fd = os.open(_ingest_dir() / 'writer.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(fd)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from feedback_app.models import ArchivedNotification, Notification
+
+
+class Command(BaseCommand):
+    help = "Move read notifications older than the retention period into the archive table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="Retention period in days (default: NOTIFICATION_RETENTION_DAYS)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Notifications moved per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many would be archived")
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days is None:
+            days = getattr(settings, "NOTIFICATION_RETENTION_DAYS", 90)
+        cutoff = timezone.now() - timedelta(days=days)
+        batch_size = options["batch_size"]
+
+        # Served by the (is_read, created_at) index
+        candidates = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{candidates.count()} read notifications older than {days} days would be archived")
+            return
+
+        archived = 0
+        while True:
+            # Short transactions keep locks brief while users read and write notifications
+            with transaction.atomic():
+                batch = list(candidates.order_by("id")[:batch_size])
+                if not batch:
+                    break
+                ArchivedNotification.objects.bulk_create(
+                    [
+                        ArchivedNotification(
+                            id=notification.id,
+                            user_id=notification.user_id,
+                            notification_type=notification.notification_type,
+                            title=notification.title,
+                            message=notification.message,
+                            created_at=notification.created_at,
+                            data=notification.data,
+                        )
+                        for notification in batch
+                    ],
+                    ignore_conflicts=True,
+                )
+                Notification.objects.filter(id__in=[notification.id for notification in batch]).delete()
+            archived += len(batch)
+            self.stdout.write(f"Archived {archived} notifications...")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} read notifications older than {days} days"))
@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from channels.layers import InMemoryChannelLayer, channel_layers
+from django.core.management.base import BaseCommand, CommandError
+
+
+GROUP = "bench_channel_layer"
+
+
+def _receiver(layer_alias, expected, timeout, ready, results):
+    """Worker process: join the bench group and time every message it receives"""
+    async def run():
+        layer = channel_layers.make_backend(layer_alias)
+        channel = await layer.new_channel()
+        await layer.group_add(GROUP, channel)
+        ready.put(channel)
+
+        latencies = []
+        deadline = time.monotonic() + timeout
+        while len(latencies) < expected:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(layer.receive(channel), remaining)
+            except asyncio.TimeoutError:
+                break
+            latencies.append(time.time() - message["sent_at"])
+
+        await layer.group_discard(GROUP, channel)
+        results.put(latencies)
+
+    asyncio.run(run())
+
+
+class Command(BaseCommand):
+    help = "Measure group_send delivery latency and throughput of the configured channel layer across worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Number of receiving processes")
+        parser.add_argument("--messages", type=int, default=500, help="Messages sent to the group")
+        parser.add_argument("--batch", type=int, default=1,
+                            help="Messages per group_send_many call, when the layer supports it")
+        parser.add_argument("--layer", default="default", help="CHANNEL_LAYERS alias to benchmark")
+        parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for delivery")
+
+    def handle(self, *args, **options):
+        alias = options["layer"]
+        workers = options["workers"]
+        total = options["messages"]
+        batch = max(1, options["batch"])
+
+        layer = channel_layers.make_backend(alias)
+        if isinstance(layer, InMemoryChannelLayer):
+            raise CommandError("InMemoryChannelLayer cannot deliver across processes; set CHANNEL_LAYER=redis or sqlite")
+
+        ctx = multiprocessing.get_context("fork")
+        ready = ctx.Queue()
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=_receiver, args=(alias, total, options["timeout"], ready, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get(timeout=options["timeout"])
+
+        async def send_all():
+            batched = hasattr(layer, "group_send_many") and batch > 1
+            for start in range(0, total, batch):
+                count = min(batch, total - start)
+                if batched:
+                    await layer.group_send_many([
+                        (GROUP, {"type": "bench.message", "sent_at": time.time()}) for _ in range(count)
+                    ])
+                else:
+                    for _ in range(count):
+                        await layer.group_send(GROUP, {"type": "bench.message", "sent_at": time.time()})
+
+        started = time.monotonic()
+        asyncio.run(send_all())
+        send_elapsed = time.monotonic() - started
+
+        latencies = []
+        for _ in processes:
+            latencies.extend(results.get(timeout=options["timeout"] + 5))
+        elapsed = time.monotonic() - started
+        for process in processes:
+            process.join()
+
+        expected = total * workers
+        self.stdout.write(f"Layer: {type(layer).__module__}.{type(layer).__name__}")
+        self.stdout.write(f"Workers: {workers}  messages: {total}  batch: {batch}")
+        self.stdout.write(f"Delivered: {len(latencies)}/{expected}")
+        self.stdout.write(f"Send rate: {total / send_elapsed:.0f} group_send/s")
+        self.stdout.write(f"Delivery throughput: {len(latencies) / elapsed:.0f} msg/s")
+        if latencies:
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(
+                f"Latency ms: mean {statistics.mean(latencies) * 1000:.2f}  "
+                f"p50 {statistics.median(latencies) * 1000:.2f}  p95 {p95 * 1000:.2f}  "
+                f"max {latencies[-1] * 1000:.2f}"
+            )
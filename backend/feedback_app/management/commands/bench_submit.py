@@ -0,0 +1,128 @@
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from feedback_app.models import CustomUser, FeedbackForm, Question, Section
+
+
+def _submitter(form_id, answers, requests, results):
+    """Worker process: submit ``requests`` responses and report latencies and failures"""
+    # Submit directly and notify immediately so each request is one full write
+    settings.SUBMISSION_INGEST_MODE = "direct"
+    settings.NOTIFICATION_COALESCE_WINDOW = 0
+
+    client = Client()
+    url = f"/api/public/feedback/{form_id}/"
+    body = json.dumps({"answers": answers})
+    latencies = []
+    failures = 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.post(url, body, content_type="application/json")
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 201:
+            failures += 1
+    connections.close_all()
+    results.put((latencies, failures))
+
+
+class Command(BaseCommand):
+    help = "Measure concurrent public submit throughput against the configured database profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent submitting processes")
+        parser.add_argument("--requests", type=int, default=100, help="Submissions per worker")
+        parser.add_argument("--profiles", default="",
+                            help="Comma-separated DB_PROFILE values to compare, each run in a subprocess "
+                                 "against a scratch SQLite file (e.g. sqlite-basic,sqlite)")
+        parser.add_argument("--migrate", action="store_true",
+                            help="Migrate the database first (used for scratch databases)")
+
+    def handle(self, *args, **options):
+        if options["profiles"]:
+            self.compare(options)
+            return
+
+        if options["migrate"]:
+            call_command("migrate", verbosity=0)
+
+        user, _ = CustomUser.objects.get_or_create(username="bench_submit", defaults={"is_approved": True})
+        form = FeedbackForm.objects.create(title="Submit benchmark", created_by=user)
+        section = Section.objects.create(form=form, title="Benchmark")
+        rating = Question.objects.create(section=section, text="Rating", question_type="rating", is_required=True)
+        choice = Question.objects.create(section=section, text="Choice", question_type="radio",
+                                         options=["A", "B"], order=1)
+        comment = Question.objects.create(section=section, text="Comment", question_type="textarea", order=2)
+        answers = [
+            {"question": rating.id, "answer_text": "4"},
+            {"question": choice.id, "answer_text": "A"},
+            {"question": comment.id, "answer_text": "Benchmark submission"},
+        ]
+
+        workers = options["workers"]
+        # Children must open their own connections
+        connections.close_all()
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=_submitter, args=(form.id, answers, options["requests"], results))
+            for _ in range(workers)
+        ]
+
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        latencies = []
+        failures = 0
+        for _ in processes:
+            worker_latencies, worker_failures = results.get()
+            latencies.extend(worker_latencies)
+            failures += worker_failures
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+
+        stored = form.responses.count()
+        form.delete()
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(f"Profile: {settings.DB_PROFILE} ({settings.DATABASES['default']['ENGINE']})")
+        self.stdout.write(f"Workers: {workers}  submissions: {len(latencies)}  stored: {stored}  failed: {failures}")
+        self.stdout.write(f"Throughput: {stored / elapsed:.1f} submissions/s")
+        self.stdout.write(
+            f"Latency ms: mean {statistics.mean(latencies) * 1000:.1f}  "
+            f"p50 {statistics.median(latencies) * 1000:.1f}  p95 {p95 * 1000:.1f}  "
+            f"max {latencies[-1] * 1000:.1f}"
+        )
+
+    def compare(self, options):
+        """Run the benchmark once per profile, each in a fresh process with its own settings"""
+        manage_py = Path(settings.BASE_DIR) / "manage.py"
+        with tempfile.TemporaryDirectory() as scratch:
+            for profile in [p.strip() for p in options["profiles"].split(",") if p.strip()]:
+                env = dict(os.environ, DB_PROFILE=profile)
+                if profile.startswith("sqlite"):
+                    # A fresh file per profile: journal_mode=WAL persists in the database file
+                    env["DB_NAME"] = str(Path(scratch) / f"bench-{profile}.sqlite3")
+                command = [
+                    sys.executable, str(manage_py), "bench_submit", "--migrate",
+                    "--workers", str(options["workers"]), "--requests", str(options["requests"]),
+                ]
+                self.stdout.write(f"--- {profile} ---")
+                result = subprocess.run(command, env=env, capture_output=True, text=True)
+                self.stdout.write(result.stdout)
+                if result.returncode:
+                    raise CommandError(f"Benchmark for profile {profile!r} failed:\n{result.stderr[-2000:]}")
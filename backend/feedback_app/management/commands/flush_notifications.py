@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from feedback_app import notifications
+
+
+class Command(BaseCommand):
+    help = "Write and push new-response digests whose NOTIFICATION_COALESCE_WINDOW has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Flush what is due and exit")
+        parser.add_argument("--interval", type=float, default=1.0,
+                            help="Seconds between flushes when running continuously")
+
+    def handle(self, *args, **options):
+        while True:
+            digests = notifications.flush_due_digests()
+            if digests:
+                self.stdout.write(f"Sent {len(digests)} digests")
+            if options["once"]:
+                break
+            close_old_connections()
+            time.sleep(options["interval"])
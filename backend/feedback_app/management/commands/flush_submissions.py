@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from feedback_app import ingest
+
+
+class Command(BaseCommand):
+    help = "Write buffered public submissions from the ingestion log to the database in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Flush what is queued and exit")
+        parser.add_argument("--interval", type=float, default=0.5,
+                            help="Seconds between flushes when running continuously")
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="Submissions per transaction (default: SUBMISSION_INGEST_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        with ingest.writer_lock() as acquired:
+            if not acquired:
+                raise CommandError("Another flush_submissions process is already running")
+
+            while True:
+                created = ingest.flush_once(options["batch_size"])
+                if created:
+                    self.stdout.write(f"Flushed {created} submissions")
+                if options["once"]:
+                    break
+                close_old_connections()
+                time.sleep(options["interval"])
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from feedback_app import funnel
+from feedback_app.models import Answer, FeedbackForm, FeedbackResponse, FormAnalytics, SectionFunnel
+
+
+class Command(BaseCommand):
+    help = "Recompute response paths and section funnel counters from stored answers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", help="Only rebuild this form (id)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Responses updated per query")
+
+    def handle(self, *args, **options):
+        forms = FeedbackForm.objects.all()
+        if options["form"]:
+            forms = forms.filter(pk=options["form"])
+
+        for form in forms.iterator():
+            with transaction.atomic():
+                traced = self.rebuild(form, options["batch_size"])
+            self.stdout.write(f"{form.title}: {traced} responses traced")
+
+    def rebuild(self, form, batch_size):
+        answers = {response_id: {} for response_id in form.responses.values_list('id', flat=True)}
+        for response_id, question_id, answer_text in Answer.objects.filter(response__form=form).values_list(
+            'response_id', 'question_id', 'answer_text'
+        ).iterator():
+            answers[response_id][question_id] = answer_text
+
+        traces = {response_id: funnel.trace(form, response_answers) for response_id, response_answers in answers.items()}
+        FeedbackResponse.objects.bulk_update(
+            [
+                FeedbackResponse(id=response_id, section_path=trace.section_path, is_complete=trace.is_complete)
+                for response_id, trace in traces.items()
+            ],
+            ['section_path', 'is_complete'],
+            batch_size=batch_size,
+        )
+
+        SectionFunnel.objects.filter(form=form).delete()
+        funnel.record(form.pk, traces.values())
+
+        # Completion rate is derived from the traced responses
+        analytics, _ = FormAnalytics.objects.get_or_create(form=form)
+        analytics.update_analytics()
+        return len(traces)
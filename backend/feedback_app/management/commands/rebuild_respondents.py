@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from feedback_app import respondents
+from feedback_app.models import FeedbackForm, FormAnalytics, RespondentSketch
+
+
+class Command(BaseCommand):
+    help = "Recount the distinct-respondent sketches of forms from stored responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", help="Only rebuild this form (id)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Responses folded in per update")
+
+    def handle(self, *args, **options):
+        forms = FeedbackForm.objects.all()
+        if options["form"]:
+            forms = forms.filter(pk=options["form"])
+
+        for form in forms.iterator():
+            with transaction.atomic():
+                FormAnalytics.objects.get_or_create(form=form)
+                FormAnalytics.objects.filter(form=form).update(respondent_registers=b'')
+                RespondentSketch.objects.filter(form=form).delete()
+                batch = []
+                for response in form.responses.only('ip_address', 'user_agent', 'submitted_at').iterator():
+                    batch.append(response)
+                    if len(batch) >= options["batch_size"]:
+                        respondents.record(form.id, batch)
+                        batch = []
+                respondents.record(form.id, batch)
+                estimate = respondents.form_respondents(FormAnalytics.objects.get(form=form))['estimate']
+            self.stdout.write(f"{form.title}: about {estimate} distinct respondents")
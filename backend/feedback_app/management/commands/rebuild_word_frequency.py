@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from feedback_app import text_analytics
+from feedback_app.models import Answer, Question, TermFrequency
+
+
+class Command(BaseCommand):
+    help = "Recount the term and phrase frequencies of text questions from stored answers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", help="Only rebuild this form (id)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Answers folded in per update")
+
+    def handle(self, *args, **options):
+        questions = Question.objects.filter(question_type__in=text_analytics.TEXT_QUESTION_TYPES)
+        if options["form"]:
+            questions = questions.filter(section__form=options["form"])
+
+        for question in questions.iterator():
+            with transaction.atomic():
+                TermFrequency.objects.filter(question=question).delete()
+                answers = Answer.objects.filter(question=question).exclude(answer_text='').values_list(
+                    'question_id', 'answer_text'
+                )
+                batch = []
+                counted = 0
+                for answer in answers.iterator(chunk_size=options["batch_size"]):
+                    batch.append(answer)
+                    if len(batch) >= options["batch_size"]:
+                        text_analytics.record(batch)
+                        counted += len(batch)
+                        batch = []
+                if batch:
+                    text_analytics.record(batch)
+                    counted += len(batch)
+            self.stdout.write(f"{question.text[:50]}: {counted} answers counted")
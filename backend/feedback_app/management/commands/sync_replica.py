@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from feedback_app.db_router import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the replica file (local stand-in for replication)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Keep syncing every N seconds instead of once (simulates replica lag)")
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in settings.DATABASES:
+            raise CommandError("No replica database configured; set DB_REPLICA_NAME")
+
+        primary = settings.DATABASES["default"]
+        replica = settings.DATABASES[REPLICA_ALIAS]
+        if "sqlite3" not in primary["ENGINE"]:
+            raise CommandError("sync_replica only copies SQLite databases; use the server's replication otherwise")
+
+        while True:
+            started = time.perf_counter()
+            self.sync(str(primary["NAME"]), str(replica["NAME"]))
+            self.stdout.write(f"Replica synced in {(time.perf_counter() - started) * 1000:.0f} ms")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def sync(self, primary_path, replica_path):
+        # The online backup API copies a consistent snapshot while the primary keeps taking writes
+        source = sqlite3.connect(primary_path)
+        target = sqlite3.connect(replica_path, timeout=30)
+        try:
+            source.backup(target, pages=1024)
+        finally:
+            target.close()
+            source.close()
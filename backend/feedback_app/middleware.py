@@ -1,7 +1,7 @@
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from rest_framework.authtoken.models import Token
+from .authentication import get_token_user
 from urllib.parse import parse_qs
 
 
@@ -25,9 +25,8 @@ class TokenAuthMiddleware(BaseMiddleware):
     
     @database_sync_to_async
     def get_user_from_token(self, token_key):
-        """Get user from token"""
-        try:
-            token = Token.objects.get(key=token_key)
-            return token.user
-        except Token.DoesNotExist:
-            return AnonymousUser() 
\ No newline at end of file
+        """Get user from token (cached, shared with REST token authentication)"""
+        cached = get_token_user(token_key)
+        if cached is None or not cached[0].is_active:
+            return AnonymousUser()
+        return cached[0] 
\ No newline at end of file
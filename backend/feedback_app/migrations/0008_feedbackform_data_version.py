@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0007_alter_questionoption_options_question_frontend_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbackform',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
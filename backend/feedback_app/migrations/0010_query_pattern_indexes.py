@@ -0,0 +1,58 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:15
+
+from django.db import migrations, models
+
+
+ANSWER_TEXT_INDEX = models.Index(fields=['question', 'answer_text'], name='answer_question_text_idx')
+
+
+def add_answer_text_index(apps, schema_editor):
+    # PostgreSQL btree entries are capped at ~2.7kB and answer_text holds free
+    # text answers of any length, so the index is only built elsewhere
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('feedback_app', 'Answer'), ANSWER_TEXT_INDEX)
+
+
+def remove_answer_text_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('feedback_app', 'Answer'), ANSWER_TEXT_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0009_notification_indexes_archivednotification'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='answer', index=ANSWER_TEXT_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_answer_text_index, remove_answer_text_index),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedbackform',
+            index=models.Index(fields=['created_by', '-created_at'], name='form_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedbackform',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_by', '-created_at'], name='form_owner_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedbackresponse',
+            index=models.Index(fields=['form', '-submitted_at'], name='response_form_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['section', 'order'], name='question_section_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['form', 'order'], name='section_form_order_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0010_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbackform',
+            name='schema_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
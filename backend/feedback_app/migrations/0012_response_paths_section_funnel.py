@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0011_form_schema_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbackresponse',
+            name='is_complete',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='feedbackresponse',
+            name='section_path',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='SectionFunnel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reached', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('exited', models.PositiveIntegerField(default=0)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='section_funnels', to='feedback_app.feedbackform')),
+                ('section', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='funnel', to='feedback_app.section')),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:25
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0012_response_paths_section_funnel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormTemplate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('form_type', models.CharField(choices=[('empty', 'Empty Form'), ('customer_satisfaction', 'Customer Satisfaction'), ('employee_feedback', 'Employee Feedback'), ('product_feedback', 'Product Feedback'), ('service_feedback', 'Service Feedback'), ('general', 'General Feedback')], default='general', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('is_shared', models.BooleanField(default=False)),
+                ('schema', models.JSONField(default=list, editable=False)),
+                ('section_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('question_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='form_templates', to=settings.AUTH_USER_MODEL)),
+                ('source_form', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='published_templates', to='feedback_app.feedbackform')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='feedbackform',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='forms', to='feedback_app.formtemplate'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_question_ids(apps, schema_editor):
+    # Existing answers keep the id of their question once it can be deleted
+    Answer = apps.get_model('feedback_app', 'Answer')
+    Answer.objects.update(question_ref=models.F('question_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0013_form_templates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='question_ref',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(copy_question_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='answer',
+            name='question',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='feedback_app.question'),
+        ),
+        migrations.CreateModel(
+            name='FormVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('schema', models.JSONField(default=list, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='feedback_app.feedbackform')),
+            ],
+            options={
+                'ordering': ['form', '-number'],
+                'unique_together': {('form', 'number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='feedbackresponse',
+            name='form_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='responses', to='feedback_app.formversion'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+from django.db import migrations
+
+
+# Text and textarea answers are mirrored into an FTS5 table by triggers, so
+# bulk inserts from the ingest worker are indexed like single submissions.
+# Answers stay indexed when their question is deleted or changes type.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE feedback_app_answer_search USING fts5(
+        answer_text, form_id UNINDEXED, response_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER feedback_app_answer_search_insert AFTER INSERT ON feedback_app_answer
+    WHEN NEW.answer_text <> ''
+        AND (SELECT question_type FROM feedback_app_question WHERE id = NEW.question_id) IN ('text', 'textarea')
+    BEGIN
+        INSERT INTO feedback_app_answer_search (rowid, answer_text, form_id, response_id)
+        SELECT NEW.id, NEW.answer_text, form_id, NEW.response_id
+        FROM feedback_app_feedbackresponse WHERE id = NEW.response_id;
+    END
+    """,
+    """
+    CREATE TRIGGER feedback_app_answer_search_update AFTER UPDATE OF answer_text ON feedback_app_answer
+    BEGIN
+        UPDATE feedback_app_answer_search SET answer_text = NEW.answer_text WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER feedback_app_answer_search_delete AFTER DELETE ON feedback_app_answer
+    BEGIN
+        DELETE FROM feedback_app_answer_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    INSERT INTO feedback_app_answer_search (rowid, answer_text, form_id, response_id)
+    SELECT a.id, a.answer_text, r.form_id, a.response_id
+    FROM feedback_app_answer a
+    JOIN feedback_app_feedbackresponse r ON r.id = a.response_id
+    JOIN feedback_app_question q ON q.id = a.question_id
+    WHERE a.answer_text <> '' AND q.question_type IN ('text', 'textarea')
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS feedback_app_answer_search_insert",
+    "DROP TRIGGER IF EXISTS feedback_app_answer_search_update",
+    "DROP TRIGGER IF EXISTS feedback_app_answer_search_delete",
+    "DROP TABLE IF EXISTS feedback_app_answer_search",
+]
+
+# Must match the expression search.py queries with, or the index is not used
+POSTGRES_CREATE = [
+    "CREATE INDEX answer_text_search_idx ON feedback_app_answer USING GIN (to_tsvector('english', answer_text))",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS answer_text_search_idx",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_CREATE)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_CREATE)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_DROP)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0014_form_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0015_answer_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermFrequency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers_seen', models.PositiveIntegerField(default=0)),
+                ('terms_seen', models.BigIntegerField(default=0)),
+                ('counters', models.BinaryField(default=bytes)),
+                ('top_terms', models.JSONField(blank=True, default=dict)),
+                ('top_phrases', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='term_frequency', to='feedback_app.question')),
+            ],
+        ),
+    ]
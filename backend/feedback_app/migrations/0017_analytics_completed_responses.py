@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:35
+
+from django.db import migrations, models
+
+
+TEXT_SAMPLE_SIZE = 100
+
+
+def bound_summaries(apps, schema_editor):
+    # Completed responses were only kept as a rate; text questions kept every answer
+    FormAnalytics = apps.get_model('feedback_app', 'FormAnalytics')
+    for analytics in FormAnalytics.objects.iterator():
+        analytics.completed_responses = round(analytics.completion_rate * analytics.total_responses / 100)
+        for stats in analytics.questions_summary.values():
+            if isinstance(stats, dict) and 'answers' in stats and 'answers_seen' not in stats:
+                stats['answers_seen'] = len(stats['answers'])
+                # Keep the most recent answers
+                stats['answers'] = sorted(
+                    stats['answers'], key=lambda entry: entry['submitted_at'], reverse=True
+                )[:TEXT_SAMPLE_SIZE]
+        analytics.save(update_fields=['completed_responses', 'questions_summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0016_term_frequency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formanalytics',
+            name='completed_responses',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(bound_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0017_analytics_completed_responses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formanalytics',
+            name='respondent_registers',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.CreateModel(
+            name='RespondentSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('registers', models.BinaryField(default=bytes)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='respondent_sketches', to='feedback_app.feedbackform')),
+            ],
+            options={
+                'ordering': ['form', 'day'],
+                'unique_together': {('form', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0018_respondent_sketches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbackresponse',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='feedbackresponse',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key__isnull', False)), fields=('form', 'idempotency_key'), name='response_form_idempotency_key_uniq'),
+        ),
+    ]
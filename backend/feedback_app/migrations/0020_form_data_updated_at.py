@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:42
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_data_updated_at(apps, schema_editor):
+    # Last edit or last response, whichever came later
+    FeedbackForm = apps.get_model('feedback_app', 'FeedbackForm')
+    FeedbackResponse = apps.get_model('feedback_app', 'FeedbackResponse')
+    latest_response = FeedbackResponse.objects.filter(form=OuterRef('pk')).order_by('-submitted_at').values('submitted_at')[:1]
+    FeedbackForm.objects.update(
+        data_updated_at=Greatest(F('updated_at'), Coalesce(Subquery(latest_response), F('updated_at')))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0019_response_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbackform',
+            name='data_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(backfill_data_updated_at, migrations.RunPython.noop),
+    ]
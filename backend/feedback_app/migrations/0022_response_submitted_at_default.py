@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0021_pending_notifications'),
+    ]
+
+    # Only where the value comes from changes (auto_now_add -> default): the
+    # column is untouched, and rebuilding the table on SQLite would break the
+    # answer search triggers that refer to it
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='feedbackresponse',
+                    name='submitted_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
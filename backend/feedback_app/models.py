@@ -37,13 +37,62 @@ class FeedbackForm(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     expires_at = models.DateTimeField(null=True, blank=True)
+    data_version = models.PositiveIntegerField(default=0, editable=False)  # Bumped on any response or schema change
+    schema_version = models.PositiveIntegerField(default=1, editable=False)  # Bumped on any change to sections, questions or option links
+    data_updated_at = models.DateTimeField(default=timezone.now, editable=False)  # When data_version last moved
+    template = models.ForeignKey(
+        'FormTemplate', on_delete=models.SET_NULL, null=True, blank=True, related_name='forms'
+    )  # Template the form was instantiated from
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A user's forms, newest first
+            models.Index(fields=['created_by', '-created_at'], name='form_owner_created_idx'),
+            # ... and only the active ones. Partial, because boolean filters are
+            # rendered as a bare column test that a composite index cannot seek on
+            models.Index(
+                fields=['created_by', '-created_at'], condition=models.Q(is_active=True),
+                name='form_owner_active_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
-    
+
+    VERSION_FIELDS = ('data_version', 'schema_version', 'data_updated_at')
+
+    def save(self, *args, **kwargs):
+        # The version counters are only advanced through the bump_* methods:
+        # write back the stored values, not a possibly stale in-memory copy
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        for name in self.VERSION_FIELDS:
+            setattr(self, name, models.F(name))
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=self.VERSION_FIELDS)
+
+    @classmethod
+    def bump_data_version(cls, form_id):
+        """Atomically advance the data version of a form, invalidating cached exports"""
+        cls.objects.filter(pk=form_id).update(
+            data_version=models.F('data_version') + 1, data_updated_at=timezone.now()
+        )
+
+    @classmethod
+    def bump_schema_version(cls, form_id):
+        """Advance the schema version of a form; a schema change also invalidates cached exports"""
+        cls.objects.filter(pk=form_id).update(
+            schema_version=models.F('schema_version') + 1,
+            data_version=models.F('data_version') + 1,
+            data_updated_at=timezone.now(),
+        )
+
+    @property
+    def questions(self):
+        """All questions of the form across its sections, in section order."""
+        return Question.objects.filter(section__form=self).order_by('section__order', 'order')
+
     @property
     def is_expired(self):
         """
@@ -75,6 +124,9 @@ class Section(models.Model):
     
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['form', 'order'], name='section_form_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} (Form: {self.form.title})"
@@ -107,6 +159,9 @@ class Question(models.Model):
     
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['section', 'order'], name='question_section_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.text} ({self.question_type})"
@@ -136,18 +191,87 @@ class QuestionOption(models.Model):
 
 
 
+# ------------------------
+# Versions
+# ------------------------
+class FormVersion(models.Model):
+    """
+    Frozen schema of a form at one schema_version, created when the first
+    response to that version is stored (see versions.py). Never modified.
+    """
+    form = models.ForeignKey(FeedbackForm, on_delete=models.CASCADE, related_name='versions')
+    number = models.PositiveIntegerField()  # The form's schema_version when frozen
+    schema = models.JSONField(default=list, editable=False)  # form_builder.serialize_tree(form, include_ids=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['form', '-number']
+        unique_together = ['form', 'number']
+
+    def __str__(self):
+        return f"{self.form_id} v{self.number}"
+
+
+# ------------------------
+# Templates
+# ------------------------
+class FormTemplate(models.Model):
+    """
+    An immutable snapshot of a form's sections, questions and option links
+    (in the builder's payload shape, see form_builder.serialize_tree) that
+    new forms are instantiated from.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    form_type = models.CharField(max_length=50, choices=FeedbackForm.FORM_TYPES, default='general')
+    created_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='form_templates')
+    created_at = models.DateTimeField(auto_now_add=True)
+    source_form = models.ForeignKey(
+        FeedbackForm, on_delete=models.SET_NULL, null=True, blank=True, related_name='published_templates'
+    )
+    is_shared = models.BooleanField(default=False)  # Usable by every user, not only its creator
+    schema = models.JSONField(default=list, editable=False)
+    section_count = models.PositiveIntegerField(default=0, editable=False)
+    question_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.title} (template)"
+
+
 # ------------------------
 # Responses
 # ------------------------
 class FeedbackResponse(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     form = models.ForeignKey(FeedbackForm, on_delete=models.CASCADE, related_name='responses')
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)  # Set explicitly for buffered submissions, see ingest.py
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
+    form_version = models.ForeignKey(
+        'FormVersion', on_delete=models.SET_NULL, null=True, blank=True, related_name='responses'
+    )  # Schema the respondent answered; None for responses stored before versioning
+    section_path = models.JSONField(default=list, blank=True)  # Ids of the sections the respondent went through, in order
+    is_complete = models.BooleanField(null=True, blank=True)  # Every question on that path answered; None for responses not traced yet
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)  # Idempotency-Key header of the submission, if any
 
     class Meta:
         ordering = ['-submitted_at']
+        indexes = [
+            # A form's responses by date: listings, exports, date filters
+            models.Index(fields=['form', '-submitted_at'], name='response_form_submitted_idx'),
+        ]
+        constraints = [
+            # A retried submission never creates a second response
+            models.UniqueConstraint(
+                fields=['form', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='response_form_idempotency_key_uniq',
+            ),
+        ]
 
     def __str__(self):
         return f"Response to {self.form.title} - {self.submitted_at}"
@@ -158,74 +282,342 @@ class FeedbackResponse(models.Model):
 
 class Answer(models.Model):
     response = models.ForeignKey(FeedbackResponse, on_delete=models.CASCADE, related_name='answers')
-    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    # Answers outlive their question: the id is kept in question_ref and the
+    # text/type resolved from the response's FormVersion snapshot
+    question = models.ForeignKey(Question, on_delete=models.SET_NULL, null=True)
+    question_ref = models.IntegerField(null=True, blank=True, editable=False)  # Id of the question answered
     answer_text = models.TextField()
     answer_value = models.JSONField(default=dict, blank=True)  # For structured answers
 
     class Meta:
         unique_together = ['response', 'question']
+        indexes = [
+            # Covers the grouped (question, answer_text) counts behind analytics.
+            # Created on SQLite only, see migration 0010.
+            models.Index(fields=['question', 'answer_text'], name='answer_question_text_idx'),
+        ]
 
     def __str__(self):
+        if self.question is None:
+            return f"Answer to deleted question {self.question_ref}"
         return f"Answer to {self.question.text[:30]}"
 
 
+class SectionFunnel(models.Model):
+    """Running reach counters of one section, maintained as responses arrive (see funnel.py)"""
+    form = models.ForeignKey(FeedbackForm, on_delete=models.CASCADE, related_name='section_funnels')
+    section = models.OneToOneField(Section, on_delete=models.CASCADE, related_name='funnel')
+    reached = models.PositiveIntegerField(default=0)  # Responses whose path went through the section
+    completed = models.PositiveIntegerField(default=0)  # ... and answered all of its questions
+    exited = models.PositiveIntegerField(default=0)  # ... and whose path ended there
+
+    def __str__(self):
+        return f"Funnel of {self.section_id}: {self.reached} reached"
+
+
+class TermFrequency(models.Model):
+    """
+    Term and phrase counts of one text question, kept in constant space
+    as answers arrive (see text_analytics.py): a count-min sketch packed
+    into ``counters`` plus the current top terms and two-word phrases.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='term_frequency')
+    answers_seen = models.PositiveIntegerField(default=0)
+    terms_seen = models.BigIntegerField(default=0)  # Sketch increments, for the error bound
+    counters = models.BinaryField(default=bytes)
+    top_terms = models.JSONField(default=dict, blank=True)
+    top_phrases = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Term frequency of question {self.question_id}"
+
+
+class RespondentSketch(models.Model):
+    """
+    HyperLogLog registers of the distinct respondents (IP address and user
+    agent) of one form on one day (see respondents.py). Days merge into
+    any longer period, and forms into totals, without rereading responses.
+    """
+    form = models.ForeignKey(FeedbackForm, on_delete=models.CASCADE, related_name='respondent_sketches')
+    day = models.DateField()
+    registers = models.BinaryField(default=bytes)
+    responses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['form', 'day']
+        ordering = ['form', 'day']
+
+    def __str__(self):
+        return f"Respondents of {self.form_id} on {self.day}"
+
+
 class FormAnalytics(models.Model):
+    RATING_TYPES = ['rating', 'rating_10']
+    CHOICE_TYPES = ['radio', 'checkbox', 'yes_no', 'dropdown']
+    FREE_TEXT_TYPES = ['text', 'textarea', 'email', 'phone']
+
     form = models.OneToOneField(FeedbackForm, on_delete=models.CASCADE, related_name='analytics')
     total_responses = models.PositiveIntegerField(default=0)
     completion_rate = models.FloatField(default=0.0)
     average_rating = models.FloatField(default=0.0)
     questions_summary = models.JSONField(default=dict, blank=True)  # NEW
+    completed_responses = models.PositiveIntegerField(default=0)
+    respondent_registers = models.BinaryField(default=bytes)  # All-time HyperLogLog, see respondents.py
     last_updated = models.DateTimeField(auto_now=True)
 
+    # questions_summary holds fixed-size statistics per question: counts and
+    # histograms, and for free text the ANALYTICS_TEXT_SAMPLE_SIZE most
+    # recent answers alongside the count of all of them.
+    # record_responses folds new responses in without rereading old ones.
+
     def update_analytics(self):
+        """
+        Rebuild the stored per-question statistics for the form.
+
+        Everything is derived from a fixed number of grouped queries so the
+        cost does not grow with one query per question or per option. Exports
+        and reports read ``questions_summary`` instead of scanning answers.
+        """
         from django.db.models import Count
-        
+
         responses = self.form.responses.all()
+        questions = list(self.form.questions)
+        total_questions = len(questions)
+
         self.total_responses = responses.count()
+        self.completed_responses = 0
         self.completion_rate = 0.0
         self.average_rating = 0.0
         self.questions_summary = {}
 
-        # 🔥 FIX: Calculate total questions through sections
-        total_questions = 0
-        all_questions = []
-        for section in self.form.sections.all():
-            section_questions = section.questions.all()
-            total_questions += section_questions.count()
-            all_questions.extend(section_questions)
-
         if self.total_responses > 0 and total_questions > 0:
-            # Completion rate
-            completed_responses = responses.annotate(answer_count=Count('answers')).filter(answer_count=total_questions).count()
-            self.completion_rate = (completed_responses / self.total_responses) * 100
-
-            # Average rating
-            rating_answers = Answer.objects.filter(response__form=self.form, question__question_type__in=['rating', 'rating_10'])
-            valid_ratings = [float(a.answer_text) for a in rating_answers if a.answer_text and a.answer_text.isdigit()]
-            if valid_ratings:
-                self.average_rating = sum(valid_ratings) / len(valid_ratings)
-
-            # Per-question aggregation
-            for question in all_questions:  # 🔥 Use the collected questions
-                q_type = question.question_type
-                answers = Answer.objects.filter(question=question)
-                
-                if q_type in ['radio', 'checkbox', 'yes_no']:
-                    counts = {option: answers.filter(answer_text__icontains=option).count() for option in question.options}
-                    self.questions_summary[str(question.id)] = counts
-                
-                elif q_type in ['rating', 'rating_10']:
-                    ratings = [float(a.answer_text) for a in answers if a.answer_text and a.answer_text.isdigit()]
-                    self.questions_summary[str(question.id)] = ratings
-                
-                elif q_type in ['text', 'textarea']:
-                    self.questions_summary[str(question.id)] = [a.answer_text for a in answers]
-                
-                elif q_type in ['email', 'phone']:
-                    self.questions_summary[str(question.id)] = {"total_submissions": answers.count()}
+            # Completion rate, against the questions each respondent's path went through
+            self.completed_responses = self.count_completed_responses(responses)
+            self.completion_rate = (self.completed_responses / self.total_responses) * 100
+
+        # One grouped scan gives the answer counts and value distributions of every question
+        grouped_answers = {}
+        if self.total_responses > 0:
+            rows = Answer.objects.filter(
+                question__section__form=self.form
+            ).values('question_id', 'answer_text').annotate(count=Count('id'))
+            for row in rows:
+                grouped_answers.setdefault(row['question_id'], []).append((row['answer_text'], row['count']))
+
+        for question in questions:
+            text_sample = []
+            if self.total_responses > 0 and question.question_type in self.FREE_TEXT_TYPES:
+                text_sample = self.sample_text_answers(question)
+            self.questions_summary[str(question.id)] = self.build_question_stats(
+                question, grouped_answers.get(question.id, []), text_sample,
+            )
+
+        self._update_average_rating(questions)
+        self.save()
 
+    @classmethod
+    def record_responses(cls, form, response_ids):
+        """
+        Add newly stored responses to the form's statistics. Only the new
+        responses' answers are read, so the cost does not grow with the
+        number of responses the form already has.
+        """
+        from django.db import transaction
+
+        with transaction.atomic():
+            analytics, created = cls.objects.get_or_create(form=form)
+            if created:
+                # Nothing to add to yet: build from everything stored, new responses included
+                analytics.update_analytics()
+                return analytics
+            # Locked so concurrent submissions do not lose each other's counts
+            analytics = cls.objects.select_for_update().get(pk=analytics.pk)
+            analytics.add_responses(response_ids)
+        return analytics
+
+    def add_responses(self, response_ids):
+        from django.db.models import Count, Q
+
+        counts = FeedbackResponse.objects.filter(pk__in=response_ids).aggregate(
+            total=Count('pk'), completed=Count('pk', filter=Q(is_complete=True)),
+        )
+        questions = list(self.form.questions)
+        question_map = {question.id: question for question in questions}
+
+        self.total_responses += counts['total']
+        self.completed_responses += counts['completed']
+        self.completion_rate = (
+            self.completed_responses / self.total_responses * 100 if self.total_responses and questions else 0.0
+        )
+
+        rows = Answer.objects.filter(response_id__in=response_ids).values_list(
+            'question_id', 'answer_text', 'response__submitted_at'
+        )
+        for question_id, answer_text, submitted_at in rows:
+            question = question_map.get(question_id)
+            if question is None:
+                continue
+            key = str(question_id)
+            stats = self.questions_summary.get(key)
+            if stats is None or stats.get('question_type') != question.question_type:
+                # New question, or its type changed since the last rebuild
+                stats = self.build_question_stats(question, [])
+            self.questions_summary[key] = self.add_answer_to_stats(question, stats, answer_text, submitted_at)
+
+        self._update_average_rating(questions)
         self.save()
 
+    def _update_average_rating(self, questions):
+        rating_sum = 0
+        rating_count = 0
+        for question in questions:
+            if question.question_type in self.RATING_TYPES:
+                stats = self.questions_summary.get(str(question.id), {})
+                rating_sum += stats.get('rating_sum', 0)
+                rating_count += stats.get('rating_count', 0)
+        self.average_rating = rating_sum / rating_count if rating_count else 0.0
+
+    @staticmethod
+    def text_sample_size():
+        from django.conf import settings
+        return getattr(settings, 'ANALYTICS_TEXT_SAMPLE_SIZE', 100)
+
+    @staticmethod
+    def _sample_entry(answer_text, submitted_at):
+        from django.conf import settings
+        max_length = getattr(settings, 'ANALYTICS_TEXT_MAX_LENGTH', 500)
+        return {'text': answer_text[:max_length], 'submitted_at': submitted_at.isoformat()}
+
+    def sample_text_answers(self, question):
+        """The question's most recent non-empty answers, newest first"""
+        rows = Answer.objects.filter(question=question).exclude(answer_text='').order_by(
+            '-response__submitted_at', '-id'
+        ).values_list('answer_text', 'response__submitted_at')[:self.text_sample_size()]
+        return [self._sample_entry(answer_text, submitted_at) for answer_text, submitted_at in rows]
+
+    def count_completed_responses(self, responses):
+        """Responses that answered every question on their path through the form's sections"""
+        from django.db.models import Count, Q
+        from .navigation import get_graph
+
+        counts = responses.aggregate(
+            completed=Count('pk', filter=Q(is_complete=True)),
+            untraced=Count('pk', filter=Q(is_complete__isnull=True)),
+        )
+        if not counts['untraced']:
+            return counts['completed']
+
+        # Responses stored before paths were recorded: walk their paths from the answers
+        untraced = Answer.objects.filter(response__form=self.form, response__is_complete__isnull=True)
+        graph = get_graph(self.form)
+        answers = {}
+        for response_id, question_id in untraced.values_list('response_id', 'question_id'):
+            answers.setdefault(response_id, {})[question_id] = ''
+        branching_questions = [question_id for branches in graph.branches for question_id, _, _ in branches]
+        for response_id, question_id, answer_text in untraced.filter(
+            question_id__in=branching_questions
+        ).values_list('response_id', 'question_id', 'answer_text'):
+            answers[response_id][question_id] = answer_text
+        return counts['completed'] + sum(
+            1 for response_answers in answers.values() if graph.is_complete(response_answers)
+        )
+
+    @classmethod
+    def build_question_stats(cls, question, grouped_answers, text_sample=()):
+        """Fold the grouped (answer_text, count) rows of one question into its stored statistics"""
+        q_type = question.question_type
+        stats = {
+            'question_type': q_type,
+            'response_count': sum(count for _, count in grouped_answers),
+        }
+
+        if q_type in cls.RATING_TYPES:
+            max_rating = 10 if q_type == 'rating_10' else 5
+            distribution = {str(i): 0 for i in range(1, max_rating + 1)}
+            for answer_text, count in grouped_answers:
+                value = (answer_text or '').strip()
+                if value in distribution:
+                    distribution[value] += count
+            rating_count = sum(distribution.values())
+            rating_sum = sum(int(value) * count for value, count in distribution.items())
+            stats.update({
+                'max_rating': max_rating,
+                'distribution': distribution,
+                'rating_sum': rating_sum,
+                'rating_count': rating_count,
+                'average_rating': rating_sum / rating_count if rating_count else 0.0,
+            })
+
+        elif q_type in cls.CHOICE_TYPES:
+            options = question.options if isinstance(question.options, list) else []
+            distribution = {str(option): 0 for option in options}
+            total_selections = 0
+            for answer_text, count in grouped_answers:
+                if q_type == 'checkbox':
+                    selected = [opt.strip() for opt in (answer_text or '').split(',') if opt.strip()]
+                else:
+                    selected = [(answer_text or '').strip()] if (answer_text or '').strip() else []
+                for option in selected:
+                    distribution[option] = distribution.get(option, 0) + count
+                    total_selections += count
+            stats.update({
+                'distribution': distribution,
+                'total_selections': total_selections,
+            })
+
+        elif q_type in cls.FREE_TEXT_TYPES:
+            stats.update({
+                'answers_seen': sum(count for answer_text, count in grouped_answers if answer_text),
+                'answers': list(text_sample),
+            })
+
+        return stats
+
+    @classmethod
+    def add_answer_to_stats(cls, question, stats, answer_text, submitted_at):
+        """Stored statistics of a question with one more answer counted"""
+        q_type = question.question_type
+        stats['response_count'] += 1
+        value = (answer_text or '').strip()
+
+        if q_type in cls.RATING_TYPES:
+            if value in stats['distribution']:
+                stats['distribution'][value] += 1
+                stats['rating_sum'] += int(value)
+                stats['rating_count'] += 1
+                stats['average_rating'] = stats['rating_sum'] / stats['rating_count']
+
+        elif q_type in cls.CHOICE_TYPES:
+            if q_type == 'checkbox':
+                selected = [opt.strip() for opt in value.split(',') if opt.strip()]
+            else:
+                selected = [value] if value else []
+            for option in selected:
+                stats['distribution'][option] = stats['distribution'].get(option, 0) + 1
+                stats['total_selections'] += 1
+
+        elif q_type in cls.FREE_TEXT_TYPES and answer_text:
+            # Stored before answers were counted, with every answer
+            stats.setdefault('answers_seen', len(stats['answers']))
+            stats['answers_seen'] += 1
+            # Keep the most recent answers; buffered submissions can arrive out of order
+            sample = stats['answers'] + [cls._sample_entry(answer_text, submitted_at)]
+            sample.sort(key=lambda item: item['submitted_at'], reverse=True)
+            stats['answers'] = sample[:cls.text_sample_size()]
+
+        return stats
+
+    def get_question_stats(self, question):
+        """Stored statistics for a question, or an empty record if it has none yet"""
+        return self.questions_summary.get(str(question.id)) or {
+            'question_type': question.question_type,
+            'response_count': 0,
+            'distribution': {},
+            'answers_seen': 0,
+            'answers': [],
+        }
+
 
 
 class Notification(models.Model):
@@ -247,6 +639,53 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread counts, unread listings and mark-all-read
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+            # Per-user listing, newest first
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            # Retention scan for old read notifications
+            models.Index(fields=['is_read', 'created_at'], name='notif_read_created_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.notification_type} - {self.title}"
\ No newline at end of file
+        return f"{self.notification_type} - {self.title}"
+
+
+class PendingNotification(models.Model):
+    """A new response waiting to be folded into its form owner's next digest (see notifications.py)"""
+    user = models.ForeignKey("feedback_app.CustomUser", on_delete=models.CASCADE, related_name='pending_notifications')
+    form = models.ForeignKey(FeedbackForm, on_delete=models.CASCADE, related_name='pending_notifications')
+    response_id = models.UUIDField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Due digests: the oldest pending response of each (user, form)
+            models.Index(fields=['created_at'], name='pendnotif_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pending notification of response {self.response_id}"
+
+
+class ArchivedNotification(models.Model):
+    """Read notifications moved out of the hot table by archive_notifications"""
+    id = models.BigIntegerField(primary_key=True)  # Same id as the original notification
+    user = models.ForeignKey("feedback_app.CustomUser", on_delete=models.CASCADE, related_name='archived_notifications')
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archnotif_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.notification_type} - {self.title} (archived)"
\ No newline at end of file
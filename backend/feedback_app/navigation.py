@@ -0,0 +1,266 @@
+"""
+Compiled section navigation.
+
+A respondent moves through a form's sections in order unless a branching
+question sends them elsewhere: the first question of a section (in order)
+with option navigation whose selected option has a linked section decides,
+otherwise the section's next_section_on_submit, otherwise the following
+section. This mirrors PublicFeedbackForm on the frontend.
+
+get_graph compiles that into index-based adjacency arrays once per
+schema_version and caches it, so the path of a response, and with it the
+questions the respondent could actually have seen, costs O(path length)
+instead of a walk over the whole schema.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Question, QuestionOption, Section
+
+
+BRANCHING_TYPES = ('radio', 'dropdown', 'yes_no', 'checkbox')
+
+
+def _cache_key(form):
+    return f"form:nav:{form.pk}:{form.schema_version}"
+
+
+def get_graph(form):
+    """The compiled navigation graph of ``form``, cached per schema version"""
+    key = _cache_key(form)
+    graph = cache.get(key)
+    if graph is None:
+        graph = compile_graph(form)
+        cache.set(key, graph, getattr(settings, 'NAVIGATION_CACHE_TIMEOUT', 24 * 60 * 60))
+    return graph
+
+
+def compile_graph(form):
+    sections = list(
+        Section.objects.filter(form=form).order_by('order', 'id').values_list(
+            'id', 'frontend_id', 'title', 'next_section_on_submit_id'
+        )
+    )
+    questions = list(
+        Question.objects.filter(section__form=form).order_by('order', 'id').values_list(
+            'id', 'section_id', 'text', 'question_type', 'is_required', 'options', 'enable_option_navigation'
+        )
+    )
+    option_links = list(
+        QuestionOption.objects.filter(
+            question__section__form=form, question__enable_option_navigation=True
+        ).order_by('id').values_list('question_id', 'next_section_id')
+    )
+    return NavigationGraph(sections, questions, option_links)
+
+
+def answers_by_question(submitted_answers):
+    """{question id: answer text} from submitted answer dicts"""
+    return {answer.get('question'): answer.get('answer_text') or '' for answer in submitted_answers}
+
+
+class NavigationGraph:
+    """
+    Sections are addressed by their position in the form. ``successors``
+    holds every section each one can lead to, ``topological_order`` is None
+    when the branching contains a cycle (listed in ``cycles``) and
+    ``reachable[i]`` is a bitmask of the sections reachable from section i.
+    """
+
+    def __init__(self, sections, questions, option_links):
+        self.section_ids = [section_id for section_id, _, _, _ in sections]
+        self.section_frontend_ids = [frontend_id for _, frontend_id, _, _ in sections]
+        self.section_titles = [title for _, _, title, _ in sections]
+        index = {section_id: i for i, section_id in enumerate(self.section_ids)}
+        count = len(self.section_ids)
+
+        self.next_default = []
+        for i, (_, _, _, next_section_id) in enumerate(sections):
+            if next_section_id in index:
+                self.next_default.append(index[next_section_id])
+            else:
+                self.next_default.append(i + 1 if i + 1 < count else None)
+
+        links_by_question = {}
+        for question_id, next_section_id in option_links:
+            links_by_question.setdefault(question_id, []).append(index.get(next_section_id))
+
+        self.section_questions = [[] for _ in range(count)]
+        self.branches = [[] for _ in range(count)]
+        self.question_text = {}
+        self.required = set()
+        for question_id, section_id, text, question_type, is_required, options, navigates in questions:
+            if section_id not in index:
+                continue
+            i = index[section_id]
+            self.section_questions[i].append(question_id)
+            self.question_text[question_id] = text
+            if is_required:
+                self.required.add(question_id)
+            if navigates and question_type in BRANCHING_TYPES and isinstance(options, list):
+                # Option links line up with the question's options by position
+                targets = {}
+                for option, target in zip(options, links_by_question.get(question_id, [])):
+                    if target is not None:
+                        targets.setdefault(str(option), target)
+                if targets:
+                    self.branches[i].append((question_id, question_type == 'checkbox', targets))
+
+        self.successors = []
+        for i in range(count):
+            targets = {target for _, _, option_targets in self.branches[i] for target in option_targets.values()}
+            if self.next_default[i] is not None:
+                targets.add(self.next_default[i])
+            self.successors.append(sorted(targets))
+
+        self.is_branching = any(self.branches)
+        self.topological_order = self._topological_order()
+        self.cycles = self._cycles() if self.topological_order is None else []
+        self.reachable = self._reachable()
+
+    # ---- analysis ----
+
+    def _topological_order(self):
+        """Kahn's algorithm over the section graph; None if there is a cycle"""
+        count = len(self.section_ids)
+        indegree = [0] * count
+        for targets in self.successors:
+            for target in targets:
+                indegree[target] += 1
+        ready = [i for i in range(count) if indegree[i] == 0]
+        order = []
+        while ready:
+            i = ready.pop()
+            order.append(i)
+            for target in self.successors[i]:
+                indegree[target] -= 1
+                if not indegree[target]:
+                    ready.append(target)
+        return order if len(order) == count else None
+
+    def _cycles(self):
+        """Strongly connected components that contain a cycle (Tarjan, iterative)"""
+        count = len(self.section_ids)
+        order = [None] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(count):
+            if order[root] is not None:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child = work.pop()
+                if child == 0:
+                    order[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                successors = self.successors[node]
+                if child < len(successors):
+                    work.append((node, child + 1))
+                    target = successors[child]
+                    if order[target] is None:
+                        work.append((target, 0))
+                    elif on_stack[target]:
+                        low[node] = min(low[node], order[target])
+                    continue
+                if low[node] == order[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.successors[node]:
+                        components.append(sorted(component))
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+        return components
+
+    def _reachable(self):
+        """Bitmask of the sections reachable from each section, itself included"""
+        reachable = []
+        for start in range(len(self.section_ids)):
+            mask = 1 << start
+            pending = [start]
+            while pending:
+                for target in self.successors[pending.pop()]:
+                    if not mask >> target & 1:
+                        mask |= 1 << target
+                        pending.append(target)
+            reachable.append(mask)
+        return reachable
+
+    def unreachable_sections(self):
+        """Positions of sections no respondent can get to"""
+        if not self.section_ids:
+            return []
+        return [i for i in range(len(self.section_ids)) if not self.reachable[0] >> i & 1]
+
+    # ---- respondent paths ----
+
+    def _next(self, i, answers):
+        for question_id, is_checkbox, targets in self.branches[i]:
+            answer = answers.get(question_id)
+            if not answer:
+                continue
+            selected = [option.strip() for option in answer.split(',')] if is_checkbox else [answer.strip()]
+            for option in selected:
+                if option in targets:
+                    return targets[option]
+        return self.next_default[i]
+
+    def path(self, answers):
+        """Section positions visited by a respondent with ``answers`` ({question id: answer text})"""
+        if not self.section_ids:
+            return []
+        path = []
+        seen = 0
+        i = 0
+        # A cyclic form would loop the respondent; each section counts once
+        while i is not None and not seen >> i & 1:
+            seen |= 1 << i
+            path.append(i)
+            i = self._next(i, answers)
+        return path
+
+    def path_questions(self, answers):
+        """Ids of the questions on the respondent's path, in order"""
+        return [question_id for i in self.path(answers) for question_id in self.section_questions[i]]
+
+    def missing_required(self, answers):
+        """Required questions on the respondent's path that were not answered"""
+        return [
+            question_id for question_id in self.path_questions(answers)
+            if question_id in self.required and question_id not in answers
+        ]
+
+    def is_complete(self, answers):
+        """Whether every question on the respondent's path was answered"""
+        return all(question_id in answers for question_id in self.path_questions(answers))
+
+    def describe(self):
+        """JSON-ready summary of the graph for the form builder"""
+        def ref(i):
+            return {'id': self.section_ids[i], 'frontend_id': self.section_frontend_ids[i]}
+
+        return {
+            'sections': [ref(i) for i in range(len(self.section_ids))],
+            'edges': [
+                {'from': ref(i)['id'], 'to': [self.section_ids[t] for t in targets]}
+                for i, targets in enumerate(self.successors)
+            ],
+            'is_branching': self.is_branching,
+            'topological_order': (
+                [self.section_ids[i] for i in self.topological_order]
+                if self.topological_order is not None else None
+            ),
+            'cycles': [[self.section_ids[i] for i in component] for component in self.cycles],
+            'unreachable_sections': [ref(i) for i in self.unreachable_sections()],
+        }
@@ -0,0 +1,240 @@
+"""
+Notification creation and the per-user unread counter.
+
+The unread count is kept in the cache and adjusted whenever a notification
+is created or marked read, then pushed to the user's WebSocket group inside
+the event itself. Consumers never have to COUNT notifications to refresh
+the badge; the database is only consulted when the counter is missing from
+the cache (first use, eviction or expiry).
+
+With NOTIFICATION_COALESCE_WINDOW > 0, new-response notifications are
+coalesced per (user, form) over that many seconds into a single digest
+notification and a single socket message. Each response is stored as a
+PendingNotification in the same transaction as the response itself
+(record_pending_responses), so nothing is lost if the process dies;
+`manage.py flush_notifications` writes and pushes the digests once their
+window has passed. With the default of 0 every response is notified
+immediately.
+"""
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Notification, PendingNotification
+from .consumers import build_notification_event, send_notification_to_group, send_unread_count
+
+
+# Counters expire so any drift (e.g. rows edited in the admin) heals itself
+UNREAD_COUNT_TIMEOUT = 60 * 60 * 24
+
+# Response ids kept in a digest's data; the count covers all of them
+MAX_DIGEST_RESPONSE_IDS = 50
+
+
+def _unread_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def _count_from_db(user_id):
+    count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    cache.set(_unread_key(user_id), count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def get_unread_count(user_id):
+    """Cached number of unread notifications of a user"""
+    count = cache.get(_unread_key(user_id))
+    if count is None:
+        count = _count_from_db(user_id)
+    return count
+
+
+def _adjust_unread_count(user_id, delta):
+    try:
+        count = cache.incr(_unread_key(user_id), delta)
+    except ValueError:
+        # Not cached: the database already reflects the change
+        return _count_from_db(user_id)
+    if count < 0:
+        count = 0
+        cache.set(_unread_key(user_id), count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def create_notification(user, notification_type, title, message, data=None):
+    """
+    Store a notification, bump the user's unread counter and push both to
+    the user's WebSocket group.
+    """
+    data = data or {}
+    notification = Notification.objects.create(
+        user=user,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        data=data,
+    )
+    unread_count = _adjust_unread_count(user.id, 1)
+    send_notification_to_group(
+        f"user_{user.id}",
+        notification_type,
+        title,
+        message,
+        data,
+        unread_count=unread_count,
+    )
+    return notification
+
+
+def mark_as_read(user_id, notification_id):
+    """Mark one notification read; returns the new unread count"""
+    updated = Notification.objects.filter(id=notification_id, user_id=user_id, is_read=False).update(is_read=True)
+    if not updated:
+        return get_unread_count(user_id)
+    count = _adjust_unread_count(user_id, -updated)
+    send_unread_count(f"user_{user_id}", count)
+    return count
+
+
+def mark_all_as_read(user_id):
+    """Mark every notification of a user read; the count is zero afterwards"""
+    Notification.objects.filter(user_id=user_id, is_read=False).update(is_read=True)
+    cache.set(_unread_key(user_id), 0, UNREAD_COUNT_TIMEOUT)
+    send_unread_count(f"user_{user_id}", 0)
+    return 0
+
+
+def _new_response_notification(user_id, form_id, form_title, response_ids):
+    """Build (unsaved) the notification for one or more new responses to a form"""
+    if len(response_ids) == 1:
+        return Notification(
+            user_id=user_id,
+            notification_type='new_response',
+            title='New Response Received',
+            message=f'New response received for "{form_title}"',
+            data={
+                "form_id": str(form_id),
+                "response_id": str(response_ids[0]),
+                "form_title": form_title
+            },
+        )
+    return Notification(
+        user_id=user_id,
+        notification_type='new_response',
+        title='New Responses Received',
+        message=f'{len(response_ids)} new responses to "{form_title}"',
+        data={
+            "form_id": str(form_id),
+            "form_title": form_title,
+            "response_count": len(response_ids),
+            "response_ids": [str(response_id) for response_id in response_ids[-MAX_DIGEST_RESPONSE_IDS:]],
+        },
+    )
+
+
+def flush_due_digests(window=None, now=None):
+    """
+    Turn pending responses into digests: one notification per (user, form)
+    whose oldest pending response is at least ``window`` seconds old
+    (NOTIFICATION_COALESCE_WINDOW by default), written with a single
+    bulk_create in the same transaction that removes the pending rows, then
+    pushed to each user's socket group. Returns the digests written.
+    """
+    if window is None:
+        window = getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 0)
+    cutoff = (now or timezone.now()) - timedelta(seconds=window)
+
+    with transaction.atomic():
+        due = PendingNotification.objects.values('user_id', 'form_id').annotate(
+            first=Min('created_at')
+        ).filter(first__lte=cutoff)
+        due_forms = {row['form_id'] for row in due}
+        if not due_forms:
+            return []
+        # Locked so two workers never both write the same digest
+        pending = list(
+            PendingNotification.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(form_id__in=due_forms).select_related('form').order_by('id')
+        )
+        digests = {}
+        for row in pending:
+            digests.setdefault((row.user_id, row.form_id), (row.form.title, []))[1].append(row.response_id)
+        notifications = Notification.objects.bulk_create([
+            _new_response_notification(user_id, form_id, form_title, response_ids)
+            for (user_id, form_id), (form_title, response_ids) in digests.items()
+        ])
+        PendingNotification.objects.filter(id__in=[row.id for row in pending]).delete()
+
+    new_per_user = {}
+    for notification in notifications:
+        new_per_user[notification.user_id] = new_per_user.get(notification.user_id, 0) + 1
+    unread_counts = {user_id: _adjust_unread_count(user_id, count) for user_id, count in new_per_user.items()}
+    for notification in notifications:
+        send_notification_to_group(
+            f"user_{notification.user_id}",
+            notification.notification_type,
+            notification.title,
+            notification.message,
+            notification.data,
+            unread_count=unread_counts[notification.user_id],
+        )
+    return notifications
+
+
+def coalescing():
+    return getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 0) > 0
+
+
+def record_pending_responses(created):
+    """
+    Queue new (form, response) pairs for their digest when coalescing. Call
+    it inside the transaction that stores the responses, so a response is
+    never committed without its pending notification.
+    """
+    if coalescing():
+        PendingNotification.objects.bulk_create([
+            PendingNotification(user_id=form.created_by_id, form=form, response_id=response.id)
+            for form, response in created
+        ])
+
+
+def prepare_new_response_notification(form, response):
+    """
+    Prepare the notification of a committed response without sending anything.
+
+    When coalescing, the response already joined the current window with
+    its pending row and None is returned. Otherwise the notification is
+    stored and the (group, event) to send is returned, so async callers can
+    await the channel layer themselves.
+    """
+    if coalescing():
+        return None
+
+    notification = _new_response_notification(form.created_by_id, form.id, form.title, [response.id])
+    notification.save()
+    unread_count = _adjust_unread_count(notification.user_id, 1)
+    return f"user_{notification.user_id}", build_notification_event(
+        notification.notification_type,
+        notification.title,
+        notification.message,
+        notification.data,
+        unread_count=unread_count,
+    )
+
+
+def notify_new_response(form, response):
+    """
+    Notify the form owner of a new response, coalesced with other responses
+    to the same form within NOTIFICATION_COALESCE_WINDOW seconds (see
+    flush_due_digests).
+    """
+    pending = prepare_new_response_notification(form, response)
+    if pending is not None:
+        group_name, event = pending
+        async_to_sync(get_channel_layer().group_send)(group_name, event)
@@ -0,0 +1,85 @@
+from django.db.models import Count, Max
+
+from .models import FeedbackResponse, Answer, FormAnalytics, Question
+
+
+def collect_forms_report(forms):
+    """
+    Gather everything the cross-form analytics exports need with a fixed
+    number of grouped queries, however many forms are in scope.
+
+    ``forms`` is a FeedbackForm queryset; it is evaluated once and reused as
+    a subquery for the grouped queries below.
+    """
+    form_list = list(forms)
+
+    # Responses per form, with the latest submission date
+    responses = {
+        row['form_id']: {'count': row['count'], 'last_submitted_at': row['last_submitted_at']}
+        for row in FeedbackResponse.objects.filter(form__in=forms).values('form_id').annotate(
+            count=Count('id'), last_submitted_at=Max('submitted_at')
+        ).order_by()
+    }
+
+    # Questions of every form, in section order
+    questions = {form.id: [] for form in form_list}
+    question_list = Question.objects.filter(section__form__in=forms).select_related('section').order_by(
+        'section__order', 'order'
+    )
+    for question in question_list:
+        questions.setdefault(question.section.form_id, []).append(question)
+
+    # Answers per question
+    answer_counts = {
+        row['question_id']: row['count']
+        for row in Answer.objects.filter(question__section__form__in=forms).values('question_id').annotate(
+            count=Count('id')
+        ).order_by()
+    }
+
+    # Value distributions of rating and choice questions
+    grouped_answers = {}
+    distribution_rows = Answer.objects.filter(
+        question__section__form__in=forms,
+        question__question_type__in=FormAnalytics.RATING_TYPES + FormAnalytics.CHOICE_TYPES,
+    ).values('question_id', 'answer_text').annotate(count=Count('id')).order_by()
+    for row in distribution_rows:
+        grouped_answers.setdefault(row['question_id'], []).append((row['answer_text'], row['count']))
+
+    question_stats = {}
+    for form_questions in questions.values():
+        for question in form_questions:
+            stats = FormAnalytics.build_question_stats(question, grouped_answers.get(question.id, []))
+            stats['response_count'] = answer_counts.get(question.id, 0)
+            question_stats[question.id] = stats
+
+    # Completion rate is the stored figure maintained on submission
+    completion_rates = dict(FormAnalytics.objects.filter(form__in=forms).values_list('form_id', 'completion_rate'))
+
+    form_stats = {}
+    for form in form_list:
+        rating_sum = rating_count = 0
+        for question in questions.get(form.id, []):
+            stats = question_stats[question.id]
+            if question.question_type in FormAnalytics.RATING_TYPES:
+                rating_sum += stats['rating_sum']
+                rating_count += stats['rating_count']
+        form_responses = responses.get(form.id, {})
+        form_stats[form.id] = {
+            'total_responses': form_responses.get('count', 0),
+            'last_submitted_at': form_responses.get('last_submitted_at'),
+            'total_questions': len(questions.get(form.id, [])),
+            'completion_rate': completion_rates.get(form.id, 0.0),
+            'average_rating': rating_sum / rating_count if rating_count else 0.0,
+        }
+
+    return {
+        'forms': form_list,
+        'form_stats': form_stats,
+        'questions': questions,
+        'question_stats': question_stats,
+        'total_forms': len(form_list),
+        'active_forms': sum(1 for form in form_list if form.is_active),
+        'total_questions': sum(len(qs) for qs in questions.values()),
+        'total_responses': sum(r['count'] for r in responses.values()),
+    }
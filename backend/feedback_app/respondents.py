@@ -0,0 +1,136 @@
+"""
+Distinct respondents.
+
+A respondent is an IP address and user agent pair. Each form keeps a
+HyperLogLog sketch of its respondents per day (RespondentSketch) and one
+for all time (FormAnalytics.respondent_registers), updated as responses
+are stored. Sketches merge by taking the larger register, so any range of
+days, or any set of forms, is counted without reading responses and
+without counting anyone twice.
+
+With PRECISION 12 a sketch is 4096 one-byte registers and estimates have
+a relative standard error of 1.04 / sqrt(4096), about 1.6%.
+
+Responses stored before this existed are counted with
+`manage.py rebuild_respondents`.
+"""
+import math
+from datetime import timedelta
+from hashlib import blake2b
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import FormAnalytics, RespondentSketch
+
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+STANDARD_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+
+class HyperLogLog:
+    """``REGISTERS`` registers holding the longest run of leading zero bits seen in their bucket"""
+
+    def __init__(self, registers=b''):
+        self.registers = bytearray(registers) if len(registers) == REGISTERS else bytearray(REGISTERS)
+
+    def add(self, value):
+        h = int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), 'big')
+        bucket = h >> (64 - PRECISION)
+        rest = h & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[bucket]:
+            self.registers[bucket] = rank
+
+    def merge(self, other):
+        """Fold in another sketch (``HyperLogLog`` or stored registers); self then counts the union"""
+        registers = other.registers if isinstance(other, HyperLogLog) else other
+        if len(registers) == REGISTERS:
+            self.registers = bytearray(map(max, self.registers, registers))
+        return self
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / REGISTERS)
+        estimate = alpha * REGISTERS * REGISTERS / sum(2.0 ** -rank for rank in self.registers)
+        empty = self.registers.count(0)
+        if estimate <= 2.5 * REGISTERS and empty:
+            # Few respondents: linear counting over the empty registers is more accurate
+            estimate = REGISTERS * math.log(REGISTERS / empty)
+        return round(estimate)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+
+def respondent_key(ip_address, user_agent):
+    return f"{ip_address or ''}|{user_agent or ''}"
+
+
+def record(form_id, responses):
+    """Count newly stored responses (objects with ip_address, user_agent and submitted_at) of one form"""
+    by_day = {}
+    for response in responses:
+        day = timezone.localdate(response.submitted_at)
+        by_day.setdefault(day, []).append(respondent_key(response.ip_address, response.user_agent))
+    if not by_day:
+        return
+
+    with transaction.atomic():
+        RespondentSketch.objects.bulk_create(
+            [RespondentSketch(form_id=form_id, day=day) for day in by_day], ignore_conflicts=True
+        )
+        # Locked so concurrent submissions do not lose each other's registers
+        sketches = list(RespondentSketch.objects.select_for_update().filter(form_id=form_id, day__in=by_day))
+        all_time = HyperLogLog(
+            FormAnalytics.objects.select_for_update().filter(form_id=form_id).values_list(
+                'respondent_registers', flat=True
+            ).first() or b''
+        )
+        for sketch in sketches:
+            day_sketch = HyperLogLog(bytes(sketch.registers))
+            for key in by_day[sketch.day]:
+                day_sketch.add(key)
+                all_time.add(key)
+            sketch.registers = day_sketch.to_bytes()
+            sketch.responses += len(by_day[sketch.day])
+        RespondentSketch.objects.bulk_update(sketches, ['registers', 'responses'])
+        FormAnalytics.objects.filter(form_id=form_id).update(respondent_registers=all_time.to_bytes())
+
+
+def _summary(sketch, responses):
+    estimate = sketch.count()
+    return {
+        'estimate': estimate,
+        'standard_error': round(STANDARD_ERROR, 4),
+        # About 95% of estimates fall within two standard errors
+        'low': max(0, math.floor(estimate * (1 - 2 * STANDARD_ERROR))),
+        'high': math.ceil(estimate * (1 + 2 * STANDARD_ERROR)),
+        'responses': responses,
+        'repeat_responses': max(0, responses - estimate),
+    }
+
+
+def form_respondents(analytics, days=30):
+    """Distinct respondents of a form overall and on each of its last ``days`` days with responses"""
+    summary = _summary(HyperLogLog(bytes(analytics.respondent_registers)), analytics.total_responses)
+    since = timezone.localdate() - timedelta(days=days - 1)
+    summary['daily'] = [
+        {'day': sketch.day, **_summary(HyperLogLog(bytes(sketch.registers)), sketch.responses)}
+        for sketch in RespondentSketch.objects.filter(form_id=analytics.form_id, day__gte=since)
+    ]
+    return summary
+
+
+def respondents_across(forms, day=None):
+    """Distinct respondents over ``forms`` (a queryset), all time or on one ``day``"""
+    merged = HyperLogLog()
+    responses = 0
+    if day is None:
+        rows = FormAnalytics.objects.filter(form__in=forms).values_list('respondent_registers', 'total_responses')
+    else:
+        rows = RespondentSketch.objects.filter(form__in=forms, day=day).values_list('registers', 'responses')
+    for registers, count in rows:
+        merged.merge(bytes(registers))
+        responses += count
+    return _summary(merged, responses)
@@ -0,0 +1,141 @@
+"""
+Full-text search over free-text answers.
+
+On SQLite, text and textarea answers are copied into an FTS5 table
+(feedback_app_answer_search) by triggers on feedback_app_answer, so every
+way an answer is written (public submit, queued ingest, admin) keeps the
+index current inside the same transaction. On PostgreSQL a GIN index over
+to_tsvector('english', answer_text) serves the same queries. Both are
+created by migration 0015.
+
+Matching, ranking and snippet highlighting run inside the database; the
+answers on the page are then loaded in one query.
+"""
+from html import escape
+
+from django.db import connections, router
+
+from .models import Answer
+from .versions import answered_question_meta
+
+
+SEARCH_TABLE = 'feedback_app_answer_search'
+TEXT_QUESTION_TYPES = ('text', 'textarea')
+
+# Snippet boundaries, replaced by <mark> once the answer text is escaped
+_START, _STOP = '\x02', '\x03'
+
+
+def _fts5_query(query):
+    """FTS5 MATCH expression for free user input: every term must appear, ``term*`` matches a prefix"""
+    terms = []
+    for word in query.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms)
+
+
+def _highlight(snippet):
+    return escape(snippet or '').replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def _sqlite_hits(cursor, query, owner_id, form_id, limit, offset):
+    match = _fts5_query(query)
+    if not match:
+        return []
+    sql = [
+        f"SELECT s.rowid, snippet({SEARCH_TABLE}, 0, %s, %s, '…', 16), bm25({SEARCH_TABLE})",
+        f"FROM {SEARCH_TABLE} s WHERE {SEARCH_TABLE} MATCH %s",
+    ]
+    params = [_START, _STOP, match]
+    if form_id is not None:
+        sql.append("AND s.form_id = %s")
+        params.append(form_id.hex)
+    if owner_id is not None:
+        sql.append("AND s.form_id IN (SELECT id FROM feedback_app_feedbackform WHERE created_by_id = %s)")
+        params.append(owner_id)
+    # bm25() is lower for better matches
+    sql.append("ORDER BY 3 LIMIT %s OFFSET %s")
+    params += [limit, offset]
+    cursor.execute(' '.join(sql), params)
+    return [(answer_id, snippet, -rank) for answer_id, snippet, rank in cursor.fetchall()]
+
+
+def _postgres_hits(cursor, query, owner_id, form_id, limit, offset):
+    # The tsvector expression must match the GIN index definition exactly
+    sql = [
+        "SELECT a.id,",
+        "ts_headline('english', a.answer_text, q, %s),",
+        "ts_rank(to_tsvector('english', a.answer_text), q)",
+        "FROM feedback_app_answer a",
+        "JOIN feedback_app_feedbackresponse r ON r.id = a.response_id",
+        "LEFT JOIN feedback_app_question qu ON qu.id = a.question_id,",
+        "websearch_to_tsquery('english', %s) q",
+        "WHERE to_tsvector('english', a.answer_text) @@ q",
+        "AND (qu.question_type = ANY(%s) OR a.question_id IS NULL)",
+    ]
+    params = [f'StartSel={_START}, StopSel={_STOP}, MaxWords=32, MinWords=8', query, list(TEXT_QUESTION_TYPES)]
+    if form_id is not None:
+        sql.append("AND r.form_id = %s")
+        params.append(form_id)
+    if owner_id is not None:
+        sql.append("AND r.form_id IN (SELECT id FROM feedback_app_feedbackform WHERE created_by_id = %s)")
+        params.append(owner_id)
+    sql.append("ORDER BY 3 DESC LIMIT %s OFFSET %s")
+    params += [limit, offset]
+    cursor.execute(' '.join(sql), params)
+    return cursor.fetchall()
+
+
+def _hits(using, query, owner_id, form_id, limit, offset):
+    """(answer id, raw snippet, rank) of the best matches"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            return _postgres_hits(cursor, query, owner_id, form_id, limit, offset)
+        return _sqlite_hits(cursor, query, owner_id, form_id, limit, offset)
+
+
+def search(query, owner_id=None, form_id=None, limit=20, offset=0):
+    """
+    Best matching free-text answers for ``query``, best first.
+
+    ``owner_id`` restricts the search to forms created by that user and
+    ``form_id`` (a UUID) to one form. Snippets are HTML-escaped with the
+    matched terms wrapped in <mark>.
+    """
+    using = router.db_for_read(Answer)
+    hits = _hits(using, query, owner_id, form_id, limit, offset)
+    if not hits:
+        return []
+
+    answers = Answer.objects.using(using).select_related('question', 'response__form').in_bulk(
+        [answer_id for answer_id, _, _ in hits]
+    )
+    results = []
+    for answer_id, snippet, rank in hits:
+        answer = answers.get(answer_id)
+        if answer is None:
+            continue
+        response = answer.response
+        question = answered_question_meta(answer, response.form_version_id)
+        results.append({
+            'answer_id': answer.id,
+            'response_id': response.id,
+            'form_id': response.form_id,
+            'form_title': response.form.title,
+            'question_id': answer.question_ref,
+            'question_text': question['text'],
+            'submitted_at': response.submitted_at,
+            'snippet': _highlight(snippet),
+            'rank': round(float(rank), 4),
+        })
+    return results
+
+
+def matching_answer_ids(query, limit=1000):
+    """Ids of the answers matching ``query``, for narrowing querysets (admin search)"""
+    hits = _hits(router.db_for_read(Answer), query, None, None, limit, 0)
+    return [answer_id for answer_id, _, _ in hits]
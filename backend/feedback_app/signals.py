@@ -0,0 +1,77 @@
+from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user_tokens
+from .form_builder import in_bulk_write
+from .models import CustomUser, FeedbackForm, FeedbackResponse, Section, Question, QuestionOption
+
+
+# ------------------------
+# Form data version
+# ------------------------
+# Any change to a form's schema advances its schema version (checked by
+# schema patches, see form_builder.apply_operations) and its data version so
+# cached exports and ETags keyed on the old version are never served again.
+# New responses bump the data version in FeedbackResponseCreateSerializer.create
+# once their answers are written, deleted ones here. Builder saves and
+# patches bump both once for the whole write.
+
+@receiver(post_save, sender=FeedbackForm)
+def bump_form_version_on_save(sender, instance, created, **kwargs):
+    if not created:
+        FeedbackForm.bump_data_version(instance.pk)
+
+
+@receiver(post_delete, sender=FeedbackResponse)
+def bump_form_version_on_response_delete(sender, instance, **kwargs):
+    FeedbackForm.bump_data_version(instance.form_id)
+
+
+@receiver([post_save, post_delete], sender=Section)
+def bump_form_version_on_section_change(sender, instance, **kwargs):
+    if in_bulk_write():
+        return
+    FeedbackForm.bump_schema_version(instance.form_id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def bump_form_version_on_question_change(sender, instance, **kwargs):
+    if in_bulk_write():
+        return
+    FeedbackForm.objects.filter(sections__pk=instance.section_id).update(
+        schema_version=models.F('schema_version') + 1,
+        data_version=models.F('data_version') + 1,
+        data_updated_at=timezone.now(),
+    )
+
+
+@receiver([post_save, post_delete], sender=QuestionOption)
+def bump_form_version_on_option_change(sender, instance, **kwargs):
+    if in_bulk_write():
+        return
+    FeedbackForm.objects.filter(sections__questions__pk=instance.question_id).update(
+        schema_version=models.F('schema_version') + 1,
+        data_version=models.F('data_version') + 1,
+        data_updated_at=timezone.now(),
+    )
+
+
+# ------------------------
+# Token authentication cache
+# ------------------------
+# Logout and user deletes remove tokens; approval changes and other user
+# edits save the user. Either way the cached token -> user entry is dropped.
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_cached_user_tokens(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_user_tokens(instance.pk)
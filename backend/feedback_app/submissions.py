@@ -0,0 +1,244 @@
+"""
+Public form submission, shared by the synchronous PublicFeedbackFormView
+and the async public_feedback_submit view.
+
+Submissions are written directly (save_submission) or, with
+SUBMISSION_INGEST_MODE = 'buffered', queued for the batch writer
+(enqueue_submission, see ingest.py). Before either, the views apply the
+rate limits in throttling.py and a SubmissionGuard, which turns client
+retries (same Idempotency-Key header) and identical resubmissions within
+SUBMISSION_DEDUP_WINDOW seconds into the response already stored.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from . import funnel
+from . import ingest
+from . import navigation
+from . import notifications
+from . import respondents
+from . import text_analytics
+from . import versions
+from .models import FeedbackResponse, FormAnalytics
+from .serializers import FeedbackResponseCreateSerializer
+
+
+IN_PROGRESS = 'pending'
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+
+
+class DuplicateSubmission(Exception):
+    """A concurrent request with the same Idempotency-Key stored its response first"""
+
+    def __init__(self, response_id):
+        super().__init__(response_id)
+        self.response_id = str(response_id)
+
+
+def client_ip(request):
+    """
+    The client address for rate limits and deduplication. X-Forwarded-For
+    is written by the client as much as by proxies, so only the entry added
+    by the outermost of SUBMISSION_NUM_PROXIES trusted proxies is used;
+    with none, the peer address.
+    """
+    num_proxies = getattr(settings, 'SUBMISSION_NUM_PROXIES', 0)
+    if num_proxies:
+        forwarded = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if forwarded:
+            return forwarded[-min(num_proxies, len(forwarded))]
+    return request.META.get('REMOTE_ADDR')
+
+
+class SubmissionGuard:
+    """
+    Claims a submission before it is written so duplicates are not.
+
+    ``claim()`` returns None when the submission is new, otherwise the id
+    of the response it duplicates, or IN_PROGRESS while that one is still
+    being written. After the write call ``complete(response_id)``, or
+    ``release()`` if nothing was stored.
+    """
+
+    def __init__(self, form, submitted_answers, request):
+        self.form = form
+        self.idempotency_key = request.headers.get('Idempotency-Key') or None
+        self.claimed = []
+
+        self.keys = []
+        if self.idempotency_key:
+            digest = hashlib.sha256(self.idempotency_key.encode()).hexdigest()
+            self.keys.append((
+                f"submit:idem:{form.id}:{digest}",
+                getattr(settings, 'SUBMISSION_IDEMPOTENCY_TTL', 24 * 60 * 60),
+            ))
+        window = getattr(settings, 'SUBMISSION_DEDUP_WINDOW', 60)
+        if window:
+            content = json.dumps([
+                str(form.id),
+                client_ip(request),
+                request.META.get('HTTP_USER_AGENT', ''),
+                sorted(
+                    [str(answer.get('question')), str(answer.get('answer_text', ''))]
+                    for answer in submitted_answers
+                ),
+            ])
+            self.keys.append((f"submit:dup:{hashlib.sha256(content.encode()).hexdigest()}", window))
+
+    def key_error(self):
+        if self.idempotency_key and len(self.idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            return {'error': f'Idempotency-Key must be at most {MAX_IDEMPOTENCY_KEY_LENGTH} characters'}
+        return None
+
+    def claim(self):
+        if self.idempotency_key:
+            # Retries after the cache entry expired, or from another process with a local cache
+            stored = FeedbackResponse.objects.filter(
+                form=self.form, idempotency_key=self.idempotency_key
+            ).values_list('id', flat=True).first()
+            if stored is not None:
+                return str(stored)
+
+        for key, timeout in self.keys:
+            if not cache.add(key, IN_PROGRESS, timeout):
+                self.release()
+                return cache.get(key) or IN_PROGRESS
+            self.claimed.append((key, timeout))
+        return None
+
+    def complete(self, response_id):
+        for key, timeout in self.claimed:
+            cache.set(key, str(response_id), timeout)
+        self.claimed = []
+
+    def release(self):
+        cache.delete_many([key for key, _ in self.claimed])
+        self.claimed = []
+
+
+def validate_answers(graph, submitted_answers):
+    """
+    Check a submission against the form's compiled navigation graph
+    (navigation.get_graph).
+
+    Returns an error payload for a 400 response, or None if every required
+    question on the respondent's path is answered and every answer belongs
+    to the form. Required questions in sections the respondent's answers
+    branched past are not demanded.
+    """
+    answers = navigation.answers_by_question(submitted_answers)
+
+    missing_required = [
+        {'question_id': question_id, 'question_text': graph.question_text[question_id]}
+        for question_id in graph.missing_required(answers)
+    ]
+    if missing_required:
+        return {
+            'error': 'Missing required questions',
+            'missing_questions': missing_required
+        }
+
+    invalid_questions = [
+        answer.get('question') for answer in submitted_answers
+        if answer.get('question') not in graph.question_text
+    ]
+    if invalid_questions:
+        return {
+            'error': 'Invalid questions submitted',
+            'invalid_questions': invalid_questions
+        }
+    return None
+
+
+def save_submission(form, submitted_answers, request, idempotency_key=None):
+    """
+    Validate and store a response with its path through the form, updating
+    the section funnel and refreshing the form's analytics in the same
+    transaction so a new data version is never visible alongside stale
+    statistics.
+
+    Returns (response, None) on success and (None, serializer errors)
+    otherwise. Raises DuplicateSubmission when another request with the
+    same idempotency key stored its response in the meantime.
+    """
+    serializer = FeedbackResponseCreateSerializer(
+        data={'form': form.id, 'answers': submitted_answers},
+        context={'request': request}
+    )
+    if not serializer.is_valid():
+        return None, serializer.errors
+
+    response_trace = funnel.trace(form, {
+        answer['question'].id: answer.get('answer_text', '') for answer in serializer.validated_data['answers']
+    })
+    form_version_id = versions.current_version_id(form)
+    try:
+        with transaction.atomic():
+            response = serializer.save(
+                form_version_id=form_version_id,
+                section_path=response_trace.section_path,
+                is_complete=response_trace.is_complete,
+                idempotency_key=idempotency_key,
+            )
+            funnel.record(form.id, [response_trace])
+            text_analytics.record(
+                (answer['question'].id, answer.get('answer_text', ''))
+                for answer in serializer.validated_data['answers']
+            )
+            FormAnalytics.record_responses(form, [response.pk])
+            respondents.record(form.id, [response])
+            notifications.record_pending_responses([(form, response)])
+    except IntegrityError:
+        if idempotency_key is None:
+            raise
+        # A concurrent retry with the same key got there first: answer with its response
+        stored = FeedbackResponse.objects.filter(
+            form=form, idempotency_key=idempotency_key
+        ).values_list('id', flat=True).first()
+        if stored is None:
+            raise
+        raise DuplicateSubmission(stored)
+    return response, None
+
+
+def enqueue_submission(form, submitted_answers, request, idempotency_key=None):
+    """
+    Validate a response and append it to the ingestion log instead of
+    writing it. Returns (response id, None) once the record is durable, or
+    (None, errors).
+    """
+    serializer = FeedbackResponseCreateSerializer(
+        data={'form': form.id, 'answers': submitted_answers},
+        context={'request': request}
+    )
+    if not serializer.is_valid():
+        return None, serializer.errors
+
+    answers = serializer.validated_data['answers']
+    question_ids = [answer['question'].id for answer in answers]
+    if len(set(question_ids)) != len(question_ids):
+        # Would violate the (response, question) constraint at flush time
+        return None, {'error': 'Each question can only be answered once'}
+
+    response_id = ingest.append_submission(
+        form.id,
+        [
+            {
+                'question_id': answer['question'].id,
+                'answer_text': answer.get('answer_text', ''),
+                'answer_value': answer.get('answer_value', {}),
+            }
+            for answer in answers
+        ],
+        ip_address=serializer.get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        idempotency_key=idempotency_key,
+        # The schema the respondent answered, not whatever it is when the batch is flushed
+        form_version_id=versions.current_version_id(form),
+    )
+    return response_id, None
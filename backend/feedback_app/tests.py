@@ -1,3 +1,1850 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, router
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import authentication, channel_layers, db_router, export_cache, form_templates, ingest, navigation, notifications, reports, respondents, submissions, text_analytics, throttling, versions
+from .models import (
+    Answer, ArchivedNotification, CustomUser, FeedbackForm, FeedbackResponse, FormAnalytics, FormTemplate, FormVersion,
+    Notification, PendingNotification, Question, QuestionOption, RespondentSketch, Section, SectionFunnel, TermFrequency
+)
+from .serializers import FeedbackFormCreateSerializer
+
+
+_export_cache_dir = None
+_export_cache_settings = None
+
+
+def setUpModule():
+    # Rendered exports go to a throwaway directory, not backend/export_cache
+    global _export_cache_dir, _export_cache_settings
+    _export_cache_dir = tempfile.TemporaryDirectory()
+    _export_cache_settings = override_settings(EXPORT_CACHE_DIR=Path(_export_cache_dir.name))
+    _export_cache_settings.enable()
+
+
+def tearDownModule():
+    _export_cache_settings.disable()
+    _export_cache_dir.cleanup()
+
+
+def submit_public(form, answers, **extra):
+    """POST a submission to the public endpoint as an anonymous client"""
+    return APIClient().post(f"/api/public/feedback/{form.pk}/", {'answers': answers}, format='json', **extra)
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    The hot queries behind the views must be served by an index, not a
+    full table scan. Plans are checked on a seeded dataset with fresh
+    statistics so the planner sees realistic table sizes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            CustomUser.objects.create_user(f"owner{i}", f"owner{i}@example.com", "pw", is_approved=True)
+            for i in range(5)
+        ]
+        cls.user = users[0]
+
+        forms = FeedbackForm.objects.bulk_create([
+            FeedbackForm(title=f"Form {i}", created_by=users[i % len(users)], is_active=i % 3 != 0)
+            for i in range(40)
+        ])
+        cls.form = forms[0]
+
+        sections = Section.objects.bulk_create([
+            Section(form=form, title=f"Section {j}", order=j) for form in forms for j in range(3)
+        ])
+        cls.section = sections[0]
+
+        questions = Question.objects.bulk_create([
+            Question(section=section, text=f"Question {k}", question_type=question_type, order=k,
+                     options=["A", "B", "C"] if question_type == 'radio' else None)
+            for section in sections
+            for k, question_type in enumerate(['rating', 'radio', 'textarea'])
+        ])
+        cls.question = questions[0]
+        questions_by_form = {}
+        for question in questions:
+            questions_by_form.setdefault(question.section.form_id, []).append(question)
+
+        now = timezone.now()
+        responses = FeedbackResponse.objects.bulk_create([
+            FeedbackResponse(form=form, submitted_at=now - timedelta(hours=n))
+            for n, form in enumerate(form for form in forms for _ in range(25))
+        ])
+
+        Answer.objects.bulk_create([
+            Answer(response=response, question=question, answer_text=str(1 + n % 5))
+            for n, response in enumerate(responses)
+            for question in questions_by_form[response.form_id]
+        ])
+
+        Notification.objects.bulk_create([
+            Notification(user=users[n % len(users)], notification_type='new_response',
+                         title="New Response Received", message="...", is_read=n % 4 != 0)
+            for n in range(500)
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Plans are asserted against SQLite's EXPLAIN QUERY PLAN output")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"Expected {index_name} in plan:\n{plan}")
+
+    def assertQueryUsesIndex(self, run_query, index_name):
+        """Explain the SQL actually issued by ``run_query`` (e.g. a count())"""
+        with CaptureQueriesContext(connection) as ctx:
+            run_query()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + ctx.captured_queries[-1]['sql'])
+            plan = "\n".join(str(row) for row in cursor.fetchall())
+        self.assertIn(index_name, plan, f"Expected {index_name} in plan:\n{plan}")
+
+    def test_form_responses_by_date(self):
+        # Response listings and exports for a form, newest first
+        self.assertUsesIndex(
+            FeedbackResponse.objects.filter(form=self.form).order_by('-submitted_at'),
+            'response_form_submitted_idx',
+        )
+        # Date-bounded response counts for a form
+        self.assertUsesIndex(
+            FeedbackResponse.objects.filter(
+                form=self.form, submitted_at__gte=timezone.now() - timedelta(days=7)
+            ),
+            'response_form_submitted_idx',
+        )
+
+    def test_grouped_answer_counts(self):
+        # FormAnalytics.update_analytics and collect_forms_report
+        self.assertUsesIndex(
+            Answer.objects.filter(question_id=self.question.id).values('question_id', 'answer_text').annotate(
+                count=Count('id')
+            ),
+            'answer_question_text_idx',
+        )
+
+    def test_user_forms(self):
+        # Form listings and dashboard figures of one owner
+        self.assertUsesIndex(
+            FeedbackForm.objects.filter(created_by=self.user).order_by('-created_at'),
+            'form_owner_created_idx',
+        )
+        self.assertUsesIndex(
+            FeedbackForm.objects.filter(created_by=self.user, is_active=True).order_by('-created_at'),
+            'form_owner_active_created_idx',
+        )
+
+    def test_ordered_sections_and_questions(self):
+        self.assertUsesIndex(
+            Section.objects.filter(form=self.form).order_by('order'),
+            'section_form_order_idx',
+        )
+        self.assertUsesIndex(
+            Question.objects.filter(section=self.section).order_by('order'),
+            'question_section_order_idx',
+        )
+
+    def test_unread_notifications(self):
+        # unread_count and the consumer's initial badge
+        self.assertQueryUsesIndex(
+            lambda: Notification.objects.filter(user=self.user, is_read=False).count(),
+            'COVERING INDEX notif_user_read_created_idx',
+        )
+        self.assertUsesIndex(
+            Notification.objects.filter(user=self.user).order_by('-created_at'),
+            'notif_user_created_idx',
+        )
+
+
+class FormBuilderWriteTests(TestCase):
+    """Builder saves write the whole tree with a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("builder", "builder@example.com", "pw", is_approved=True)
+
+    def build_payload(self, section_count, questions_per_section):
+        sections = []
+        for s in range(section_count):
+            questions = [
+                {
+                    'frontend_id': f"q-{s}-{q}",
+                    'text': f"Question {s}.{q}",
+                    'question_type': 'radio',
+                    'order': q,
+                    'options': ["Yes", "No"],
+                    'enable_option_navigation': q == 0,
+                    'option_links': [
+                        {'text': "Yes", 'next_section': f"s-{(s + 1) % section_count}"},
+                        {'text': "No", 'next_section': None},
+                    ] if q == 0 else [],
+                }
+                for q in range(questions_per_section)
+            ]
+            sections.append({
+                'frontend_id': f"s-{s}",
+                'title': f"Section {s}",
+                'order': s,
+                'questions': questions,
+            })
+        return {'title': "Builder form", 'description': "", 'sections': sections}
+
+    def save(self, payload, instance=None):
+        request = SimpleNamespace(user=self.user)
+        serializer = FeedbackFormCreateSerializer(instance, data=payload, context={'request': request})
+        # The serializers log every field with print()
+        with contextlib.redirect_stdout(io.StringIO()):
+            serializer.is_valid(raise_exception=True)
+            with CaptureQueriesContext(connection) as ctx:
+                form = serializer.save()
+        return form, len(ctx.captured_queries)
+
+    def test_create_query_count_is_constant(self):
+        # Both sizes fit in one insert batch (SQLite allows 999 parameters per query)
+        _, small = self.save(self.build_payload(2, 3))
+        form, large = self.save(self.build_payload(10, 10))
+        self.assertEqual(small, large)
+        self.assertEqual(form.sections.count(), 10)
+        self.assertEqual(Question.objects.filter(section__form=form).count(), 100)
+        self.assertEqual(QuestionOption.objects.filter(question__section__form=form).count(), 20)
+        first = form.sections.get(frontend_id="s-0")
+        self.assertEqual(
+            first.questions.get(order=0).option_links.get(text="Yes").next_section.frontend_id, "s-1"
+        )
+
+    def test_update_diffs_tree(self):
+        form, _ = self.save(self.build_payload(20, 10))
+        version = FeedbackForm.objects.get(pk=form.pk).data_version
+        kept_question_id = Question.objects.get(section__form=form, frontend_id="q-0-1").pk
+
+        payload = self.build_payload(20, 10)
+        payload['sections'].pop()  # drop s-19
+        payload['sections'][0]['questions'][1]['text'] = "Renamed"
+        payload['sections'][0]['questions'].append({
+            'frontend_id': "q-new", 'text': "New question", 'question_type': 'text', 'order': 99,
+        })
+        payload['sections'].append({'frontend_id': "s-new", 'title': "New section", 'order': 50, 'questions': []})
+        payload['sections'][0]['next_section_on_submit'] = form.sections.get(frontend_id="s-5").pk
+
+        _, queries = self.save(payload, instance=form)
+        # Loads, one write per kind of change, deletes and the version bump; not one per row
+        self.assertLess(queries, 40)
+
+        self.assertFalse(form.sections.filter(frontend_id="s-19").exists())
+        renamed = Question.objects.get(section__form=form, frontend_id="q-0-1")
+        self.assertEqual(renamed.pk, kept_question_id)
+        self.assertEqual(renamed.text, "Renamed")
+        self.assertTrue(Question.objects.filter(section__form=form, frontend_id="q-new").exists())
+        self.assertEqual(form.sections.get(frontend_id="s-0").next_section_on_submit.frontend_id, "s-5")
+        self.assertGreater(FeedbackForm.objects.get(pk=form.pk).data_version, version)
+
+
+class FormSchemaPatchTests(TestCase):
+    """PATCH /api/forms/<id>/schema/ applies small operations under optimistic concurrency."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("patcher", "patcher@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.form = FeedbackForm.objects.create(title="Patched form", created_by=self.user)
+        self.intro = Section.objects.create(form=self.form, frontend_id="s-intro", title="Intro", order=0)
+        self.outro = Section.objects.create(form=self.form, frontend_id="s-outro", title="Outro", order=1)
+        self.rating = Question.objects.create(
+            section=self.intro, frontend_id="q-rating", text="Rate us", question_type='rating', order=0
+        )
+        self.choice = Question.objects.create(
+            section=self.intro, frontend_id="q-choice", text="Pick one", question_type='radio',
+            options=["A", "B"], order=1, enable_option_navigation=True
+        )
+        self.link = QuestionOption.objects.create(question=self.choice, text="A", next_section=self.outro)
+        self.form.refresh_from_db()
+
+    def patch(self, operations, schema_version=None):
+        url = f"/api/forms/{self.form.pk}/schema/"
+        version = self.form.schema_version if schema_version is None else schema_version
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.client.patch(url, {'schema_version': version, 'operations': operations}, format='json')
+
+    def test_operations_apply_and_bump_version(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.patch([
+                {'op': 'update', 'type': 'question', 'frontend_id': 'q-rating', 'value': {'text': "Rate us again"}},
+            ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['schema_version'], self.form.schema_version + 1)
+        # Auth, form lookup, version swap, question lookup and one UPDATE; no tree rewrite
+        self.assertLessEqual(len(ctx.captured_queries), 10)
+        self.rating.refresh_from_db()
+        self.assertEqual(self.rating.text, "Rate us again")
+
+        response = self.patch([
+            {'op': 'add', 'type': 'section', 'value': {'frontend_id': 's-middle', 'title': "Middle", 'order': 1}},
+            {'op': 'move', 'type': 'question', 'frontend_id': 'q-choice', 'parent': 's-middle', 'order': 0},
+            {'op': 'add', 'type': 'option_link', 'parent': 'q-choice', 'value': {'text': "B", 'next_section': 's-intro'}},
+            {'op': 'update', 'type': 'option_link', 'id': self.link.pk, 'value': {'next_section': None}},
+            {'op': 'delete', 'type': 'section', 'frontend_id': 's-outro'},
+        ], schema_version=response.data['schema_version'])
+        self.assertEqual(response.status_code, 200, response.data)
+
+        middle = Section.objects.get(form=self.form, frontend_id='s-middle')
+        self.assertEqual(middle.order, 1)
+        self.assertFalse(Section.objects.filter(pk=self.outro.pk).exists())
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.section_id, middle.pk)
+        self.assertEqual(
+            sorted((o.text, o.next_section_id) for o in self.choice.option_links.all()),
+            [("A", None), ("B", self.intro.pk)],
+        )
+
+    def test_stale_version_conflicts(self):
+        response = self.patch(
+            [{'op': 'delete', 'type': 'question', 'frontend_id': 'q-rating'}],
+            schema_version=self.form.schema_version - 1,
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['schema_version'], self.form.schema_version)
+        self.assertTrue(Question.objects.filter(pk=self.rating.pk).exists())
+
+    def test_invalid_operation_rolls_back_patch(self):
+        response = self.patch([
+            {'op': 'delete', 'type': 'question', 'frontend_id': 'q-rating'},
+            {'op': 'update', 'type': 'question', 'frontend_id': 'q-missing', 'value': {'text': "x"}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['operation'], 1)
+        self.assertTrue(Question.objects.filter(pk=self.rating.pk).exists())
+        self.assertEqual(FeedbackForm.objects.get(pk=self.form.pk).schema_version, self.form.schema_version)
+
+        response = self.patch([
+            {'op': 'update', 'type': 'question', 'frontend_id': 'q-rating', 'value': {'question_type': 'slider'}},
+        ])
+        self.assertEqual(response.status_code, 400)
+
+
+class NavigationGraphTests(TestCase):
+    """Branching paths drive required-question checks, completion rates and the section funnel."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("navigator", "navigator@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        # start --(Yes)--> detail --> end ; start --(No)--> end
+        self.form = FeedbackForm.objects.create(title="Branching", created_by=self.user)
+        self.start = Section.objects.create(form=self.form, frontend_id="s-start", title="Start", order=0)
+        self.detail = Section.objects.create(form=self.form, frontend_id="s-detail", title="Detail", order=1)
+        self.end = Section.objects.create(form=self.form, frontend_id="s-end", title="End", order=2)
+        self.gate = Question.objects.create(
+            section=self.start, text="Did you buy?", question_type='yes_no', options=["Yes", "No"],
+            is_required=True, enable_option_navigation=True, order=0
+        )
+        QuestionOption.objects.create(question=self.gate, text="Yes", next_section=self.detail)
+        QuestionOption.objects.create(question=self.gate, text="No", next_section=self.end)
+        self.detail_q = Question.objects.create(
+            section=self.detail, text="What did you buy?", question_type='text', is_required=True
+        )
+        self.end_q = Question.objects.create(
+            section=self.end, text="Anything else?", question_type='textarea', is_required=True
+        )
+        self.form.refresh_from_db()
+
+    def test_path_and_required_questions(self):
+        graph = navigation.get_graph(self.form)
+        self.assertTrue(graph.is_branching)
+        self.assertEqual(graph.path({self.gate.id: "No"}), [0, 2])
+        self.assertEqual(graph.path({self.gate.id: "Yes"}), [0, 1, 2])
+        self.assertEqual(graph.topological_order, [0, 1, 2])
+        self.assertEqual(graph.unreachable_sections(), [])
+
+        # Branching past "detail" does not make its required question mandatory
+        answers = [{'question': self.gate.id, 'answer_text': "No"}, {'question': self.end_q.id, 'answer_text': "x"}]
+        self.assertIsNone(submissions.validate_answers(graph, answers))
+        answers[0]['answer_text'] = "Yes"
+        error = submissions.validate_answers(graph, answers)
+        self.assertEqual([q['question_id'] for q in error['missing_questions']], [self.detail_q.id])
+
+    def test_cycles_and_unreachable_sections(self):
+        self.end.next_section_on_submit = self.start
+        self.end.save()
+        orphan = Section.objects.create(form=self.form, frontend_id="s-orphan", title="Orphan", order=3)
+        self.form.refresh_from_db()
+
+        graph = navigation.get_graph(self.form)
+        self.assertIsNone(graph.topological_order)
+        self.assertEqual(graph.cycles, [[0, 1, 2]])
+        self.assertEqual(graph.unreachable_sections(), [3])
+        self.assertEqual(graph.describe()['unreachable_sections'][0]['id'], orphan.id)
+        # A respondent never loops: each section is visited once
+        self.assertEqual(graph.path({self.gate.id: "Yes"}), [0, 1, 2])
+
+    def test_completion_rate_follows_paths(self):
+        short = FeedbackResponse.objects.create(form=self.form)
+        Answer.objects.create(response=short, question=self.gate, answer_text="No")
+        Answer.objects.create(response=short, question=self.end_q, answer_text="fine")
+        partial = FeedbackResponse.objects.create(form=self.form)
+        Answer.objects.create(response=partial, question=self.gate, answer_text="Yes")
+        Answer.objects.create(response=partial, question=self.end_q, answer_text="fine")
+
+        analytics = FormAnalytics.objects.create(form=self.form)
+        analytics.update_analytics()
+        self.assertEqual(analytics.completion_rate, 50.0)
+
+    def submit(self, answers):
+        return submit_public(self.form, answers)
+
+    def test_funnel_counts_paths(self):
+        self.assertEqual(self.submit([
+            {'question': self.gate.id, 'answer_text': "No"}, {'question': self.end_q.id, 'answer_text': "ok"},
+        ]).status_code, 201)
+        self.assertEqual(self.submit([
+            {'question': self.gate.id, 'answer_text': "Yes"},
+            {'question': self.detail_q.id, 'answer_text': "Shoes"},
+            {'question': self.end_q.id, 'answer_text': "ok"},
+        ]).status_code, 201)
+
+        short = FeedbackResponse.objects.filter(form=self.form, section_path=[self.start.id, self.end.id]).get()
+        self.assertTrue(short.is_complete)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            data = client.get(f"/api/forms/{self.form.pk}/funnel/").data
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+        self.assertEqual(data['total_responses'], 2)
+        reached = {step['frontend_id']: (step['reached'], step['exited']) for step in data['sections']}
+        self.assertEqual(reached, {'s-start': (2, 0), 's-detail': (1, 0), 's-end': (2, 2)})
+        self.assertEqual(FormAnalytics.objects.get(form=self.form).completion_rate, 100.0)
+
+        # Recounting from the stored answers gives the same funnel
+        SectionFunnel.objects.filter(form=self.form).update(reached=0, completed=0, exited=0)
+        call_command('rebuild_funnel', form=str(self.form.pk), stdout=io.StringIO())
+        self.assertEqual(SectionFunnel.objects.get(section=self.end).reached, 2)
+
+
+class FormTemplateTests(TestCase):
+    """Templates are snapshots; instantiating one bulk-copies its tree."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("author", "author@example.com", "pw", is_approved=True)
+        cls.other = CustomUser.objects.create_user("colleague", "colleague@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.form = FeedbackForm.objects.create(title="CSAT", form_type='customer_satisfaction', created_by=self.owner)
+        sections = Section.objects.bulk_create([
+            Section(form=self.form, frontend_id=f"s-{i}" if i else None, title=f"Section {i}", order=i)
+            for i in range(10)
+        ])
+        questions = Question.objects.bulk_create([
+            Question(section=section, frontend_id=f"q-{section.order}-{k}", text=f"Q{k}", question_type='radio',
+                     options=["Up", "Down"], order=k, enable_option_navigation=k == 0)
+            for section in sections for k in range(30)
+        ])
+        QuestionOption.objects.bulk_create([
+            QuestionOption(question=question, text="Up", next_section=sections[0])
+            for question in questions if question.enable_option_navigation
+        ])
+        sections[3].next_section_on_submit = sections[0]
+        sections[3].save()
+
+    def test_publish_and_instantiate(self):
+        response = self.client.post(f"/api/forms/{self.form.pk}/publish_template/", {'is_shared': True}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['question_count'], 300)
+        template = FormTemplate.objects.get(pk=response.data['id'])
+
+        # Editing the source afterwards does not change the template
+        Question.objects.filter(section__form=self.form).update(text="Edited")
+        self.assertEqual(template.schema[1]['questions'][0]['text'], "Q0")
+
+        self.client.force_authenticate(self.other)
+        with CaptureQueriesContext(connection) as ctx:
+            clone = form_templates.instantiate(template, self.other, title="My CSAT")
+        self.assertLessEqual(len(ctx.captured_queries), 12)
+
+        self.assertEqual(clone.created_by, self.other)
+        self.assertEqual(clone.template, template)
+        self.assertEqual(Question.objects.filter(section__form=clone).count(), 300)
+        clone_sections = {s.order: s for s in clone.sections.all()}
+        # Navigation points into the clone, including to the section that had no frontend_id
+        self.assertEqual(clone_sections[3].next_section_on_submit_id, clone_sections[0].pk)
+        links = QuestionOption.objects.filter(question__section__form=clone)
+        self.assertEqual(links.count(), 10)
+        self.assertEqual(set(links.values_list('next_section_id', flat=True)), {clone_sections[0].pk})
+
+        response = self.client.post(f"/api/templates/{template.pk}/instantiate/", {}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['sections']), 10)
+
+    def test_private_templates_are_not_shared(self):
+        template = form_templates.publish(self.form, self.owner)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.post(f"/api/templates/{template.pk}/instantiate/").status_code, 404)
+        self.assertEqual(self.client.get("/api/templates/").data["count"], 0)
+
+
+class FormVersionTests(TestCase):
+    """Responses pin the schema they were given against; deleting a question keeps its answers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("historian", "historian@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        versions.get_snapshot.cache_clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.form = FeedbackForm.objects.create(title="Versioned", created_by=self.user)
+        section = Section.objects.create(form=self.form, frontend_id="s-main", title="Main", order=0)
+        self.kept = Question.objects.create(
+            section=section, frontend_id="q-kept", text="How was it?", question_type='text', order=0
+        )
+        self.dropped = Question.objects.create(
+            section=section, frontend_id="q-dropped", text="Which store?", question_type='text', order=1
+        )
+        self.form.refresh_from_db()
+
+    def submit(self, answers):
+        return submit_public(self.form, answers)
+
+    def test_version_frozen_from_the_stored_schema(self):
+        stale = FeedbackForm.objects.get(pk=self.form.pk)
+        # An edit commits after the request loaded the form
+        added = Question.objects.create(
+            section=self.kept.section, frontend_id="q-added", text="Anything else?", question_type='text', order=2
+        )
+        current = FeedbackForm.objects.get(pk=self.form.pk).schema_version
+        self.assertGreater(current, stale.schema_version)
+
+        version = FormVersion.objects.get(pk=versions.current_version_id(stale))
+        self.assertEqual(version.number, current)
+        self.assertIn(added.id, [question['id'] for section in version.schema for question in section['questions']])
+        self.assertFalse(FormVersion.objects.filter(form=self.form, number=stale.schema_version).exists())
+        self.assertEqual(versions.current_version_id(FeedbackForm.objects.get(pk=self.form.pk)), version.pk)
+
+    def test_deleted_question_stays_in_exports(self):
+        self.assertEqual(self.submit([
+            {'question': self.kept.id, 'answer_text': "Great"}, {'question': self.dropped.id, 'answer_text': "Paris"},
+        ]).status_code, 201)
+        first = FeedbackResponse.objects.get(form=self.form)
+        self.assertEqual(first.form_version.number, self.form.schema_version)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.patch(f"/api/forms/{self.form.pk}/schema/", {
+                'schema_version': self.form.schema_version,
+                'operations': [{'op': 'delete', 'type': 'question', 'frontend_id': 'q-dropped'}],
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.form.refresh_from_db()
+
+        answer = Answer.objects.get(response=first, question_ref=self.dropped.id)
+        self.assertIsNone(answer.question_id)
+        self.assertEqual(answer.answer_text, "Paris")
+
+        self.assertEqual(self.submit([{'question': self.kept.id, 'answer_text': "Fine"}]).status_code, 201)
+        second = FeedbackResponse.objects.exclude(pk=first.pk).get(form=self.form)
+        self.assertEqual(second.form_version.number, self.form.schema_version)
+        self.assertNotEqual(second.form_version_id, first.form_version_id)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            detail = self.client.get(f"/api/responses/{first.pk}/")
+        self.assertEqual(detail.status_code, 200)
+        self.assertIn("Which store?", {a['question_text'] for a in detail.data['answers']})
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            export = self.client.get(f"/api/forms/{self.form.pk}/export_csv/")
+        rows = export.content.decode().splitlines()
+        self.assertEqual(rows[0], "Response ID,Submitted At,IP Address,How was it? (text),Which store? (text) [removed]")
+        self.assertTrue(any(row.endswith(",Great,Paris") for row in rows[1:]))
+        self.assertTrue(any(row.endswith(",Fine,N/A") for row in rows[1:]))
+
+
+class AnswerSearchTests(TestCase):
+    """Text answers are indexed as they are stored and searched with ranking and snippets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("searcher", "searcher@example.com", "pw", is_approved=True)
+        cls.other = CustomUser.objects.create_user("outsider", "outsider@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.forms = []
+        for title in ("Support", "Billing"):
+            form = FeedbackForm.objects.create(title=title, created_by=self.owner)
+            section = Section.objects.create(form=form, title="Main", order=0)
+            Question.objects.create(section=section, text="Comments", question_type='textarea', order=0)
+            Question.objects.create(section=section, text="Happy?", question_type='radio', options=["refund", "no"], order=1)
+            self.forms.append(form)
+
+    def submit(self, form, comment, choice="no"):
+        comments, happy = form.questions
+        response = submit_public(form, [
+            {'question': comments.id, 'answer_text': comment}, {'question': happy.id, 'answer_text': choice},
+        ])
+        self.assertEqual(response.status_code, 201)
+
+    def search(self, **params):
+        return self.client.get("/api/responses/search/", params)
+
+    def test_search_ranks_filters_and_highlights(self):
+        support, billing = self.forms
+        self.submit(support, "Still waiting on my refund <script>, refund please", choice="refund")
+        self.submit(support, "Agent was friendly")
+        self.submit(billing, "Refund took two weeks")
+
+        data = self.search(q="refund").data
+        self.assertEqual(len(data['results']), 2)
+        best = data['results'][0]
+        self.assertEqual(best['form_title'], "Support")
+        self.assertEqual(best['question_text'], "Comments")
+        self.assertIn("<mark>refund</mark>", best['snippet'])
+        self.assertIn("&lt;script&gt;", best['snippet'])
+
+        self.assertEqual([r['form_title'] for r in self.search(q="refu*", form=billing.pk).data['results']], ["Billing"])
+        self.assertEqual(self.search(q='"unbalanced').status_code, 200)
+        self.assertEqual(self.search(q="refund", form="nope").status_code, 400)
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.search(q="refund").data['results'], [])
+
+    def test_deleted_answers_leave_the_index(self):
+        self.submit(self.forms[0], "Broken checkout page")
+        self.assertEqual(len(self.search(q="checkout").data['results']), 1)
+        FeedbackResponse.objects.filter(form=self.forms[0]).delete()
+        self.assertEqual(self.search(q="checkout").data['results'], [])
+
+
+@override_settings(TERM_TOP_K=3)
+class WordFrequencyTests(TestCase):
+    """Text answers feed a bounded per-question sketch of term and phrase counts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("counter", "counter@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        self.form = FeedbackForm.objects.create(title="Words", created_by=self.user)
+        section = Section.objects.create(form=self.form, title="Main", order=0)
+        self.comment = Question.objects.create(section=section, text="Comments", question_type='textarea', order=0)
+        self.choice = Question.objects.create(section=section, text="Pick", question_type='radio', options=["fast delivery"], order=1)
+
+    def test_sketch_and_top_k(self):
+        sketch = text_analytics.CountMinSketch(64, 4)
+        for _ in range(5):
+            sketch.add("delivery")
+        self.assertGreaterEqual(sketch.estimate("delivery"), 5)
+        self.assertEqual(len(sketch.to_bytes()), 64 * 4 * 4)
+
+        top = text_analytics.TopK(2)
+        for item, count in [("a", 1), ("b", 2), ("c", 3), ("a", 4), ("d", 1)]:
+            top.offer(item, count)
+        self.assertEqual(top.ranked(), [("a", 4), ("c", 3)])
+
+    def test_submissions_update_word_frequency(self):
+        comments = [
+            "Fast delivery, friendly staff", "Delivery was late, the staff was friendly",
+            "Fast delivery", "Packaging damaged", "delivery DELIVERY delivery",
+        ]
+        for comment in comments:
+            response = submit_public(self.form, [
+                {'question': self.comment.id, 'answer_text': comment},
+                {'question': self.choice.id, 'answer_text': "fast delivery"},
+            ])
+            self.assertEqual(response.status_code, 201)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get(f"/api/forms/{self.form.pk}/word_frequency/").data
+        [question] = data['questions']
+        self.assertEqual(question['question_id'], self.comment.id)
+        self.assertEqual(question['answers_seen'], 5)
+        # Answers mentioning a term, not occurrences; at most TERM_TOP_K kept
+        self.assertEqual(question['terms'][0], {'term': 'delivery', 'count': 4})
+        self.assertEqual(len(question['terms']), 3)
+        self.assertIn({'phrase': 'fast delivery', 'count': 2}, question['phrases'])
+        self.assertGreater(question['confidence'], 0.98)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            export = client.get(f"/api/forms/{self.form.pk}/export_analytics_excel/")
+        self.assertEqual(export.status_code, 200)
+        sheet = openpyxl.load_workbook(io.BytesIO(export.content))["Word Frequency"]
+        self.assertEqual([cell.value for cell in sheet[7]], ['delivery', 4, 'fast delivery', 2])
+
+        # Recounting from the stored answers gives the same result
+        call_command('rebuild_word_frequency', form=str(self.form.pk), stdout=io.StringIO())
+        self.assertEqual(TermFrequency.objects.get(question=self.comment).top_terms['delivery'], 4)
+        self.assertFalse(TermFrequency.objects.filter(question=self.choice).exists())
+
+
+@override_settings(ANALYTICS_TEXT_SAMPLE_SIZE=3)
+class BoundedAnalyticsTests(TestCase):
+    """Submissions fold into fixed-size statistics that match a full rebuild."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("statistician", "statistician@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        self.form = FeedbackForm.objects.create(title="Bounded", created_by=self.user)
+        section = Section.objects.create(form=self.form, title="Main", order=0)
+        self.rating = Question.objects.create(section=section, text="Rate", question_type='rating', order=0)
+        self.choice = Question.objects.create(
+            section=section, text="Channels", question_type='checkbox', options=["Web", "App"], order=1
+        )
+        self.comment = Question.objects.create(section=section, text="Why?", question_type='textarea', order=2)
+
+    def submit(self, rating, channels, comment):
+        response = submit_public(self.form, [
+            {'question': self.rating.id, 'answer_text': rating},
+            {'question': self.choice.id, 'answer_text': channels},
+            {'question': self.comment.id, 'answer_text': comment},
+        ])
+        self.assertEqual(response.status_code, 201)
+
+    def test_incremental_matches_rebuild(self):
+        self.submit("5", "Web", "first")
+        for i in range(5):
+            self.submit(str(i % 5 + 1), "Web, App", f"comment {i}")
+        with CaptureQueriesContext(connection) as ctx:
+            self.submit("3", "Web", "seventh")
+        early_queries = len(ctx.captured_queries)
+        for i in range(19):
+            self.submit("4", "App", f"more {i}")
+        with CaptureQueriesContext(connection) as ctx:
+            self.submit("2", "Web", "last")
+        # A submission costs the same however many responses the form already has
+        self.assertEqual(len(ctx.captured_queries), early_queries)
+
+        analytics = FormAnalytics.objects.get(form=self.form)
+        incremental = analytics.questions_summary
+        comment_stats = incremental[str(self.comment.id)]
+        self.assertEqual([entry['text'] for entry in comment_stats['answers']], ["last", "more 18", "more 17"])
+        self.assertEqual(comment_stats['answers_seen'], 27)
+
+        analytics.update_analytics()
+        rebuilt = analytics.questions_summary
+        self.assertEqual(rebuilt[str(self.rating.id)], incremental[str(self.rating.id)])
+        self.assertEqual(rebuilt[str(self.choice.id)], incremental[str(self.choice.id)])
+        self.assertEqual(rebuilt[str(self.comment.id)], incremental[str(self.comment.id)])
+
+        # A buffered answer stored late, but queued before the ones kept, does not displace them
+        late = FormAnalytics.add_answer_to_stats(
+            self.comment, rebuilt[str(self.comment.id)], "queued", timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual([entry['text'] for entry in late['answers']], ["last", "more 18", "more 17"])
+        self.assertEqual(late['answers_seen'], 28)
+        self.assertEqual(analytics.total_responses, 27)
+        self.assertEqual(analytics.completed_responses, 27)
+
+    @override_settings(ANALYTICS_TEXT_MAX_LENGTH=20)
+    def test_stored_stats_match_the_answers(self):
+        ratings = ["5", "3", "3", "1", "4", "5", "2", "3"]
+        for i, rating in enumerate(ratings):
+            comment = f"comment {i}" if i % 3 else "x" * 50
+            self.submit(rating, ["Web", "App", "Web, App"][i % 3], comment)
+
+        def expected():
+            answers = {
+                question.id: list(Answer.objects.filter(question=question).values_list('answer_text', 'response__submitted_at'))
+                for question in (self.rating, self.choice, self.comment)
+            }
+            values = [int(text) for text, _ in answers[self.rating.id]]
+            selections = [opt.strip() for text, _ in answers[self.choice.id] for opt in text.split(',')]
+            return answers, {
+                'distribution': {str(i): values.count(i) for i in range(1, 6)},
+                'rating_sum': sum(values),
+                'rating_count': len(values),
+                'average_rating': sum(values) / len(values),
+            }, {option: selections.count(option) for option in ("Web", "App")}
+
+        analytics = FormAnalytics.objects.get(form=self.form)
+        # As folded in on each submission, then as rebuilt from scratch
+        for stage in ("incremental", "rebuilt"):
+            with self.subTest(stage):
+                answers, rating_stats, choice_distribution = expected()
+                summary = analytics.questions_summary
+                rating = summary[str(self.rating.id)]
+                self.assertEqual(rating['response_count'], len(ratings))
+                self.assertEqual({key: rating[key] for key in rating_stats}, rating_stats)
+                self.assertEqual(analytics.average_rating, rating_stats['average_rating'])
+
+                choice = summary[str(self.choice.id)]
+                self.assertEqual(choice['distribution'], choice_distribution)
+                self.assertEqual(choice['total_selections'], sum(choice_distribution.values()))
+
+                comment = summary[str(self.comment.id)]
+                self.assertEqual(comment['answers_seen'], len(answers[self.comment.id]))
+                # The newest answers, cut to the maximum length, each with its own timestamp
+                newest = sorted(answers[self.comment.id], key=lambda answer: answer[1], reverse=True)[:3]
+                self.assertEqual(
+                    [(entry['text'], entry['submitted_at']) for entry in comment['answers']],
+                    [(text[:20], submitted_at.isoformat()) for text, submitted_at in newest],
+                )
+
+                self.assertEqual(analytics.total_responses, len(ratings))
+                self.assertEqual(analytics.completion_rate, 100.0)
+            analytics.update_analytics()
+
+
+class RespondentCountTests(TestCase):
+    """Distinct respondents are estimated from mergeable per-day HyperLogLog sketches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("census", "census@example.com", "pw", is_approved=True)
+
+    def test_estimates_stay_within_error_bound(self):
+        sketch = respondents.HyperLogLog()
+        for i in range(20000):
+            sketch.add(respondents.respondent_key(f"10.0.{i // 256}.{i % 256}", "Firefox"))
+        self.assertLess(abs(sketch.count() - 20000), 20000 * 3 * respondents.STANDARD_ERROR)
+
+        other = respondents.HyperLogLog()
+        for i in range(10000, 30000):
+            other.add(respondents.respondent_key(f"10.0.{i // 256}.{i % 256}", "Firefox"))
+        union = respondents.HyperLogLog(sketch.to_bytes()).merge(other)
+        self.assertLess(abs(union.count() - 30000), 30000 * 3 * respondents.STANDARD_ERROR)
+        # Small counts are exact in practice
+        small = respondents.HyperLogLog()
+        for i in range(50):
+            small.add(str(i))
+        self.assertEqual(small.count(), 50)
+
+    def test_submissions_update_form_and_dashboard(self):
+        form = FeedbackForm.objects.create(title="Census", created_by=self.user)
+        section = Section.objects.create(form=form, title="Main", order=0)
+        question = Question.objects.create(section=section, text="Hi?", question_type='text', order=0)
+        for i, ip in enumerate(["1.1.1.1", "2.2.2.2", "1.1.1.1", "3.3.3.3", "1.1.1.1"]):
+            response = submit_public(
+                form, [{'question': question.id, 'answer_text': f"x{i}"}], REMOTE_ADDR=ip, HTTP_USER_AGENT="Safari"
+            )
+            self.assertEqual(response.status_code, 201)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        unique = client.get(f"/api/forms/{form.pk}/analytics/").data['unique_respondents']
+        self.assertEqual((unique['estimate'], unique['responses'], unique['repeat_responses']), (3, 5, 2))
+        self.assertEqual(len(unique['daily']), 1)
+        self.assertEqual(unique['daily'][0]['estimate'], 3)
+
+        dashboard = client.get("/api/dashboard/summary/").data
+        self.assertEqual(dashboard['unique_respondents']['estimate'], 3)
+        self.assertEqual(dashboard['unique_respondents_today']['estimate'], 3)
+
+        call_command('rebuild_respondents', form=str(form.pk), stdout=io.StringIO())
+        self.assertEqual(RespondentSketch.objects.get(form=form).responses, 5)
+        self.assertEqual(respondents.form_respondents(FormAnalytics.objects.get(form=form))['estimate'], 3)
+
+
+@override_settings(SUBMISSION_RATE_PER_IP="3/minute", SUBMISSION_RATE_PER_FORM="5/minute")
+class SubmissionGuardTests(TestCase):
+    """Public submissions are rate limited, and retries and resubmissions are not stored twice."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("gatekeeper", "gatekeeper@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        throttling._local.clear()
+        self.form = FeedbackForm.objects.create(title="Guarded", created_by=self.user)
+        section = Section.objects.create(form=self.form, title="Main", order=0)
+        self.question = Question.objects.create(section=section, text="Say", question_type='text', order=0)
+
+    def submit(self, text, ip="9.9.9.9", **headers):
+        return submit_public(self.form, [{'question': self.question.id, 'answer_text': text}], REMOTE_ADDR=ip, **headers)
+
+    def test_token_buckets(self):
+        buckets = throttling.LocalBuckets(max_keys=2)
+        self.assertEqual([buckets.take([("a", 2, 1.0)]) for _ in range(3)][:2], [0.0, 0.0])
+        self.assertGreater(buckets.take([("a", 2, 1.0)]), 0)
+        buckets.take([("b", 2, 1.0)])
+        buckets.take([("c", 2, 1.0)])
+        self.assertEqual(list(buckets.buckets), ["b", "c"])
+        # Nothing is taken from one bucket when another is empty
+        buckets.take([("b", 2, 1.0)])
+        self.assertGreater(buckets.take([("c", 2, 1.0), ("b", 2, 1.0)]), 0)
+        self.assertEqual(buckets.take([("c", 2, 1.0)]), 0.0)
+
+        # Per IP first, then per form
+        self.assertEqual([self.submit(f"hi {i}").status_code for i in range(4)], [201, 201, 201, 429])
+        throttled = self.submit("again")
+        self.assertEqual(throttled.status_code, 429)
+        self.assertGreaterEqual(int(throttled["Retry-After"]), 1)
+        self.assertEqual([self.submit(f"other {i}", ip="8.8.8.8").status_code for i in range(3)], [201, 201, 429])
+
+    def test_forwarded_for_is_not_trusted(self):
+        # Rotating the header does not give a client fresh buckets
+        statuses = [self.submit(f"hi {i}", HTTP_X_FORWARDED_FOR=f"10.0.0.{i}").status_code for i in range(4)]
+        self.assertEqual(statuses, [201, 201, 201, 429])
+
+    @override_settings(SUBMISSION_NUM_PROXIES=1, SUBMISSION_RATE_PER_FORM=None)
+    def test_forwarded_for_from_trusted_proxy(self):
+        # The proxy appends the address it saw; whatever the client sent before it is ignored
+        spoofed = [
+            self.submit(f"hi {i}", ip="172.16.0.1", HTTP_X_FORWARDED_FOR=f"10.0.0.{i}, 1.2.3.4").status_code
+            for i in range(4)
+        ]
+        self.assertEqual(spoofed, [201, 201, 201, 429])
+        self.assertEqual(self.submit("other", ip="172.16.0.1", HTTP_X_FORWARDED_FOR="5.6.7.8").status_code, 201)
+
+    def test_full_form_does_not_drain_client_buckets(self):
+        for i in range(5):
+            self.assertEqual(self.submit(f"fill {i}", ip=f"8.8.8.{i}").status_code, 201)
+        self.assertEqual([self.submit(f"wait {i}").status_code for i in range(3)], [429, 429, 429])
+        with override_settings(SUBMISSION_RATE_PER_FORM=None):
+            self.assertEqual([self.submit(f"hi {i}").status_code for i in range(4)], [201, 201, 201, 429])
+
+    @override_settings(SUBMISSION_THROTTLE_BACKEND='cache')
+    def test_shared_buckets(self):
+        self.assertEqual([self.submit(f"hi {i}", ip="7.7.7.7").status_code for i in range(4)], [201, 201, 201, 429])
+
+    @override_settings(SUBMISSION_RATE_PER_IP=None, SUBMISSION_RATE_PER_FORM=None)
+    def test_idempotency_and_content_dedup(self):
+        first = self.submit("hello", HTTP_IDEMPOTENCY_KEY="retry-1")
+        self.assertEqual(first.status_code, 201)
+        retry = self.submit("hello", HTTP_IDEMPOTENCY_KEY="retry-1")
+        self.assertEqual((retry.status_code, retry.data['response_id']), (200, first.data['response_id']))
+        self.assertTrue(retry.data['duplicate'])
+
+        # The stored key still wins once the cache has forgotten it
+        cache.clear()
+        retry = self.submit("hello again", HTTP_IDEMPOTENCY_KEY="retry-1")
+        self.assertEqual(retry.data['response_id'], first.data['response_id'])
+
+        # Same content from the same client within the window
+        self.assertEqual(self.submit("same").status_code, 201)
+        self.assertEqual(self.submit("same").status_code, 200)
+        self.assertEqual(self.submit("same", ip="6.6.6.6").status_code, 201)
+        self.assertEqual(FeedbackResponse.objects.filter(form=self.form).count(), 3)
+
+        self.assertEqual(self.submit("long", HTTP_IDEMPOTENCY_KEY="k" * 65).status_code, 400)
+        # Rejected submissions do not hold a claim on their key
+        self.assertEqual(self.submit("", HTTP_IDEMPOTENCY_KEY="fixed-later").status_code, 400)
+        self.assertEqual(self.submit("fixed", HTTP_IDEMPOTENCY_KEY="fixed-later").status_code, 201)
+
+    @override_settings(SUBMISSION_RATE_PER_IP=None, SUBMISSION_RATE_PER_FORM=None)
+    def test_concurrent_retry_gets_the_stored_response(self):
+        # Both requests passed claim(); the second only finds out when its insert conflicts
+        for i, path in enumerate([f"/api/public/feedback/{self.form.pk}/", f"/api/public/feedback/{self.form.pk}/submit/"]):
+            key = f"race-{i}"
+            first = self.submit("first", HTTP_IDEMPOTENCY_KEY=key)
+            self.assertEqual(first.status_code, 201)
+            cache.clear()
+            with mock.patch.object(submissions.SubmissionGuard, 'claim', return_value=None):
+                second = APIClient().post(
+                    path, {'answers': [{'question': self.question.id, 'answer_text': "second"}]},
+                    format='json', REMOTE_ADDR="9.9.9.9", HTTP_IDEMPOTENCY_KEY=key
+                )
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual((second.json()['response_id'], second.json()['duplicate']), (first.data['response_id'], True))
+            self.assertEqual(FeedbackResponse.objects.filter(form=self.form, idempotency_key=key).count(), 1)
+
+            # Later retries are answered from the cache
+            retry = self.submit("third", HTTP_IDEMPOTENCY_KEY=key)
+            self.assertEqual((retry.status_code, retry.data['response_id']), (200, first.data['response_id']))
+
+
+class ConditionalGetTests(TestCase):
+    """Dashboard reads carry validators and answer 304 until the form's data changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("poller", "poller@example.com", "pw", is_approved=True)
+        cls.admin = CustomUser.objects.create_user(
+            "ops", "ops@example.com", "pw", is_approved=True, is_superuser=True, is_staff=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.form = FeedbackForm.objects.create(title="Polled", created_by=self.user)
+        FormAnalytics.objects.create(form=self.form)
+        self.section = Section.objects.create(form=self.form, title="Main", order=0)
+        self.question = Question.objects.create(section=self.section, text="Why?", question_type='text', order=0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, text):
+        response = submit_public(self.form, [{'question': self.question.id, 'answer_text': text}])
+        self.assertEqual(response.status_code, 201)
+
+    def test_not_modified_until_data_changes(self):
+        url = f"/api/forms/{self.form.pk}/analytics/"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        # Only the form lookup runs before the 304
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], first['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+        self.submit("Because")
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(changed.data['total_responses'], 1)
+
+        # Query parameters are part of the representation
+        questions = f"/api/forms/{self.form.pk}/question_analytics/"
+        self.assertNotEqual(
+            self.client.get(questions)['ETag'], self.client.get(questions, {'section_id': self.section.id})['ETag']
+        )
+
+    def test_collections_follow_form_edits(self):
+        listing = self.client.get("/api/forms/")
+        self.assertEqual(self.client.get("/api/forms/", HTTP_IF_NONE_MATCH=listing['ETag']).status_code, 304)
+        detail = self.client.get(f"/api/forms/{self.form.pk}/")
+        dashboard = self.client.get("/api/dashboard/summary/")
+        self.assertEqual(
+            self.client.get("/api/dashboard/summary/", HTTP_IF_NONE_MATCH=dashboard['ETag']).status_code, 304
+        )
+
+        self.form.title = "Renamed"
+        self.form.save()
+        self.assertEqual(self.client.get("/api/forms/", HTTP_IF_NONE_MATCH=listing['ETag']).status_code, 200)
+        self.assertEqual(
+            self.client.get(f"/api/forms/{self.form.pk}/", HTTP_IF_NONE_MATCH=detail['ETag']).data['title'], "Renamed"
+        )
+        self.assertEqual(
+            self.client.get("/api/dashboard/summary/", HTTP_IF_NONE_MATCH=dashboard['ETag']).status_code, 200
+        )
+
+        # Another user's view of the same URL never matches
+        other = APIClient()
+        other.force_authenticate(self.admin)
+        self.assertEqual(other.get("/api/forms/", HTTP_IF_NONE_MATCH=listing['ETag']).status_code, 200)
+
+        # Responses leaving the 24 hour window change the dashboard too
+        self.submit("Old news")
+        dashboard = self.client.get("/api/dashboard/summary/")
+        FeedbackResponse.objects.filter(form=self.form).update(submitted_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(
+            self.client.get("/api/dashboard/summary/", HTTP_IF_NONE_MATCH=dashboard['ETag']).data['recent_responses'], 0
+        )
+
+        metrics = other.get("/api/metrics/http-cache/").data
+        self.assertEqual(metrics['endpoints']['form_list'], {'hits': 1, 'misses': 3, 'hit_ratio': 0.25})
+        self.assertEqual(metrics['endpoints']['dashboard']['hits'], 1)
+        self.assertEqual(self.client.get("/api/metrics/http-cache/").status_code, 403)
+
+
+@override_settings(NOTIFICATION_COALESCE_WINDOW=5)
+class NotificationCoalescingTests(TestCase):
+    """New responses wait in the database and go out as one digest per form once their window has passed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("busy", "busy@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        cache.clear()
+        self.forms = []
+        for title in ("Lunch", "Dinner"):
+            form = FeedbackForm.objects.create(title=title, created_by=self.user)
+            section = Section.objects.create(form=form, title="Main", order=0)
+            Question.objects.create(section=section, text="Comments", question_type='text', order=0)
+            self.forms.append(form)
+
+    def submit(self, form, text):
+        [question] = form.questions
+        self.assertEqual(submit_public(form, [{'question': question.id, 'answer_text': text}]).status_code, 201)
+
+    def test_digest_per_form_after_window(self):
+        lunch, dinner = self.forms
+        for i in range(3):
+            self.submit(lunch, f"tasty {i}")
+        self.submit(dinner, "cold")
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(PendingNotification.objects.count(), 4)
+
+        # Within the window nothing is sent
+        self.assertEqual(notifications.flush_due_digests(), [])
+        later = timezone.now() + timedelta(seconds=6)
+        digests = notifications.flush_due_digests(now=later)
+        self.assertEqual(len(digests), 2)
+        self.assertFalse(PendingNotification.objects.exists())
+
+        digest = Notification.objects.get(data__form_id=str(lunch.pk))
+        self.assertEqual(digest.message, '3 new responses to "Lunch"')
+        self.assertEqual(digest.data['response_count'], 3)
+        self.assertEqual(Notification.objects.get(data__form_id=str(dinner.pk)).title, "New Response Received")
+        self.assertEqual(notifications.get_unread_count(self.user.id), 2)
+
+        # Responses after a flush start a new window
+        self.submit(dinner, "better")
+        self.assertEqual(notifications.flush_due_digests(), [])
+        call_command('flush_notifications', once=True, stdout=io.StringIO())
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(len(notifications.flush_due_digests(window=0)), 1)
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_pending_rows_commit_with_the_response(self):
+        lunch, dinner = self.forms
+        # The request dies right after the response is committed
+        with mock.patch.object(notifications, 'notify_new_response', side_effect=RuntimeError("killed")), \
+                self.assertLogs('feedback_app.views', 'ERROR'):
+            response = submit_public(lunch, [{'question': lunch.questions[0].id, 'answer_text': "saved"}])
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(PendingNotification.objects.get().response_id, FeedbackResponse.objects.get(form=lunch).id)
+
+        # Nothing is queued for a response that was rolled back
+        with mock.patch.object(respondents, 'record', side_effect=RuntimeError("db error")), \
+                self.assertLogs('feedback_app.views', 'ERROR'):
+            response = submit_public(dinner, [{'question': dinner.questions[0].id, 'answer_text': "lost"}])
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(FeedbackResponse.objects.filter(form=dinner).exists())
+        self.assertEqual(PendingNotification.objects.count(), 1)
+
+    def test_buffered_responses_are_queued_once(self):
+        lunch, _ = self.forms
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(SUBMISSION_INGEST_MODE='buffered', SUBMISSION_INGEST_DIR=Path(directory)))
+        for i in range(2):
+            response = submit_public(lunch, [{'question': lunch.questions[0].id, 'answer_text': f"later {i}"}])
+            self.assertEqual(response.status_code, 202)
+
+        # Killed after the batch committed, then replayed
+        with mock.patch.object(ingest, '_write_offset', side_effect=RuntimeError("killed")):
+            with self.assertRaises(RuntimeError):
+                ingest.flush_once()
+        self.assertEqual(PendingNotification.objects.count(), 2)
+        self.assertEqual(ingest.flush_once(), 0)
+        self.assertEqual(
+            set(PendingNotification.objects.values_list('response_id', flat=True)),
+            set(FeedbackResponse.objects.filter(form=lunch).values_list('id', flat=True)),
+        )
+
+    @override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+    def test_no_window_notifies_each_response(self):
+        self.submit(self.forms[0], "now")
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertFalse(PendingNotification.objects.exists())
+
+
+class AsyncSubmitTests(TestCase):
+    """The async public submit endpoint stores, validates and notifies like the synchronous one."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("owner", "owner@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        cache.clear()
+        self.form = FeedbackForm.objects.create(title="Async", created_by=self.user)
+        section = Section.objects.create(form=self.form, title="Main", order=0)
+        self.question = Question.objects.create(
+            section=section, text="Required", question_type='text', order=0, is_required=True
+        )
+        self.url = f"/api/public/feedback/{self.form.pk}/submit/"
+
+    def submit(self, answers):
+        return APIClient().post(self.url, {'answers': answers}, format='json')
+
+    def test_success(self):
+        response = self.submit([{'question': self.question.id, 'answer_text': "quick"}])
+        self.assertEqual(response.status_code, 201)
+        stored = FeedbackResponse.objects.get(pk=response.json()['response_id'])
+        self.assertEqual(stored.answers.get().answer_text, "quick")
+        self.assertEqual(FormAnalytics.objects.get(form=self.form).total_responses, 1)
+
+    def test_validation_errors(self):
+        missing = self.submit([])
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(missing.json()['error'], 'Missing required questions')
+
+        other = Question.objects.create(
+            section=Section.objects.create(
+                form=FeedbackForm.objects.create(title="Other", created_by=self.user), title="Main", order=0
+            ),
+            text="Elsewhere", question_type='text', order=0,
+        )
+        foreign = self.submit([{'question': self.question.id, 'answer_text': "a"}, {'question': other.id, 'answer_text': "b"}])
+        self.assertEqual((foreign.status_code, foreign.json()['invalid_questions']), (400, [other.id]))
+
+        malformed = APIClient().post(self.url, "not json", content_type='application/json')
+        self.assertEqual(malformed.status_code, 400)
+        self.assertFalse(FeedbackResponse.objects.exists())
+
+    def test_expired_or_inactive_form(self):
+        self.form.expires_at = timezone.now() - timedelta(minutes=1)
+        self.form.save()
+        self.assertEqual(self.submit([{'question': self.question.id, 'answer_text': "late"}]).status_code, 410)
+
+        FeedbackForm.objects.filter(pk=self.form.pk).update(is_active=False)
+        self.assertEqual(self.submit([{'question': self.question.id, 'answer_text': "late"}]).status_code, 404)
+        self.assertFalse(FeedbackResponse.objects.exists())
+
+    @override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+    def test_notification_is_pushed(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f"user_{self.user.id}", channel)
+        self.addCleanup(async_to_sync(layer.flush))
+
+        response = self.submit([{'question': self.question.id, 'answer_text': "ping"}])
+        self.assertEqual(response.status_code, 201)
+
+        event = async_to_sync(layer.receive)(channel)
+        self.assertEqual(event['type'], 'notification_message')
+        self.assertEqual(event['data']['response_id'], response.json()['response_id'])
+        self.assertEqual(event['unread_count'], 1)
+        self.assertEqual(Notification.objects.get(user=self.user).data, event['data'])
+
+    @override_settings(NOTIFICATION_COALESCE_WINDOW=5)
+    def test_notification_waits_for_its_digest(self):
+        response = self.submit([{'question': self.question.id, 'answer_text': "ping"}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(str(PendingNotification.objects.get(form=self.form).response_id), response.json()['response_id'])
+        self.assertFalse(Notification.objects.exists())
+
+
+class ExportCacheTests(TestCase):
+    """Rendered exports are served from disk until the form's data version moves."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("exporter", "exporter@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.form = FeedbackForm.objects.create(title="Exported", created_by=self.user)
+        FormAnalytics.objects.create(form=self.form)
+        section = Section.objects.create(form=self.form, title="Main", order=0)
+        self.question = Question.objects.create(section=section, text="Thoughts", question_type='text', order=0)
+
+    def export(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.client.get(f"/api/forms/{self.form.pk}/export_csv/")
+
+    def test_hits_until_data_version_moves(self):
+        submit_public(self.form, [{'question': self.question.id, 'answer_text': "first"}])
+        first = self.export()
+        self.assertEqual(first['X-Export-Cache'], 'MISS')
+        cached = self.export()
+        self.assertEqual(cached['X-Export-Cache'], 'HIT')
+        self.assertEqual(b"".join(cached.streaming_content), first.content)
+
+        submit_public(self.form, [{'question': self.question.id, 'answer_text': "second"}])
+        fresh = self.export()
+        self.assertEqual(fresh['X-Export-Cache'], 'MISS')
+        self.assertIn(b"second", fresh.content)
+
+        # Editing the form moves the version too, without the save clobbering it
+        version = FeedbackForm.objects.get(pk=self.form.pk).data_version
+        self.form.title = "Renamed"
+        self.form.save()
+        self.assertEqual(self.form.data_version, version + 1)
+        self.assertEqual(self.export()['X-Export-Cache'], 'MISS')
+
+    def test_evicts_least_recently_used(self):
+        self.enterContext(override_settings(EXPORT_CACHE_DIR=Path(_export_cache_dir.name) / "eviction"))
+        directory = export_cache._cache_dir()
+        for key in ("old", "used", "new"):
+            (directory / f"{key}.bin").write_bytes(b"x" * 100)
+            (directory / f"{key}.json").write_text('{"content_type": "text/csv"}')
+        now = time.time()
+        for age, key in ((30, "old"), (20, "used"), (10, "new")):
+            os.utime(directory / f"{key}.bin", (now - age, now - age))
+        # A lookup counts as a use
+        self.assertIsNotNone(export_cache.lookup("used"))
+
+        export_cache.evict(200)
+        self.assertIsNone(export_cache.lookup("old"))
+        self.assertFalse((directory / "old.json").exists())
+        self.assertIsNotNone(export_cache.lookup("used"))
+        self.assertIsNotNone(export_cache.lookup("new"))
+
+
+class BufferedIngestTests(TestCase):
+    """The flush writes each queued record once, with its statistics, whatever point it crashed at."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("queuer", "queuer@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(SUBMISSION_INGEST_DIR=Path(directory)))
+        self.form = FeedbackForm.objects.create(title="Queued", created_by=self.user)
+        section = Section.objects.create(form=self.form, title="Main", order=0)
+        self.question = Question.objects.create(section=section, text="Notes", question_type='text', order=0)
+
+    def queue(self, *texts, ip="5.5.5.5"):
+        answers = [{'question_id': self.question.id, 'answer_text': text, 'answer_value': {}} for text in texts]
+        return ingest.append_submission(self.form.id, answers, ip_address=ip, user_agent="Tests")
+
+    def flush_killed_before_offset(self):
+        """A flush that dies after its transactions commit but before it records how far it got"""
+        with mock.patch.object(ingest, '_write_offset', side_effect=RuntimeError("killed")):
+            with self.assertRaises(RuntimeError):
+                ingest.flush_once()
+
+    def rejected(self):
+        path = Path(settings.SUBMISSION_INGEST_DIR) / 'rejected.log'
+        return path.read_text().splitlines() if path.exists() else []
+
+    def assertStored(self, responses):
+        self.assertEqual(FeedbackResponse.objects.filter(form=self.form).count(), responses)
+        analytics = FormAnalytics.objects.get(form=self.form)
+        self.assertEqual(analytics.total_responses, responses)
+        self.assertEqual(analytics.questions_summary[str(self.question.id)]['response_count'], responses)
+        self.assertEqual(sum(RespondentSketch.objects.filter(form=self.form).values_list('responses', flat=True)), responses)
+
+    def test_replay_after_crash_writes_once(self):
+        for i in range(3):
+            self.queue(f"note {i}", ip=f"5.5.5.{i}")
+        self.flush_killed_before_offset()
+        self.assertStored(3)
+        version = FeedbackForm.objects.get(pk=self.form.pk).data_version
+
+        self.assertEqual(ingest.flush_once(), 0)
+        self.assertStored(3)
+        self.assertEqual(FeedbackForm.objects.get(pk=self.form.pk).data_version, version)
+
+        self.queue("note 4")
+        self.assertEqual(ingest.flush_once(), 1)
+        self.assertStored(4)
+
+    def test_replay_of_one_by_one_fallback(self):
+        self.queue("first")
+        # Two answers to one question: the batch insert fails and records are retried one by one
+        self.queue("twice", "twice")
+        self.queue("last", ip="6.6.6.6")
+        with open(Path(settings.SUBMISSION_INGEST_DIR) / ingest.ACTIVE_LOG, 'a') as fh:
+            fh.write("not json\n")
+
+        self.flush_killed_before_offset()
+        self.assertStored(2)
+        # Nothing is logged as rejected until the offset has moved past it
+        self.assertEqual(self.rejected(), [])
+
+        self.assertEqual(ingest.flush_once(), 0)
+        self.assertStored(2)
+        self.assertEqual(
+            sorted(json.loads(line)['reason'] == 'malformed record' for line in self.rejected()), [False, True]
+        )
+        self.assertEqual(ingest.flush_once(), 0)
+        self.assertEqual(len(self.rejected()), 2)
+
+    @override_settings(SUBMISSION_INGEST_MODE='buffered')
+    def test_responses_keep_the_schema_they_answered(self):
+        self.assertEqual(submit_public(self.form, [{'question': self.question.id, 'answer_text': "v1"}]).status_code, 202)
+        answered = FeedbackForm.objects.get(pk=self.form.pk).schema_version
+        Question.objects.create(section=self.question.section, text="Added later", question_type='text', order=1)
+
+        self.assertEqual(ingest.flush_once(), 1)
+        response = FeedbackResponse.objects.get(form=self.form)
+        self.assertEqual(response.form_version.number, answered)
+        self.assertLess(answered, FeedbackForm.objects.get(pk=self.form.pk).schema_version)
+
+    def test_responses_keep_their_queue_time(self):
+        queued_at = timezone.now() - timedelta(days=3)
+        record = {
+            'id': str(uuid.uuid4()), 'form_id': str(self.form.id), 'ip_address': "7.7.7.7", 'user_agent': "Tests",
+            'answers': [{'question_id': self.question.id, 'answer_text': "late", 'answer_value': {}}],
+            'queued_at': queued_at.isoformat(),
+        }
+        with open(Path(settings.SUBMISSION_INGEST_DIR) / ingest.ACTIVE_LOG, 'a') as fh:
+            fh.write(json.dumps(record) + "\n")
+
+        self.assertEqual(ingest.flush_once(), 1)
+        response = FeedbackResponse.objects.get(pk=record['id'])
+        self.assertEqual(response.submitted_at, queued_at)
+        self.assertEqual(RespondentSketch.objects.get(form=self.form).day, timezone.localdate(queued_at))
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Replica-routed views read a second SQLite file that is only as fresh as
+    its last copy of the primary, the way `sync_replica` keeps it locally.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The runner only sets up configured aliases, so the replica is
+        # added here; connections.settings is settings.DATABASES
+        cls._replica_dir = tempfile.TemporaryDirectory()
+        connections.settings[db_router.REPLICA_ALIAS] = {
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(cls._replica_dir.name, "replica.sqlite3"),
+            'TEST': {'MIRROR': None},
+        }
+        cls.databases = {'default', db_router.REPLICA_ALIAS}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[db_router.REPLICA_ALIAS].close()
+        del connections[db_router.REPLICA_ALIAS]
+        del connections.settings[db_router.REPLICA_ALIAS]
+        cls.databases = {'default'}
+        cls._replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user("reader", "reader@example.com", "pw", is_approved=True)
+        self.form = FeedbackForm.objects.create(title="Replicated", created_by=self.user)
+        section = Section.objects.create(form=self.form, title="Main", order=0)
+        self.question = Question.objects.create(section=section, text="Why?", question_type='text', order=0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync_replica(self):
+        """Copy the primary as it is now; anything written later is replica lag"""
+        replica = connections[db_router.REPLICA_ALIAS]
+        replica.close()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            connections['default'].ensure_connection()
+            connections['default'].connection.backup(target)
+        finally:
+            target.close()
+
+    def test_reads_are_routed_to_the_replica_unless_pinned(self):
+        @db_router.read_from_replica
+        def view(request):
+            return router.db_for_read(FeedbackForm)
+
+        request = SimpleNamespace(user=self.user)
+        self.assertEqual(router.db_for_read(FeedbackForm), 'default')
+        self.assertEqual(view(request), db_router.REPLICA_ALIAS)
+        self.assertEqual(router.db_for_write(FeedbackForm), 'default')
+
+        db_router.pin_user(self.user.pk)
+        self.assertEqual(view(request), 'default')
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        self.assertEqual(self.client.get(f"/api/forms/{self.form.pk}/").status_code, 200)
+        self.assertFalse(db_router.is_pinned(self.user.pk))
+
+        response = self.client.patch(f"/api/forms/{self.form.pk}/", {'title': "Renamed"}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(db_router.is_pinned(self.user.pk))
+
+    def test_analytics_created_after_the_replica_copy(self):
+        self.sync_replica()
+        # Stored analytics exist on the primary but not yet on the replica
+        self.assertEqual(submit_public(self.form, [{'question': self.question.id, 'answer_text': "fast"}]).status_code, 201)
+        self.assertTrue(FormAnalytics.objects.filter(form=self.form).exists())
+        self.assertFalse(FormAnalytics.objects.using(db_router.REPLICA_ALIAS).filter(form=self.form).exists())
+
+        response = self.client.get(f"/api/forms/{self.form.pk}/analytics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(FormAnalytics.objects.filter(form=self.form).count(), 1)
+        self.assertEqual(FormAnalytics.objects.get(form=self.form).total_responses, 1)
+
+        # Once the replica has caught up, the stored row is read from there alone
+        self.sync_replica()
+        with CaptureQueriesContext(connections['default']) as primary:
+            self.assertEqual(self.client.get(f"/api/forms/{self.form.pk}/analytics/").status_code, 200)
+        self.assertFalse([q for q in primary.captured_queries if 'feedback_app_formanalytics' in q['sql']])
+
+
+class SQLiteChannelLayerTests(SimpleTestCase):
+    """The SQLite channel layer delivers, fans out, expires and caps messages like the other layers."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "channels.sqlite3")
+        self.layer = self.make_layer()
+
+    def make_layer(self, **config):
+        # Each instance stands in for one worker process on the host
+        layer = channel_layers.SQLiteChannelLayer(self.path, poll_interval=0.005, max_poll_interval=0.02, **config)
+        self.addCleanup(layer._executor.shutdown)
+        return layer
+
+    async def receive(self, layer, channel, timeout=1):
+        return await asyncio.wait_for(layer.receive(channel), timeout)
+
+    async def test_send_and_receive_in_order(self):
+        for i in range(3):
+            await self.layer.send("updates", {'type': "update", 'n': i})
+        self.assertEqual((await self.receive(self.layer, "updates"))['n'], 0)
+
+        # The rest is still queued for any worker, not held by this one
+        other = self.make_layer()
+        self.assertEqual([(await self.receive(other, "updates"))['n'] for _ in range(2)], [1, 2])
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.receive(self.layer, "updates", timeout=0.05)
+
+    async def test_process_channels_are_claimed_in_batches(self):
+        channel = await self.layer.new_channel()
+        for i in range(3):
+            await self.layer.send(channel, {'type': "update", 'n': i})
+        self.assertEqual((await self.receive(self.layer, channel))['n'], 0)
+        self.assertEqual(len(self.layer._buffers[channel]), 2)
+        self.assertEqual([(await self.receive(self.layer, channel))['n'] for _ in range(2)], [1, 2])
+        self.assertNotIn(channel, self.layer._buffers)
+
+    async def test_cancelled_receive_puts_claimed_messages_back(self):
+        channel = await self.layer.new_channel()
+        for i in range(3):
+            await self.layer.send(channel, {'type': "update", 'n': i})
+
+        pop_batch = self.layer._pop_batch
+        claimed = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def slow_pop_batch(*args):
+            rows = pop_batch(*args)
+            loop.call_soon_threadsafe(claimed.set)
+            time.sleep(0.1)
+            return rows
+
+        with mock.patch.object(self.layer, '_pop_batch', side_effect=slow_pop_batch):
+            receiving = asyncio.ensure_future(self.layer.receive(channel))
+            await claimed.wait()
+            receiving.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await receiving
+
+        self.assertEqual([(await self.receive(self.layer, channel))['n'] for _ in range(3)], [0, 1, 2])
+
+    async def test_group_send_reaches_members_across_layers(self):
+        other = self.make_layer()
+        await self.layer.group_add("form-1", "watcher.a")
+        await other.group_add("form-1", "watcher.b")
+        await self.layer.group_add("form-2", "watcher.c")
+
+        await other.group_send("form-1", {'type': "new.response"})
+        self.assertEqual((await self.receive(self.layer, "watcher.a"))['type'], "new.response")
+        self.assertEqual((await self.receive(other, "watcher.b"))['type'], "new.response")
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.receive(self.layer, "watcher.c", timeout=0.05)
+
+        await self.layer.group_discard("form-1", "watcher.a")
+        await self.layer.group_send("form-1", {'type': "new.response"})
+        self.assertEqual((await self.receive(other, "watcher.b"))['type'], "new.response")
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.receive(self.layer, "watcher.a", timeout=0.05)
+
+    async def test_messages_and_memberships_expire(self):
+        layer = self.make_layer(expiry=0.05, group_expiry=0.05)
+        await layer.send("updates", {'type': "stale"})
+        await layer.group_add("form-1", "watcher.a")
+        await asyncio.sleep(0.1)
+
+        await layer.group_send("form-1", {'type': "new.response"})
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.receive(layer, "updates", timeout=0.05)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.receive(layer, "watcher.a", timeout=0.05)
+
+    async def test_capacity(self):
+        layer = self.make_layer(capacity=2)
+        await layer.send("updates", {'type': "update", 'n': 0})
+        await layer.send("updates", {'type': "update", 'n': 1})
+        with self.assertRaises(ChannelFull):
+            await layer.send("updates", {'type': "update", 'n': 2})
+
+        # Group messages to a full channel are dropped, not raised
+        await layer.group_add("form-1", "updates")
+        await layer.group_send("form-1", {'type': "update", 'n': 3})
+        self.assertEqual([(await self.receive(layer, "updates"))['n'] for _ in range(2)], [0, 1])
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.receive(layer, "updates", timeout=0.05)
+        await layer.send("updates", {'type': "update", 'n': 4})
+        self.assertEqual((await self.receive(layer, "updates"))['n'], 4)
+
+    async def test_channel_capacity_applies_to_group_send(self):
+        layer = self.make_layer(capacity=5, channel_capacity={"small.*": 1})
+        await layer.send("small.a", {'type': "update", 'n': 0})
+        with self.assertRaises(ChannelFull):
+            await layer.send("small.a", {'type': "update", 'n': 1})
+
+        for channel in ("small.a", "large.b"):
+            await layer.group_add("form-1", channel)
+        for n in range(2):
+            await layer.group_send("form-1", {'type': "update", 'n': n + 2})
+        self.assertEqual([(await self.receive(layer, "large.b"))['n'] for _ in range(2)], [2, 3])
+        self.assertEqual((await self.receive(layer, "small.a"))['n'], 0)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.receive(layer, "small.a", timeout=0.05)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """A cached token stops authenticating as soon as it is revoked, not when its cache entry expires."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("session", "session@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        cache.clear()
+        login = APIClient().post("/api/auth/login/", {'username': "session", 'password': "pw"}, format='json')
+        self.assertEqual(login.status_code, 200)
+        self.key = login.data['token']
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.key}")
+
+    def assertAuthenticates(self, authenticates=True, reason=None):
+        response = self.client.get("/api/auth/user/")
+        if authenticates:
+            self.assertEqual(response.status_code, 200)
+        else:
+            # Session authentication comes first, so failures are 403s
+            self.assertEqual((response.status_code, str(response.data['detail'])), (403, reason))
+
+    def assertCached(self, cached):
+        self.assertEqual(cache.get(authentication._token_cache_key(self.key)) is not None, cached)
+
+    def test_cached_token_is_reused(self):
+        self.assertAuthenticates()
+        self.assertCached(True)
+        with mock.patch.object(Token.objects, 'select_related', side_effect=AssertionError("token looked up")):
+            self.assertAuthenticates()
+
+    def test_logout(self):
+        self.assertAuthenticates()
+        self.assertEqual(self.client.post("/api/auth/logout/").status_code, 200)
+        self.assertCached(False)
+        self.assertAuthenticates(False, "Invalid token.")
+
+    def test_token_deleted(self):
+        self.assertAuthenticates()
+        Token.objects.get(key=self.key).delete()
+        self.assertCached(False)
+        self.assertAuthenticates(False, "Invalid token.")
+
+    def test_user_deactivated(self):
+        self.assertAuthenticates()
+        self.user.is_active = False
+        self.user.save()
+        self.assertCached(False)
+        self.assertAuthenticates(False, "User inactive or deleted.")
+
+        # Not revoked, so it works again once reactivated
+        self.user.is_active = True
+        self.user.save()
+        self.assertAuthenticates()
+
+
+class UnreadCountTests(TestCase):
+    """The cached unread counter follows the notifications table through every change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("reader2", "reader2@example.com", "pw", is_approved=True)
+        cls.other = CustomUser.objects.create_user("bystander", "bystander@example.com", "pw", is_approved=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertInSync(self, expected):
+        self.assertEqual(Notification.objects.filter(user=self.user, is_read=False).count(), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.get_unread_count(self.user.id), expected)
+        self.assertEqual(self.client.get("/api/notifications/unread_count/").data['unread_count'], expected)
+
+    def create(self, user=None, n=1):
+        return [
+            notifications.create_notification(user or self.user, 'form_updated', "Updated", f"Change {i}")
+            for i in range(n)
+        ]
+
+    def test_create_and_mark_as_read(self):
+        self.assertEqual(notifications.get_unread_count(self.user.id), 0)
+        first, second, _ = self.create(n=3)
+        [foreign] = self.create(user=self.other)
+        self.assertInSync(3)
+
+        response = self.client.post(f"/api/notifications/{first.pk}/mark_as_read/")
+        self.assertEqual(response.data['unread_count'], 2)
+        self.assertInSync(2)
+        # Reading it again, or someone else's notification, changes nothing
+        self.assertEqual(notifications.mark_as_read(self.user.id, first.pk), 2)
+        self.assertEqual(notifications.mark_as_read(self.user.id, foreign.pk), 2)
+        self.assertEqual(self.client.post(f"/api/notifications/{foreign.pk}/mark_as_read/").status_code, 404)
+        self.assertInSync(2)
+        self.assertEqual(notifications.get_unread_count(self.other.id), 1)
+
+        # Rebuilt from the database once the cache has forgotten it
+        cache.clear()
+        self.assertEqual(notifications.mark_as_read(self.user.id, second.pk), 1)
+        self.create()
+        self.assertInSync(2)
+
+    def test_mark_all_as_read(self):
+        self.create(n=4)
+        self.create(user=self.other, n=2)
+        self.assertEqual(self.client.post("/api/notifications/mark_all_as_read/").data['unread_count'], 0)
+        self.assertInSync(0)
+        self.assertEqual(notifications.get_unread_count(self.other.id), 2)
+
+        self.create()
+        self.assertInSync(1)
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS=30)
+class ArchiveNotificationsTests(TestCase):
+    """archive_notifications moves old read notifications to the archive table and leaves the rest."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("archivist", "archivist@example.com", "pw", is_approved=True)
+
+    def notification(self, title, is_read, age_days):
+        notification = Notification.objects.create(
+            user=self.user, notification_type='form_updated', title=title, message=f"{title} message",
+            is_read=is_read, data={'title': title},
+        )
+        created_at = timezone.now() - timedelta(days=age_days)
+        Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        notification.created_at = created_at
+        return notification
+
+    def archive(self, **options):
+        out = io.StringIO()
+        call_command('archive_notifications', stdout=out, **options)
+        return out.getvalue()
+
+    def test_moves_old_read_notifications(self):
+        old_read = [self.notification(f"Old {i}", True, 40 + i) for i in range(3)]
+        old_unread = self.notification("Old unread", False, 50)
+        recent_read = self.notification("Recent", True, 5)
+
+        self.assertIn("3 read notifications older than 30 days would be archived", self.archive(dry_run=True))
+        self.assertFalse(ArchivedNotification.objects.exists())
+
+        # Several short batches
+        self.archive(batch_size=2)
+        self.assertEqual(
+            set(Notification.objects.values_list('id', flat=True)), {old_unread.id, recent_read.id}
+        )
+        archived = {archived.id: archived for archived in ArchivedNotification.objects.all()}
+        self.assertEqual(set(archived), {notification.id for notification in old_read})
+        for notification in old_read:
+            copy = archived[notification.id]
+            self.assertEqual(
+                (copy.user_id, copy.notification_type, copy.title, copy.message, copy.created_at, copy.data),
+                (self.user.id, 'form_updated', notification.title, notification.message,
+                 notification.created_at, notification.data),
+            )
+
+        # Nothing left to move; a shorter retention picks up the recent one
+        self.archive()
+        self.assertEqual(ArchivedNotification.objects.count(), 3)
+        self.archive(days=1)
+        self.assertEqual(list(Notification.objects.values_list('id', flat=True)), [old_unread.id])
+        self.assertEqual(ArchivedNotification.objects.count(), 4)
+
+
+class FormsReportTests(TestCase):
+    """collect_forms_report's grouped queries give what per-form, per-question loops would."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("reporter", "reporter@example.com", "pw", is_approved=True)
+
+    def make_form(self, title, responses):
+        form = FeedbackForm.objects.create(title=title, created_by=self.user)
+        section = Section.objects.create(form=form, title="Main", order=0)
+        rating = Question.objects.create(section=section, text="Score", question_type='rating', order=0)
+        radio = Question.objects.create(
+            section=section, text="Pick", question_type='radio', order=1, options=["Red", "Blue"]
+        )
+        checkbox = Question.objects.create(
+            section=section, text="Tick", question_type='checkbox', order=2, options=["A", "B", "C"]
+        )
+        text = Question.objects.create(section=section, text="Say", question_type='text', order=3)
+        for i in range(responses):
+            answers = [
+                {'question': rating.id, 'answer_text': str(i % 5 + 1)},
+                {'question': radio.id, 'answer_text': ["Red", "Blue"][i % 2]},
+                {'question': text.id, 'answer_text': f"note {i}"},
+            ]
+            if i % 3:
+                answers.append({'question': checkbox.id, 'answer_text': "A,C" if i % 2 else "B"})
+            self.assertEqual(submit_public(form, answers, REMOTE_ADDR=f"10.1.0.{i}").status_code, 201)
+        return form
+
+    def collect(self):
+        forms = FeedbackForm.objects.filter(created_by=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            report = reports.collect_forms_report(forms)
+        return report, len(queries.captured_queries)
+
+    def test_matches_per_form_loops(self):
+        self.make_form("Empty", 0)
+        self.make_form("Small", 4)
+        report, queries = self.collect()
+
+        self.make_form("Large", 11)
+        report, more_forms_queries = self.collect()
+        self.assertEqual(more_forms_queries, queries)
+
+        for form in FeedbackForm.objects.filter(created_by=self.user):
+            responses = FeedbackResponse.objects.filter(form=form)
+            questions = list(Question.objects.filter(section__form=form).order_by('section__order', 'order'))
+            self.assertEqual([question.id for question in report['questions'][form.id]], [q.id for q in questions])
+
+            ratings = []
+            for question in questions:
+                answers = list(Answer.objects.filter(question=question).values_list('answer_text', flat=True))
+                stats = report['question_stats'][question.id]
+                if question.question_type != 'text':
+                    self.assertEqual(stats, FormAnalytics.build_question_stats(question, [(a, 1) for a in answers]))
+                self.assertEqual(stats['response_count'], len(answers))
+                if question.question_type == 'rating':
+                    ratings += [int(a) for a in answers]
+
+            self.assertEqual(report['form_stats'][form.id], {
+                'total_responses': responses.count(),
+                'last_submitted_at': max((r.submitted_at for r in responses), default=None),
+                'total_questions': len(questions),
+                'completion_rate': FormAnalytics.objects.get(form=form).completion_rate if responses else 0.0,
+                'average_rating': sum(ratings) / len(ratings) if ratings else 0.0,
+            })
+
+        self.assertEqual(
+            (report['total_forms'], report['total_responses'], report['total_questions']), (3, 15, 12)
+        )
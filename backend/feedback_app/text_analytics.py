@@ -0,0 +1,218 @@
+"""
+Word frequency of text answers.
+
+Each text/textarea answer is tokenized when it is stored. Its distinct
+terms and two-word phrases are added to a count-min sketch kept per
+question (TermFrequency.counters), and a small heap keeps the TERM_TOP_K
+terms and phrases with the highest estimates. Space per question is fixed
+by the settings whatever the number of answers, and reading a question's
+word frequency never touches its answers.
+
+Counts are the number of answers mentioning a term, so one long answer
+repeating a word does not dominate. A count-min sketch only overestimates:
+with probability 1 - e^-depth an estimate exceeds the true count by at
+most e / width * terms_seen (see ``error_bound``).
+
+Questions answered before this existed are backfilled with
+`manage.py rebuild_word_frequency`.
+"""
+import heapq
+import math
+import re
+from array import array
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Question, TermFrequency
+
+
+TEXT_QUESTION_TYPES = ('text', 'textarea')
+
+WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+# Kept small on purpose: negations ("not", "no") carry meaning in feedback
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been before being but by can could did do
+does doing for from had has have having he her here hers him his how i i'm if in into is it it's its
+just me more most my of on or our ours out over so some than that the their them then there these
+they this those through to too up us very was we were what when where which while who why will with
+would you your yours
+""".split())
+
+
+def _sketch_shape():
+    return getattr(settings, 'TERM_SKETCH_WIDTH', 1024), getattr(settings, 'TERM_SKETCH_DEPTH', 4)
+
+
+def _top_k():
+    return getattr(settings, 'TERM_TOP_K', 50)
+
+
+def tokenize(text):
+    """Lowercased words of ``text`` without stopwords, single letters and bare numbers"""
+    return [
+        word for word in WORD_RE.findall(text.lower())
+        if len(word) > 1 and word not in STOPWORDS and not word.isdigit()
+    ]
+
+
+def extract(text):
+    """(distinct terms, distinct two-word phrases) of one answer"""
+    words = tokenize(text)
+    return set(words), {f"{first} {second}" for first, second in zip(words, words[1:])}
+
+
+class CountMinSketch:
+    """``depth`` rows of ``width`` 32-bit counters, one row per hash function"""
+
+    def __init__(self, width, depth, counters=b''):
+        self.width = width
+        self.depth = depth
+        self.counters = array('I')
+        if len(counters) == width * depth * self.counters.itemsize:
+            self.counters.frombytes(counters)
+        else:
+            # New question, or the sketch shape changed in settings: start over
+            self.counters = array('I', bytes(width * depth * self.counters.itemsize))
+
+    def _cells(self, term):
+        # Double hashing: row i uses h1 + i * h2, from one stable 128-bit digest
+        digest = blake2b(term.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, term, count=1):
+        """Count ``term`` and return its new estimate"""
+        counters = self.counters
+        estimate = None
+        for cell in self._cells(term):
+            counters[cell] += count
+            if estimate is None or counters[cell] < estimate:
+                estimate = counters[cell]
+        return estimate
+
+    def estimate(self, term):
+        return min(self.counters[cell] for cell in self._cells(term))
+
+    def to_bytes(self):
+        return self.counters.tobytes()
+
+
+class TopK:
+    """The ``k`` items with the highest counts, as a min-heap with lazily dropped stale entries"""
+
+    def __init__(self, k, counts=None):
+        self.k = k
+        self.counts = dict(counts or {})
+        self.heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self.heap)
+
+    def _minimum(self):
+        while self.heap[0][0] != self.counts.get(self.heap[0][1]):
+            heapq.heappop(self.heap)
+        return self.heap[0]
+
+    def offer(self, item, count):
+        if item in self.counts or len(self.counts) < self.k:
+            self.counts[item] = count
+            heapq.heappush(self.heap, (count, item))
+            return
+        smallest_count, smallest = self._minimum()
+        if count > smallest_count:
+            heapq.heappop(self.heap)
+            del self.counts[smallest]
+            self.counts[item] = count
+            heapq.heappush(self.heap, (count, item))
+
+    def ranked(self):
+        return sorted(self.counts.items(), key=lambda entry: (-entry[1], entry[0]))
+
+
+def _update(stats, texts):
+    width, depth = _sketch_shape()
+    sketch = CountMinSketch(width, depth, bytes(stats.counters))
+    top_terms = TopK(_top_k(), stats.top_terms)
+    top_phrases = TopK(_top_k(), stats.top_phrases)
+    for text in texts:
+        terms, phrases = extract(text)
+        for term in terms:
+            top_terms.offer(term, sketch.add(term))
+        for phrase in phrases:
+            top_phrases.offer(phrase, sketch.add(phrase))
+        stats.answers_seen += 1
+        stats.terms_seen += len(terms) + len(phrases)
+    stats.counters = sketch.to_bytes()
+    stats.top_terms = dict(top_terms.ranked())
+    stats.top_phrases = dict(top_phrases.ranked())
+
+
+def record(answers):
+    """
+    Add newly stored answers, (question id, answer text) pairs of any
+    question type, to the word frequency of their text questions.
+    """
+    texts = {}
+    for question_id, answer_text in answers:
+        if answer_text and answer_text.strip():
+            texts.setdefault(question_id, []).append(answer_text)
+    if not texts:
+        return
+    question_ids = list(
+        Question.objects.filter(pk__in=texts, question_type__in=TEXT_QUESTION_TYPES).values_list('pk', flat=True)
+    )
+    if not question_ids:
+        return
+
+    with transaction.atomic():
+        TermFrequency.objects.bulk_create(
+            [TermFrequency(question_id=question_id) for question_id in question_ids], ignore_conflicts=True
+        )
+        # Locked so concurrent submissions to the same question do not lose counts
+        rows = list(TermFrequency.objects.select_for_update().filter(question_id__in=question_ids))
+        now = timezone.now()
+        for stats in rows:
+            _update(stats, texts[stats.question_id])
+            stats.updated_at = now
+        TermFrequency.objects.bulk_update(
+            rows, ['answers_seen', 'terms_seen', 'counters', 'top_terms', 'top_phrases', 'updated_at']
+        )
+
+
+def error_bound(stats):
+    """Largest overestimate of any count, holding with probability ``confidence``"""
+    width, depth = _sketch_shape()
+    return {
+        'max_overcount': math.ceil(math.e / width * stats.terms_seen),
+        'confidence': round(1 - math.exp(-depth), 4),
+    }
+
+
+def _ranked(counts, limit):
+    # Stored ranked, but jsonb does not keep key order
+    return sorted(counts.items(), key=lambda entry: (-entry[1], entry[0]))[:limit]
+
+
+def word_frequency(form, limit=None):
+    """Top terms and phrases of every text question of ``form`` that has answers, in form order"""
+    rows = {
+        stats.question_id: stats
+        for stats in TermFrequency.objects.filter(question__section__form=form).defer('counters')
+    }
+    questions = []
+    for question in form.questions.filter(question_type__in=TEXT_QUESTION_TYPES):
+        stats = rows.get(question.id)
+        if stats is None:
+            continue
+        questions.append({
+            'question_id': question.id,
+            'question_text': question.text,
+            'answers_seen': stats.answers_seen,
+            'terms': [{'term': term, 'count': count} for term, count in _ranked(stats.top_terms, limit)],
+            'phrases': [{'phrase': phrase, 'count': count} for phrase, count in _ranked(stats.top_phrases, limit)],
+            **error_bound(stats),
+        })
+    return questions
@@ -0,0 +1,121 @@
+"""
+Token-bucket rate limits for public submissions.
+
+Every client IP and every form has a bucket holding up to N tokens that
+refills at N per period (SUBMISSION_RATE_PER_IP / SUBMISSION_RATE_PER_FORM,
+e.g. "60/minute"). A submission takes one token from each, and only when
+every bucket has one: an empty bucket rejects it, without draining the
+others, with the seconds until a token is back. Bursts up to N go through
+and sustained floods are cut to the refill rate.
+
+SUBMISSION_THROTTLE_BACKEND picks where buckets live:
+
+    local - a bounded dict in this process: no round trips, but limits are
+            per worker process
+    cache - the default Django cache (Redis in production), shared by all
+            processes. Buckets are read and written without a lock, so a
+            concurrent burst can get a few more tokens than the limit.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """(capacity, tokens per second) for "N/period", or None if there is no limit"""
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period]
+
+
+def _take(state, capacity, refill, now):
+    """New bucket state after taking a token, and the seconds to wait (0 when allowed)"""
+    tokens, updated = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / refill
+
+
+def _take_all(states, limits, now):
+    """
+    New states after taking a token from every bucket of ``limits``
+    ((key, capacity, refill) triples), or None and the longest wait if any
+    of them is empty
+    """
+    taken = {}
+    wait = 0.0
+    for key, capacity, refill in limits:
+        taken[key], bucket_wait = _take(states.get(key), capacity, refill, now)
+        wait = max(wait, bucket_wait)
+    return (None, wait) if wait else (taken, 0.0)
+
+
+class LocalBuckets:
+    """Buckets in process memory; the least recently used are dropped past ``max_keys``"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, limits):
+        now = time.monotonic()
+        with self.lock:
+            states = {key: self.buckets.pop(key) for key, _, _ in limits if key in self.buckets}
+            taken, wait = _take_all(states, limits, now)
+            # Back in as the most recently used, with a token taken only if allowed
+            self.buckets.update(taken or states)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBuckets:
+    """Buckets in the shared cache, expiring once they would be full again"""
+
+    def take(self, limits):
+        now = time.time()
+        taken, wait = _take_all(cache.get_many([key for key, _, _ in limits]), limits, now)
+        if taken:
+            timeout = max(int(capacity / refill) + 1 for _, capacity, refill in limits)
+            cache.set_many(taken, timeout)
+        return wait
+
+    def clear(self):
+        pass
+
+
+_local = LocalBuckets()
+_shared = CacheBuckets()
+
+
+def _buckets():
+    return _shared if getattr(settings, 'SUBMISSION_THROTTLE_BACKEND', 'local') == 'cache' else _local
+
+
+def submission_wait(client_ip, form_id):
+    """
+    Take a token from the client's and the form's buckets. Returns 0 if the
+    submission may go ahead, otherwise the seconds until it would; a
+    rejected submission takes no token from either.
+    """
+    rates = [
+        (f"throttle:submit:ip:{client_ip}", parse_rate(getattr(settings, 'SUBMISSION_RATE_PER_IP', None))),
+        (f"throttle:submit:form:{form_id}", parse_rate(getattr(settings, 'SUBMISSION_RATE_PER_FORM', None))),
+    ]
+    limits = [(key, *rate) for key, rate in rates if rate is not None]
+    if not limits:
+        return 0.0
+    return _buckets().take(limits)
@@ -7,6 +7,7 @@ router.register(r'forms', views.FeedbackFormViewSet, basename='feedbackform')
 router.register(r'sections', views.SectionViewSet, basename='section')
 router.register(r'questions', views.QuestionViewSet, basename='question')
 router.register(r'question-options', views.QuestionOptionViewSet, basename='questionoption')
+router.register(r'templates', views.FormTemplateViewSet, basename='formtemplate')
 router.register(r'responses', views.FeedbackResponseViewSet, basename='feedbackresponse')
 # router.register(r'analytics', views.FormAnalyticsViewSet, basename='analytics')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
@@ -28,10 +29,14 @@ urlpatterns = [
     
     # Dashboard
     path('api/dashboard/summary/', views.DashboardView.as_view(), name='dashboard_summary'),
+
+    # Metrics
+    path('api/metrics/http-cache/', views.HttpCacheMetricsView.as_view(), name='http_cache_metrics'),
     
     # Public feedback form endpoints
     path('api/public/forms/', views.PublicFormsListView.as_view(), name='public_forms_list'),
     path('api/public/feedback/<uuid:form_id>/', views.PublicFeedbackFormView.as_view(), name='public_feedback_form'),
+    path('api/public/feedback/<uuid:form_id>/submit/', views.public_feedback_submit, name='public_feedback_submit'),
     
     # Nested routes for better organization
     path('api/forms/<uuid:form_pk>/sections/', 
@@ -0,0 +1,126 @@
+"""
+Form versions.
+
+The first response stored against a form's schema_version freezes the
+schema into a FormVersion; responses reference it and answers keep the id
+of the question they answered (Answer.question_ref), so editing a form
+never loses or rewrites history.
+
+Versions are immutable, so their parsed snapshots are cached per process
+without invalidation, and exports resolve question text and type from
+them instead of joining Question for every answer.
+"""
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .form_builder import serialize_tree
+from .models import Answer, FeedbackForm, FormVersion
+
+
+def _version_key(form_id, number):
+    return f"form:version:{form_id}:{number}"
+
+
+def current_version_id(form):
+    """Id of the FormVersion for the form's current schema, freezing it on first use"""
+    version_id = cache.get(_version_key(form.pk, form.schema_version))
+    if version_id is not None:
+        return version_id
+
+    with transaction.atomic():
+        # ``form`` may have been loaded before an edit committed: lock the row
+        # and freeze the schema as of the version number stored now, so
+        # version N never holds the tree of N + 1
+        number = FeedbackForm.objects.select_for_update().values_list('schema_version', flat=True).get(pk=form.pk)
+        version, _ = FormVersion.objects.get_or_create(
+            form_id=form.pk,
+            number=number,
+            defaults={'schema': serialize_tree(form, include_ids=True)},
+        )
+    version_id = version.pk
+    # (form, schema_version) -> version never changes, but a version
+    # created in a transaction that rolls back must not be remembered
+    transaction.on_commit(lambda: cache.set(_version_key(form.pk, number), version_id, None))
+    return version_id
+
+
+class Snapshot:
+    """Question metadata of one frozen version: ``questions[id]`` -> dict"""
+
+    __slots__ = ('number', 'questions')
+
+    def __init__(self, number, schema):
+        self.number = number
+        self.questions = {}
+        position = 0
+        for section in schema:
+            for question in section['questions']:
+                self.questions[question['id']] = {
+                    'id': question['id'],
+                    'text': question['text'],
+                    'question_type': question['question_type'],
+                    'options': question.get('options'),
+                    'section': section['title'],
+                    'position': position,
+                }
+                position += 1
+
+
+@lru_cache(maxsize=256)
+def get_snapshot(version_id):
+    number, schema = FormVersion.objects.values_list('number', 'schema').get(pk=version_id)
+    return Snapshot(number, schema)
+
+
+def question_catalog(form, live_questions):
+    """
+    Metadata of every question answers of ``form`` can refer to: the live
+    ``live_questions`` in their order, then questions that only exist in
+    earlier versions (newest version first). Returns a list of dicts.
+    """
+    catalog = [
+        {
+            'id': question.id,
+            'text': question.text,
+            'question_type': question.question_type,
+            'options': question.options,
+            'removed': False,
+        }
+        for question in live_questions
+    ]
+    seen = {question['id'] for question in catalog}
+    for version_id in FormVersion.objects.filter(form=form).order_by('-number').values_list('pk', flat=True):
+        for question_id, meta in get_snapshot(version_id).questions.items():
+            if question_id not in seen:
+                seen.add(question_id)
+                catalog.append({**meta, 'removed': True})
+    return catalog
+
+
+def column_header(question):
+    """Export column title of a question_catalog entry"""
+    header = f"{question['text']} ({question['question_type']})"
+    return f"{header} [removed]" if question['removed'] else header
+
+
+def answers_by_response(form):
+    """{response id: {question id: answer text}} for every answer to ``form``, in one query"""
+    answers = {}
+    rows = Answer.objects.filter(response__form=form).values_list('response_id', 'question_ref', 'answer_text')
+    for response_id, question_id, answer_text in rows.iterator(chunk_size=2000):
+        answers.setdefault(response_id, {})[question_id] = answer_text
+    return answers
+
+
+def answered_question_meta(answer, form_version_id):
+    """Text and type of the question an answer was given to, also after the question was deleted"""
+    if answer.question_id is not None:
+        question = answer.question
+        return {'text': question.text, 'question_type': question.question_type}
+    if form_version_id is not None:
+        meta = get_snapshot(form_version_id).questions.get(answer.question_ref)
+        if meta is not None:
+            return meta
+    return {'text': 'Deleted question', 'question_type': ''}
@@ -3,17 +3,25 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Avg, Q, FloatField
+from django.db import transaction
+from django.db.models import Count, Avg, Q, FloatField, Prefetch
 from django.db.models.functions import Cast
 from django.db.models.fields.json import KeyTransform
 
 from django.utils import timezone
-from datetime import timedelta
-from django.http import HttpResponse
+from datetime import datetime, timedelta
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
 from django.contrib.auth.models import User
 # from django.contrib.auth.models import AbstractUser
 import json
 import csv
+import logging
+import math
+import uuid
 import io
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment
@@ -44,11 +52,30 @@ from .serializers import (
     FeedbackFormSerializer, FeedbackFormCreateSerializer,QuestionCreateSerializer,
     FeedbackResponseSerializer, FeedbackResponseCreateSerializer,
     FormAnalyticsSerializer, NotificationSerializer,
-    QuestionAnalyticsSerializer, FormSummarySerializer, AdminSerializers, QuestionOptionCreateSerializer, RegisterSerializer,SectionCreateSerializer
+    QuestionAnalyticsSerializer, FormSummarySerializer, AdminSerializers, QuestionOptionCreateSerializer, RegisterSerializer,SectionCreateSerializer,
+    FormTemplateSerializer, FormTemplateDetailSerializer
 )
 
 from .permissions import IsSuperUser
-from .consumers import send_notification_to_group
+from .reports import collect_forms_report
+from .export_cache import cached_export
+from .db_router import read_from_replica, use_primary
+from . import notifications
+from . import submissions
+from . import ingest
+from . import form_builder
+from . import navigation
+from . import funnel
+from . import http_cache
+from . import form_templates
+from . import versions
+from . import respondents
+from . import search
+from . import throttling
+from . import text_analytics
+
+
+logger = logging.getLogger(__name__)
 
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
@@ -217,6 +244,14 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             return FeedbackFormCreateSerializer
         return FeedbackFormSerializer
 
+    @http_cache.conditional('form_list', http_cache.form_list_state)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @http_cache.conditional('form_detail', http_cache.form_state)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     # def create(self, request, *args, **kwargs):
     #     try:
     #         with transaction.atomic():
@@ -278,31 +313,40 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
         # Create analytics record
         FormAnalytics.objects.create(form=form)
         
-        # Create notification record in database
-        Notification.objects.create(
-            user=self.request.user,
-            notification_type='form_created',
-            title='Form Created',
-            message=f'Form "{form.title}" created successfully',
-            data={"form_id": str(form.id)}
-        )
-        
-        # Send notification
-        send_notification_to_group(
-            f"user_{self.request.user.id}",
-            "form_created",
-            f"Form '{form.title}' created successfully",
+        # Store and push the notification
+        notifications.create_notification(
+            self.request.user,
+            'form_created',
+            'Form Created',
+            f'Form "{form.title}" created successfully',
             {"form_id": str(form.id)}
         )
     
+    def _get_stored_analytics(self, form):
+        """
+        Stored analytics for a form, as maintained on every submission.
+        Exports read these instead of recomputing; the row is only built
+        here when the form has never had analytics computed.
+        """
+        analytics = FormAnalytics.objects.filter(form=form).first()
+        if analytics is None:
+            # Missing here may only mean the replica lags: check, and build, against the primary
+            with use_primary():
+                analytics, created = FormAnalytics.objects.get_or_create(form=form)
+                if created:
+                    analytics.update_analytics()
+        return analytics
+
     @action(detail=True, methods=['get'])
+    @read_from_replica
+    @http_cache.conditional('form_analytics', http_cache.form_daily_state)
     def analytics(self, request, pk=None):
         """Get detailed analytics for a specific form"""
         try:
             form = self.get_object()
-            analytics, created = FormAnalytics.objects.get_or_create(form=form)
-            analytics.update_analytics()
-            
+            # Maintained on every submission; rebuilding here would scan every answer per poll
+            analytics = self._get_stored_analytics(form)
+
             serializer = FormAnalyticsSerializer(analytics)
             return Response(serializer.data)
         except Exception as e:
@@ -376,6 +420,73 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=True, methods=['patch'], url_path='schema')
+    def patch_schema(self, request, pk=None):
+        """Apply add/update/move/delete operations to the form's sections, questions and option links"""
+        form = self.get_object()
+        schema_version = request.data.get('schema_version')
+        operations = request.data.get('operations')
+        if type(schema_version) is not int or not isinstance(operations, list) or not operations:
+            return Response(
+                {"error": "schema_version (integer) and a non-empty operations list are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(operation, dict) for operation in operations):
+            return Response({"error": "Every operation must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            new_version, results = form_builder.apply_operations(form, schema_version, operations)
+        except form_builder.SchemaConflict as e:
+            # The client must reload the form and reapply its edits
+            return Response(
+                {"error": "Form was changed by someone else", "schema_version": e.current_version},
+                status=status.HTTP_409_CONFLICT
+            )
+        except form_builder.InvalidOperation as e:
+            return Response(
+                {"error": str(e), "operation": e.index},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({"schema_version": new_version, "results": results})
+
+    @action(detail=True, methods=['post'])
+    def publish_template(self, request, pk=None):
+        """Freeze the form's current sections and questions into a reusable template"""
+        form = self.get_object()
+        template = form_templates.publish(
+            form,
+            request.user,
+            title=request.data.get('title'),
+            description=request.data.get('description'),
+            is_shared=bool(request.data.get('is_shared', False)),
+        )
+        return Response(FormTemplateSerializer(template).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    @read_from_replica
+    def funnel(self, request, pk=None):
+        """Reach, completion and drop-off per section along the respondents' paths"""
+        form = self.get_object()
+        return Response(funnel.get_funnel(form))
+
+    @action(detail=True, methods=['get'])
+    def navigation(self, request, pk=None):
+        """Section graph of the form: edges, topological order, cycles and unreachable sections"""
+        form = self.get_object()
+        return Response(navigation.get_graph(form).describe())
+
+    @action(detail=True, methods=['get'])
+    @read_from_replica
+    def word_frequency(self, request, pk=None):
+        """Most frequent terms and two-word phrases in the answers to each text question (?limit=20)"""
+        form = self.get_object()
+        try:
+            limit = max(int(request.query_params.get('limit', 20)), 1)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'form_id': str(form.id), 'questions': text_analytics.word_frequency(form, limit)})
+
     @action(detail=True, methods=['get'])
     def share_link(self, request, pk=None):
         """Get shareable link for the form"""
@@ -400,6 +511,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['get'])
+    @read_from_replica
+    @cached_export('responses_xlsx')
     def export_excel(self, request, pk=None):
         """Export form responses to Excel"""
         try:
@@ -416,13 +529,14 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
             header_alignment = Alignment(horizontal="center", vertical="center")
 
-            # Get all questions for this form
-            questions = form.questions.all().order_by('order')
+            # Current questions plus those only earlier form versions had
+            questions = versions.question_catalog(form, form.questions)
+            answers_by_response = versions.answers_by_response(form)
 
             # Create headers
             headers = ['Response ID', 'Submitted At', 'IP Address']
             for question in questions:
-                headers.append(f"{question.text} ({question.question_type})")
+                headers.append(versions.column_header(question))
 
             # Write headers
             for col_num, header in enumerate(headers, 1):
@@ -437,14 +551,10 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 ws.cell(row=row_num, column=2, value=response.submitted_at.strftime('%Y-%m-%d %H:%M:%S'))
                 ws.cell(row=row_num, column=3, value=response.ip_address or 'N/A')
 
-                # Create a mapping of question_id to answer for this response
-                answer_map = {}
-                for answer in response.answers.all():
-                    answer_map[answer.question.id] = answer.answer_text
-
                 # Fill in answers for each question
+                answer_map = answers_by_response.get(response.id, {})
                 for col_num, question in enumerate(questions, 4):
-                    answer_text = answer_map.get(question.id, 'No Answer')
+                    answer_text = answer_map.get(question['id'], 'No Answer')
                     ws.cell(row=row_num, column=col_num, value=answer_text)
 
             # Auto-adjust column widths
@@ -477,6 +587,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['get'])
+    @read_from_replica
+    @cached_export('responses_csv')
     def export_csv(self, request, pk=None):
         """Export form responses to CSV"""
         try:
@@ -490,13 +602,14 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             # Create CSV writer
             writer = csv.writer(response)
 
-            # Get all questions for this form
-            questions = form.questions.all().order_by('order')
+            # Current questions plus those only earlier form versions had
+            questions = versions.question_catalog(form, form.questions)
+            answers_by_response = versions.answers_by_response(form)
 
             # Write header row
             headers = ['Response ID', 'Submitted At', 'IP Address']
             for question in questions:
-                headers.append(f"{question.text} ({question.question_type})")
+                headers.append(versions.column_header(question))
             writer.writerow(headers)
 
             # Write data rows
@@ -508,17 +621,9 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 ]
 
                 # Add answers for each question
+                answer_map = answers_by_response.get(feedback_response.id, {})
                 for question in questions:
-                    answer = feedback_response.answers.filter(question=question).first()
-                    if answer:
-                        if question.question_type == 'multiple_choice':
-                            row.append(answer.selected_option or 'N/A')
-                        elif question.question_type == 'rating':
-                            row.append(str(answer.rating_value) if answer.rating_value else 'N/A')
-                        else:  # text, textarea
-                            row.append(answer.answer_text or 'N/A')
-                    else:
-                        row.append('N/A')
+                    row.append(answer_map.get(question['id']) or 'N/A')
 
                 writer.writerow(row)
 
@@ -531,6 +636,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['get'])
+    @read_from_replica
+    @cached_export('responses_pdf')
     def export_pdf(self, request, pk=None):
         """Export form responses to PDF"""
         try:
@@ -644,6 +751,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
    
 
     @action(detail=True, methods=['get'])
+    @read_from_replica
+    @cached_export('analytics_xlsx')
     def export_analytics_excel(self, request, pk=None):
         """Export comprehensive analytics for a specific form to Excel"""
         try:
@@ -663,9 +772,9 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             ws_overview = wb.active
             ws_overview.title = "Form Overview"
 
-            # Form basic info
-            analytics, created = FormAnalytics.objects.get_or_create(form=form)
-            analytics.update_analytics()
+            # Form basic info, read from the stored per-question statistics
+            analytics = self._get_stored_analytics(form)
+            questions = list(form.questions)
 
             # Title
             title_cell = ws_overview.cell(row=1, column=1, value=f"Analytics Report: {form.title}")
@@ -682,9 +791,9 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 ['Form Type', form.get_form_type_display()],
                 ['Created Date', form.created_at.strftime('%Y-%m-%d %H:%M:%S')],
                 ['Status', 'Active' if form.is_active else 'Inactive'],
-                ['Total Questions', form.questions.count()],
+                ['Total Questions', len(questions)],
                 ['Total Responses', analytics.total_responses],
-                ['Last Updated', analytics.last_updated.strftime('%Y-%m-%d %H:%M:%S')],
+                ['Statistics As Of', analytics.last_updated.strftime('%Y-%m-%d %H:%M:%S')],
                 ['Description', form.description or 'No description'],
             ]
 
@@ -700,9 +809,6 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
 
             # Add summary charts to overview sheet
             try:
-                # Get summary data for charts
-                questions = form.questions.all().order_by('order')
-
                 # 1. Question Types Distribution Chart
                 question_types = {}
                 for question in questions:
@@ -744,7 +850,7 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                     ws_overview.cell(row=summary_row, column=1, value="Total Responses")
                     ws_overview.cell(row=summary_row, column=2, value=analytics.total_responses)
                     ws_overview.cell(row=summary_row + 1, column=1, value="Total Questions")
-                    ws_overview.cell(row=summary_row + 1, column=2, value=form.questions.count())
+                    ws_overview.cell(row=summary_row + 1, column=2, value=len(questions))
 
                     # Create column chart for summary
                     summary_chart = BarChart()
@@ -768,15 +874,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 pass
 
             # Sheet 2: Rating Questions Analytics
-            questions = form.questions.all().order_by('order')
             rating_questions = [q for q in questions if q.question_type in ['rating', 'rating_10']]
 
-            print(f"Form '{form.title}' has {questions.count()} total questions")
-            print(f"Rating questions found: {len(rating_questions)}")
-            for q in rating_questions:
-                answer_count = Answer.objects.filter(question=q).count()
-                print(f"  - {q.text[:50]}... has {answer_count} answers")
-
             if rating_questions:
                 ws_ratings = wb.create_sheet(title="Rating Analytics")
 
@@ -792,8 +891,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 current_row = 4
                 for question in rating_questions:
                     try:
-                        answers = Answer.objects.filter(question=question)
-                        response_count = answers.count()
+                        stats = analytics.get_question_stats(question)
+                        response_count = stats['response_count']
 
                         if response_count == 0:
                             continue
@@ -805,19 +904,10 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                         ws_ratings.merge_cells(f'A{current_row}:F{current_row}')
                         current_row += 1
 
-                        # Calculate rating distribution
-                        max_rating = 10 if question.question_type == 'rating_10' else 5
-                        distribution = {}
-                        total_rating_sum = 0
-                        valid_ratings = 0
-
-                        for i in range(1, max_rating + 1):
-                            count = answers.filter(answer_text=str(i)).count()
-                            distribution[str(i)] = count
-                            total_rating_sum += i * count
-                            valid_ratings += count
-
-                        avg_rating = total_rating_sum / valid_ratings if valid_ratings > 0 else 0
+                        # Rating distribution from the stored statistics
+                        max_rating = stats.get('max_rating', 10 if question.question_type == 'rating_10' else 5)
+                        distribution = stats.get('distribution', {})
+                        avg_rating = stats.get('average_rating', 0)
 
                         # Summary stats
                         avg_cell = ws_ratings.cell(row=current_row, column=1, value="Average Rating:")
@@ -924,12 +1014,7 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 ws_ratings.column_dimensions['D'].width = 25
 
             # Sheet 3: Multiple Choice Analytics
-            choice_questions = [q for q in questions if q.question_type in ['radio', 'checkbox']]
-
-            print(f"Multiple choice questions found: {len(choice_questions)}")
-            for q in choice_questions:
-                answer_count = Answer.objects.filter(question=q).count()
-                print(f"  - {q.text[:50]}... has {answer_count} answers")
+            choice_questions = [q for q in questions if q.question_type in ['radio', 'checkbox', 'dropdown']]
 
             if choice_questions:
                 ws_choices = wb.create_sheet(title="Multiple Choice Analytics")
@@ -944,8 +1029,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
 
                 current_row = 4
                 for question in choice_questions:
-                    answers = Answer.objects.filter(question=question)
-                    response_count = answers.count()
+                    stats = analytics.get_question_stats(question)
+                    response_count = stats['response_count']
 
                     if response_count == 0:
                         continue
@@ -956,21 +1041,9 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                     ws_choices.merge_cells(f'A{current_row}:E{current_row}')
                     current_row += 1
 
-                    # Calculate distribution
-                    if question.question_type == 'checkbox':
-                        distribution = {}
-                        total_selections = 0
-                        for answer in answers:
-                            options = [opt.strip() for opt in answer.answer_text.split(',') if opt.strip()]
-                            for option in options:
-                                distribution[option] = distribution.get(option, 0) + 1
-                                total_selections += 1
-                    else:
-                        distribution_data = answers.values('answer_text').annotate(
-                            count=Count('answer_text')
-                        ).order_by('-count')
-                        distribution = {item['answer_text']: item['count'] for item in distribution_data}
-                        total_selections = response_count
+                    # Distribution from the stored statistics
+                    distribution = {option: count for option, count in stats.get('distribution', {}).items() if count}
+                    total_selections = stats.get('total_selections', response_count) if question.question_type == 'checkbox' else response_count
 
                     # Summary
                     ws_choices.cell(row=current_row, column=1, value="Total Responses:").font = Font(bold=True)
@@ -1070,11 +1143,6 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             # Sheet 4: Yes/No Analytics
             yesno_questions = [q for q in questions if q.question_type == 'yes_no']
 
-            print(f"Yes/No questions found: {len(yesno_questions)}")
-            for q in yesno_questions:
-                answer_count = Answer.objects.filter(question=q).count()
-                print(f"  - {q.text[:50]}... has {answer_count} answers")
-
             if yesno_questions:
                 ws_yesno = wb.create_sheet(title="Yes-No Analytics")
 
@@ -1088,8 +1156,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
 
                 current_row = 4
                 for question in yesno_questions:
-                    answers = Answer.objects.filter(question=question)
-                    response_count = answers.count()
+                    stats = analytics.get_question_stats(question)
+                    response_count = stats['response_count']
 
                     if response_count == 0:
                         continue
@@ -1101,8 +1169,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                     current_row += 1
 
                     # Calculate Yes/No distribution
-                    yes_count = answers.filter(answer_text='Yes').count()
-                    no_count = answers.filter(answer_text='No').count()
+                    yes_count = stats.get('distribution', {}).get('Yes', 0)
+                    no_count = stats.get('distribution', {}).get('No', 0)
                     yes_percentage = (yes_count / response_count * 100) if response_count > 0 else 0
                     no_percentage = (no_count / response_count * 100) if response_count > 0 else 0
 
@@ -1206,8 +1274,9 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
 
                 current_row = 3
                 for question in text_questions:
-                    answers = Answer.objects.filter(question=question).exclude(answer_text='')
-                    response_count = answers.count()
+                    stats = analytics.get_question_stats(question)
+                    answers = stats.get('answers', [])
+                    response_count = stats.get('answers_seen', len(answers))
 
                     if response_count == 0:
                         continue
@@ -1218,8 +1287,11 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                     ws_text.merge_cells(f'A{current_row}:C{current_row}')
                     current_row += 1
 
-                    # Response count
-                    ws_text.cell(row=current_row, column=1, value=f"Total Responses: {response_count}").font = Font(bold=True)
+                    # Response count; only the most recent answers are stored
+                    count_label = f"Total Responses: {response_count}"
+                    if len(answers) < response_count:
+                        count_label += f" (showing the {len(answers)} most recent)"
+                    ws_text.cell(row=current_row, column=1, value=count_label).font = Font(bold=True)
                     current_row += 2
 
                     # Headers
@@ -1232,10 +1304,11 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                     current_row += 1
 
                     # Responses
-                    for idx, answer in enumerate(answers.order_by('-response__submitted_at'), 1):
+                    for idx, answer in enumerate(answers, 1):
+                        submitted_at = datetime.fromisoformat(answer['submitted_at'])
                         ws_text.cell(row=current_row, column=1, value=idx)
-                        ws_text.cell(row=current_row, column=2, value=answer.answer_text[:500] + ('...' if len(answer.answer_text) > 500 else ''))
-                        ws_text.cell(row=current_row, column=3, value=answer.response.submitted_at.strftime('%Y-%m-%d %H:%M:%S'))
+                        ws_text.cell(row=current_row, column=2, value=answer['text'][:500] + ('...' if len(answer['text']) > 500 else ''))
+                        ws_text.cell(row=current_row, column=3, value=submitted_at.strftime('%Y-%m-%d %H:%M:%S'))
                         current_row += 1
 
                     current_row += 2  # Space between questions
@@ -1245,6 +1318,59 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 ws_text.column_dimensions['B'].width = 60
                 ws_text.column_dimensions['C'].width = 20
 
+            # Sheet 6: Word Frequency
+            word_frequency = text_analytics.word_frequency(form)
+
+            if word_frequency:
+                ws_words = wb.create_sheet(title="Word Frequency")
+
+                # Title
+                ws_words.cell(row=1, column=1, value="Word Frequency").font = Font(bold=True, size=14)
+                ws_words.merge_cells('A1:D1')
+
+                current_row = 3
+                for question in word_frequency:
+                    # Question header
+                    ws_words.cell(row=current_row, column=1, value=f"Q: {question['question_text']}").font = subheader_font
+                    ws_words.cell(row=current_row, column=1).fill = subheader_fill
+                    ws_words.merge_cells(f'A{current_row}:D{current_row}')
+                    current_row += 1
+
+                    ws_words.cell(
+                        row=current_row, column=1,
+                        value=f"Answers: {question['answers_seen']} (counts may be up to "
+                              f"{question['max_overcount']} too high)"
+                    ).font = Font(bold=True)
+                    current_row += 2
+
+                    # Headers
+                    headers = ['Term', 'Answers', 'Phrase', 'Answers']
+                    for col_num, header in enumerate(headers, 1):
+                        cell = ws_words.cell(row=current_row, column=col_num, value=header)
+                        cell.font = header_font
+                        cell.fill = header_fill
+                        cell.alignment = header_alignment
+                    current_row += 1
+
+                    # Terms and phrases side by side
+                    terms = question['terms']
+                    phrases = question['phrases']
+                    for i in range(max(len(terms), len(phrases))):
+                        if i < len(terms):
+                            ws_words.cell(row=current_row, column=1, value=terms[i]['term'])
+                            ws_words.cell(row=current_row, column=2, value=terms[i]['count'])
+                        if i < len(phrases):
+                            ws_words.cell(row=current_row, column=3, value=phrases[i]['phrase'])
+                            ws_words.cell(row=current_row, column=4, value=phrases[i]['count'])
+                        current_row += 1
+
+                    current_row += 2  # Space between questions
+
+                ws_words.column_dimensions['A'].width = 25
+                ws_words.column_dimensions['B'].width = 10
+                ws_words.column_dimensions['C'].width = 35
+                ws_words.column_dimensions['D'].width = 10
+
             # Create HTTP response
             response = HttpResponse(
                 content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -1265,12 +1391,13 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['get'])
+    @read_from_replica
+    @cached_export('analytics_csv')
     def export_analytics_csv(self, request, pk=None):
         """Export comprehensive analytics for a specific form to CSV"""
         try:
             form = self.get_object()
-            analytics, created = FormAnalytics.objects.get_or_create(form=form)
-            analytics.update_analytics()
+            analytics = self._get_stored_analytics(form)
 
             # Create CSV response
             response = HttpResponse(content_type='text/csv')
@@ -1287,34 +1414,27 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             writer.writerow(['Total Responses', analytics.total_responses])
             writer.writerow(['Completion Rate', f"{analytics.completion_rate:.2f}%"])
             writer.writerow(['Average Rating', f"{analytics.average_rating:.2f}"])
+            writer.writerow(['Statistics As Of', analytics.last_updated.strftime('%Y-%m-%d %H:%M:%S')])
             writer.writerow([])  # Empty row
 
             # Write question analytics section
             writer.writerow(['QUESTION ANALYTICS'])
             writer.writerow(['Question', 'Type', 'Response Count', 'Average Rating', 'Answer Distribution'])
 
-            questions = form.questions.all().order_by('order')
-            for question in questions:
-                answers = Answer.objects.filter(question=question)
-                response_count = answers.count()
+            for question in form.questions:
+                stats = analytics.get_question_stats(question)
+                response_count = stats['response_count']
 
-                if question.question_type == 'rating':
-                    avg_rating = answers.aggregate(avg=Avg('rating_value'))['avg'] or 0
+                if question.question_type in ['rating', 'rating_10']:
                     writer.writerow([
                         question.text,
                         question.question_type,
                         response_count,
-                        f"{avg_rating:.2f}",
-                        'N/A'
+                        f"{stats.get('average_rating', 0):.2f}",
+                        '; '.join([f"{k}: {v}" for k, v in stats.get('distribution', {}).items()])
                     ])
-                elif question.question_type == 'multiple_choice':
-                    # Calculate distribution
-                    distribution = {}
-                    for option in question.options:
-                        count = answers.filter(selected_option=option).count()
-                        if count > 0:
-                            distribution[option] = count
-
+                elif question.question_type in ['radio', 'checkbox', 'yes_no', 'dropdown']:
+                    distribution = {k: v for k, v in stats.get('distribution', {}).items() if v > 0}
                     dist_str = '; '.join([f"{k}: {v}" for k, v in distribution.items()])
                     writer.writerow([
                         question.text,
@@ -1323,7 +1443,7 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                         'N/A',
                         dist_str
                     ])
-                else:  # text, textarea
+                else:  # text, textarea, email, phone
                     writer.writerow([
                         question.text,
                         question.question_type,
@@ -1341,12 +1461,13 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['get'])
+    @read_from_replica
+    @cached_export('analytics_pdf')
     def export_analytics_pdf(self, request, pk=None):
         """Export comprehensive analytics for a specific form to PDF"""
         try:
             form = self.get_object()
-            analytics, created = FormAnalytics.objects.get_or_create(form=form)
-            analytics.update_analytics()
+            analytics = self._get_stored_analytics(form)
 
             # Create PDF response
             response = HttpResponse(content_type='application/pdf')
@@ -1384,7 +1505,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
                 ['Created At', form.created_at.strftime('%Y-%m-%d %H:%M:%S')],
                 ['Total Responses', str(analytics.total_responses)],
                 ['Completion Rate', f"{analytics.completion_rate:.2f}%"],
-                ['Average Rating', f"{analytics.average_rating:.2f}"]
+                ['Average Rating', f"{analytics.average_rating:.2f}"],
+                ['Statistics As Of', analytics.last_updated.strftime('%Y-%m-%d %H:%M:%S')]
             ]
 
             overview_table = Table(overview_data, colWidths=[2*inch, 3*inch])
@@ -1403,31 +1525,25 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
             # Question analytics section
             story.append(Paragraph("Question Analytics", overview_style))
 
-            questions = form.questions.all().order_by('order')
             question_data = [['Question', 'Type', 'Responses', 'Avg Rating', 'Top Answer']]
 
-            for question in questions:
-                answers = Answer.objects.filter(question=question)
-                response_count = answers.count()
+            for question in form.questions:
+                stats = analytics.get_question_stats(question)
+                response_count = stats['response_count']
 
-                if question.question_type == 'rating':
-                    avg_rating = answers.aggregate(avg=Avg('rating_value'))['avg'] or 0
-                    top_answer = f"{avg_rating:.2f}"
-                elif question.question_type == 'multiple_choice':
+                if question.question_type in ['rating', 'rating_10']:
+                    avg_rating = f"{stats.get('average_rating', 0):.2f}"
+                    top_answer = avg_rating
+                elif question.question_type in ['radio', 'checkbox', 'yes_no', 'dropdown']:
                     # Find most common answer
-                    distribution = {}
-                    for option in question.options:
-                        count = answers.filter(selected_option=option).count()
-                        if count > 0:
-                            distribution[option] = count
-
+                    distribution = {k: v for k, v in stats.get('distribution', {}).items() if v > 0}
                     if distribution:
                         top_answer = max(distribution, key=distribution.get)
                         top_answer = f"{top_answer} ({distribution[top_answer]})"
                     else:
                         top_answer = "No responses"
                     avg_rating = "N/A"
-                else:  # text, textarea
+                else:  # text, textarea, email, phone
                     avg_rating = "N/A"
                     top_answer = "Text responses"
 
@@ -1468,6 +1584,8 @@ class FeedbackFormViewSet(viewsets.ModelViewSet):
 
     
     @action(detail=True, methods=['get'])
+    @read_from_replica
+    @http_cache.conditional('question_analytics', http_cache.form_state)
     def question_analytics(self, request, pk=None):
     
         try:
@@ -1643,129 +1761,254 @@ class PublicFeedbackFormView(APIView):
                     status=status.HTTP_410_GONE
                 )
             
-            # 🔥 FIX: Get all required questions from all sections
-            required_questions = []
-            form_question_ids = []
-            
-            for section in form.sections.all():
-                section_required = section.questions.filter(is_required=True)
-                required_questions.extend(section_required)
-                
-                # Also collect all question IDs for validation
-                section_questions = section.questions.all()
-                form_question_ids.extend([q.id for q in section_questions])
-            
-            print(f"🔍 DEBUG: Found {len(required_questions)} required questions")
-            print(f"🔍 DEBUG: Form has {len(form_question_ids)} total questions")
-            
-            submitted_answers = request.data.get('answers', [])
-            submitted_question_ids = [answer['question'] for answer in submitted_answers]
-            
-            print(f"🔍 DEBUG: Received {len(submitted_answers)} answers")
-            print(f"🔍 DEBUG: Submitted question IDs: {submitted_question_ids}")
-            
-            # Validate that all required questions are answered
-            missing_required = []
-            for question in required_questions:
-                if question.id not in submitted_question_ids:
-                    missing_required.append({
-                        'question_id': question.id,
-                        'question_text': question.text
-                    })
-                    print(f"❌ MISSING REQUIRED: Q{question.id} - '{question.text}'")
-            
-            if missing_required:
+            # Per-IP and per-form token buckets, before any real work
+            wait = throttling.submission_wait(submissions.client_ip(request), form.id)
+            if wait:
                 return Response(
-                    {
-                        'error': 'Missing required questions',
-                        'missing_questions': missing_required
-                    }, 
-                    status=status.HTTP_400_BAD_REQUEST
+                    {'error': 'Too many submissions, please try again later'},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(math.ceil(wait))}
                 )
             
-            # Validate that all submitted questions exist in this form
-            invalid_questions = []
-            for answer in submitted_answers:
-                question_id = answer.get('question')
-                if question_id not in form_question_ids:
-                    invalid_questions.append(question_id)
-                    print(f"❌ INVALID QUESTION: {question_id}")
+            graph = navigation.get_graph(form)
+            submitted_answers = request.data.get('answers', [])
+            
+            # Required questions on the respondent's path answered, and only questions of this form
+            error = submissions.validate_answers(graph, submitted_answers)
+            if error:
+                logger.debug("Rejected submission to form %s: %s", form.id, error)
+                return Response(error, status=status.HTTP_400_BAD_REQUEST)
             
-            if invalid_questions:
+            # Client retries and identical resubmissions get the response already stored
+            guard = submissions.SubmissionGuard(form, submitted_answers, request)
+            error = guard.key_error()
+            if error:
+                return Response(error, status=status.HTTP_400_BAD_REQUEST)
+            duplicate = guard.claim()
+            if duplicate == submissions.IN_PROGRESS:
                 return Response(
-                    {
-                        'error': 'Invalid questions submitted',
-                        'invalid_questions': invalid_questions
-                    }, 
-                    status=status.HTTP_400_BAD_REQUEST
+                    {'error': 'This submission is already being processed'},
+                    status=status.HTTP_409_CONFLICT
                 )
+            if duplicate:
+                return Response({
+                    'message': 'Feedback already submitted',
+                    'response_id': duplicate,
+                    'duplicate': True
+                }, status=status.HTTP_200_OK)
             
-            # Create response
-            response_data = {
-                'form': form.id,
-                'answers': submitted_answers
-            }
-            
-            serializer = FeedbackResponseCreateSerializer(
-                data=response_data, 
-                context={'request': request}
-            )
-            
-            if serializer.is_valid():
-                response = serializer.save()
-                
-                # Update analytics
-                analytics, created = FormAnalytics.objects.get_or_create(form=form)
-                analytics.update_analytics()
-                
-                # Create notification record in database
-                Notification.objects.create(
-                    user=form.created_by,
-                    notification_type='new_response',
-                    title='New Response Received',
-                    message=f'New response received for "{form.title}"',
-                    data={
-                        "form_id": str(form.id),
-                        "response_id": str(response.id),
-                        "form_title": form.title
-                    }
-                )
+            try:
+                if ingest.is_buffered():
+                    # Durably queued; the batch writer stores it shortly
+                    response_id, errors = submissions.enqueue_submission(
+                        form, submitted_answers, request, idempotency_key=guard.idempotency_key
+                    )
+                    if response_id is not None:
+                        guard.complete(response_id)
+                        return Response({
+                            'message': 'Feedback submitted successfully',
+                            'response_id': str(response_id)
+                        }, status=status.HTTP_202_ACCEPTED)
+                    guard.release()
+                    logger.debug("Rejected submission to form %s: %s", form.id, errors)
+                    return Response(errors, status=status.HTTP_400_BAD_REQUEST)
                 
-                # Send real-time notification to form creator
-                send_notification_to_group(
-                    f"user_{form.created_by.id}",
-                    "new_response",
-                    f"New response received for '{form.title}'",
-                    {
-                        "form_id": str(form.id),
-                        "response_id": str(response.id),
-                        "form_title": form.title
-                    }
+                response, errors = submissions.save_submission(
+                    form, submitted_answers, request, idempotency_key=guard.idempotency_key
                 )
-                
-                print(f"✅ SUCCESS: Response {response.id} submitted successfully")
+            except submissions.DuplicateSubmission as stored:
+                guard.complete(stored.response_id)
+                return Response({
+                    'message': 'Feedback already submitted',
+                    'response_id': stored.response_id,
+                    'duplicate': True
+                }, status=status.HTTP_200_OK)
+            except Exception:
+                guard.release()
+                raise
+            
+            if response is not None:
+                guard.complete(response.id)
+                # Notify the form creator (coalesced with other recent responses)
+                notifications.notify_new_response(form, response)
                 return Response({
                     'message': 'Feedback submitted successfully',
                     'response_id': str(response.id)
                 }, status=status.HTTP_201_CREATED)
             
-            print(f"❌ SERIALIZER ERRORS: {serializer.errors}")
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            guard.release()
+            logger.debug("Rejected submission to form %s: %s", form.id, errors)
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
         
         except FeedbackForm.DoesNotExist:
-            print(f"❌ FORM NOT FOUND: {form_id}")
             return Response(
                 {'error': 'Form not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as e:
-            print(f"💥 ERROR in PublicFeedbackFormView: {str(e)}")
-            import traceback
-            print(f"💥 TRACEBACK: {traceback.format_exc()}")
+        except Exception:
+            logger.exception("Submission to form %s failed", form_id)
             return Response(
                 {'error': 'Internal server error'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+@csrf_exempt
+@require_POST
+async def public_feedback_submit(request, form_id):
+    """
+    Async variant of PublicFeedbackFormView.post.
+
+    Reads use the async ORM, the write (response, answers, analytics and
+    notification row) runs in a single sync_to_async block, and the
+    notification is awaited on the channel layer directly. A submission
+    only holds a thread while it writes.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=status.HTTP_400_BAD_REQUEST)
+    submitted_answers = payload.get('answers', []) if isinstance(payload, dict) else None
+    if not isinstance(submitted_answers, list) or not all(isinstance(a, dict) for a in submitted_answers):
+        return JsonResponse({'error': 'answers must be a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+
+    form = await FeedbackForm.objects.filter(id=form_id, is_active=True).afirst()
+    if form is None:
+        return JsonResponse({'error': 'Form not found'}, status=status.HTTP_404_NOT_FOUND)
+    if form.is_expired:
+        return JsonResponse({'error': 'This form has expired'}, status=status.HTTP_410_GONE)
+
+    # The shared-cache buckets do network I/O
+    wait = await sync_to_async(throttling.submission_wait)(submissions.client_ip(request), form.id)
+    if wait:
+        response = JsonResponse(
+            {'error': 'Too many submissions, please try again later'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
+
+    # Usually a cache hit; compiling on a miss needs the sync ORM
+    graph = await sync_to_async(navigation.get_graph)(form)
+    error = submissions.validate_answers(graph, submitted_answers)
+    if error:
+        return JsonResponse(error, status=status.HTTP_400_BAD_REQUEST)
+
+    guard = submissions.SubmissionGuard(form, submitted_answers, request)
+    error = guard.key_error()
+    if error:
+        return JsonResponse(error, status=status.HTTP_400_BAD_REQUEST)
+    duplicate = await sync_to_async(guard.claim)()
+    if duplicate == submissions.IN_PROGRESS:
+        return JsonResponse(
+            {'error': 'This submission is already being processed'},
+            status=status.HTTP_409_CONFLICT
+        )
+    if duplicate:
+        return JsonResponse({
+            'message': 'Feedback already submitted',
+            'response_id': duplicate,
+            'duplicate': True
+        }, status=status.HTTP_200_OK)
+
+    if ingest.is_buffered():
+        def enqueue():
+            try:
+                response_id, errors = submissions.enqueue_submission(
+                    form, submitted_answers, request, idempotency_key=guard.idempotency_key
+                )
+            except Exception:
+                guard.release()
+                raise
+            if response_id is None:
+                guard.release()
+            else:
+                guard.complete(response_id)
+            return response_id, errors
+
+        # Durably queued; the batch writer stores it shortly
+        response_id, errors = await sync_to_async(enqueue)()
+        if response_id is None:
+            return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({
+            'message': 'Feedback submitted successfully',
+            'response_id': str(response_id)
+        }, status=status.HTTP_202_ACCEPTED)
+
+    def write():
+        try:
+            response, errors = submissions.save_submission(
+                form, submitted_answers, request, idempotency_key=guard.idempotency_key
+            )
+        except submissions.DuplicateSubmission as stored:
+            guard.complete(stored.response_id)
+            raise
+        except Exception:
+            guard.release()
+            raise
+        pending = None
+        if response is None:
+            guard.release()
+        else:
+            guard.complete(response.id)
+            pending = notifications.prepare_new_response_notification(form, response)
+        return response, errors, pending
+
+    try:
+        response, errors, pending = await sync_to_async(write)()
+    except submissions.DuplicateSubmission as stored:
+        return JsonResponse({
+            'message': 'Feedback already submitted',
+            'response_id': stored.response_id,
+            'duplicate': True
+        }, status=status.HTTP_200_OK)
+    if response is None:
+        return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    if pending is not None:
+        group_name, event = pending
+        await get_channel_layer().group_send(group_name, event)
+
+    return JsonResponse({
+        'message': 'Feedback submitted successfully',
+        'response_id': str(response.id)
+    }, status=status.HTTP_201_CREATED)
+
+
+class FormTemplateViewSet(viewsets.ReadOnlyModelViewSet):
+    """Published form templates: list, inspect, instantiate and delete"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return form_templates.usable_by(self.request.user).select_related('created_by')
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return FormTemplateDetailSerializer
+        return FormTemplateSerializer
+
+    def destroy(self, request, pk=None):
+        template = self.get_object()
+        if template.created_by_id != request.user.id and not request.user.is_superuser:
+            return Response(
+                {"error": "Only the creator can delete a template"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        # Forms instantiated from it keep their own copies
+        template.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def instantiate(self, request, pk=None):
+        """Create a new form owned by the requesting user from the template"""
+        template = self.get_object()
+        form = form_templates.instantiate(template, request.user, title=request.data.get('title'))
+        form = FeedbackForm.objects.prefetch_related(
+            'sections__questions__option_links__next_section'
+        ).get(pk=form.pk)
+        return Response(FeedbackFormSerializer(form).data, status=status.HTTP_201_CREATED)
+
+
 class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing feedback responses"""
     serializer_class = FeedbackResponseSerializer
@@ -1787,6 +2030,39 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
 
         return FeedbackResponse.objects.filter(form__created_by=user)
 
+    def get_export_forms(self):
+        """Forms covered by the cross-form exports for the requesting user"""
+        user = self.request.user
+        return FeedbackForm.objects.all() if user.is_superuser else FeedbackForm.objects.filter(created_by=user)
+
+    @action(detail=False, methods=['get'])
+    @read_from_replica
+    def search(self, request):
+        """Full-text search over text answers: ?q=terms[&form=<form id>][&limit=20][&offset=0]"""
+        query = (request.query_params.get('q') or '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            form_id = request.query_params.get('form')
+            form_id = uuid.UUID(form_id) if form_id else None
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response(
+                {"error": "form must be a form id, limit and offset integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user
+        results = search.search(
+            query,
+            owner_id=None if user.is_superuser else user.pk,
+            form_id=form_id,
+            limit=limit,
+            offset=offset,
+        )
+        return Response({'query': query, 'limit': limit, 'offset': offset, 'results': results})
+
 
     # def create(self, request, *args, **kwargs):
     #     try:
@@ -1799,6 +2075,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
     #         )    
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @cached_export('all_responses_xlsx')
     def export_all_excel(self, request):
         """Export all responses from all forms to Excel"""
         try:
@@ -1833,14 +2111,18 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
 
             # Write data
             row_num = 2
+            responses = responses.select_related('form').prefetch_related(
+                Prefetch('answers', queryset=Answer.objects.select_related('question'))
+            )
             for response in responses:
                 for answer in response.answers.all():
+                    question = versions.answered_question_meta(answer, response.form_version_id)
                     ws.cell(row=row_num, column=1, value=str(response.id))
                     ws.cell(row=row_num, column=2, value=response.form.title)
                     ws.cell(row=row_num, column=3, value=response.submitted_at.strftime('%Y-%m-%d %H:%M:%S'))
                     ws.cell(row=row_num, column=4, value=response.ip_address or 'N/A')
-                    ws.cell(row=row_num, column=5, value=answer.question.text)
-                    ws.cell(row=row_num, column=6, value=answer.question.question_type)
+                    ws.cell(row=row_num, column=5, value=question['text'])
+                    ws.cell(row=row_num, column=6, value=question['question_type'])
                     ws.cell(row=row_num, column=7, value=answer.answer_text)
                     row_num += 1
 
@@ -1874,6 +2156,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @cached_export('all_responses_csv')
     def export_all_csv(self, request):
         """Export all responses from all forms to CSV"""
         try:
@@ -1898,13 +2182,16 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             writer.writerow(headers)
 
             # Write data rows
+            responses = responses.select_related('form').prefetch_related(
+                Prefetch('answers', queryset=Answer.objects.select_related('question'))
+            )
             for feedback_response in responses:
                 for answer in feedback_response.answers.all():
-                    question = answer.question
+                    question = versions.answered_question_meta(answer, feedback_response.form_version_id)
 
-                    if question.question_type == 'multiple_choice':
-                        answer_text = answer.selected_option or 'N/A'
-                    elif question.question_type == 'rating':
+                    if question['question_type'] == 'multiple_choice':
+                        answer_text = answer.answer_text or 'N/A'
+                    elif question['question_type'] == 'rating':
                         answer_text = str(answer.answer_value.get('value')) if answer.answer_value.get('value') else answer.answer_text or 'N/A'
                     else:  # text, textarea
                         answer_text = answer.answer_text or 'N/A'
@@ -1914,8 +2201,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
                         feedback_response.form.title,
                         feedback_response.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
                         feedback_response.ip_address or 'N/A',
-                        question.text,
-                        question.question_type,
+                        question['text'],
+                        question['question_type'],
                         answer_text
                     ])
 
@@ -1930,6 +2217,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @cached_export('all_responses_pdf')
     def export_all_pdf(self, request):
         """Export all responses from all forms to PDF"""
         try:
@@ -2030,6 +2319,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @cached_export('all_analytics_xlsx')
     def export_analytics_excel(self, request):
         """Export comprehensive analytics for all forms to Excel"""
         try:
@@ -2059,10 +2350,14 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             ws_overview.cell(row=2, column=1, value="📊 Charts are embedded in this Excel file. Scroll right or check other sheets to view visual analytics.").font = Font(italic=True, color="0066CC")
             ws_overview.merge_cells('A2:I2')
 
+            # All figures below come from a handful of grouped queries
+            report = collect_forms_report(forms)
+            forms = report['forms']
+
             # Summary stats
-            total_forms = forms.count()
-            total_responses = sum(form.responses.count() for form in forms)
-            active_forms = forms.filter(is_active=True).count()
+            total_forms = report['total_forms']
+            total_responses = report['total_responses']
+            active_forms = report['active_forms']
 
             ws_overview.cell(row=4, column=1, value="Summary Statistics").font = subheader_font
             ws_overview.cell(row=4, column=1).fill = subheader_fill
@@ -2124,23 +2419,20 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
 
             # Write overview data
             for row_num, form in enumerate(forms, 11):
-                analytics, created = FormAnalytics.objects.get_or_create(form=form)
-                analytics.update_analytics()
-
-                last_response = form.responses.order_by('-submitted_at').first()
-                last_response_date = last_response.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if last_response else 'No responses'
+                form_stats = report['form_stats'][form.id]
+                last_response_date = form_stats['last_submitted_at'].strftime('%Y-%m-%d %H:%M:%S') if form_stats['last_submitted_at'] else 'No responses'
 
                 ws_overview.cell(row=row_num, column=1, value=form.title)
                 ws_overview.cell(row=row_num, column=2, value=form.get_form_type_display())
                 ws_overview.cell(row=row_num, column=3, value=form.created_at.strftime('%Y-%m-%d'))
                 ws_overview.cell(row=row_num, column=4, value='Active' if form.is_active else 'Inactive')
-                ws_overview.cell(row=row_num, column=5, value=form.questions.count())
-                ws_overview.cell(row=row_num, column=6, value=analytics.total_responses)
+                ws_overview.cell(row=row_num, column=5, value=form_stats['total_questions'])
+                ws_overview.cell(row=row_num, column=6, value=form_stats['total_responses'])
                 ws_overview.cell(row=row_num, column=7, value=last_response_date)
 
             # Add a simple visible chart to the overview
             try:
-                if forms.count() > 0:
+                if total_forms > 0:
                     # Create a chart showing response counts
                     overview_chart = BarChart()
                     overview_chart.type = "col"
@@ -2150,8 +2442,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
                     overview_chart.x_axis.title = 'Forms'
 
                     # Use form titles and response counts
-                    chart_labels = Reference(ws_overview, min_col=1, min_row=11, max_row=10+forms.count())
-                    chart_data = Reference(ws_overview, min_col=6, min_row=11, max_row=10+forms.count())
+                    chart_labels = Reference(ws_overview, min_col=1, min_row=11, max_row=10+total_forms)
+                    chart_data = Reference(ws_overview, min_col=6, min_row=11, max_row=10+total_forms)
 
                     overview_chart.add_data(chart_data, titles_from_data=False)
                     overview_chart.set_categories(chart_labels)
@@ -2161,8 +2453,6 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
                     overview_chart.height = 8
                     ws_overview.add_chart(overview_chart, "I11")  # Right side, visible
 
-                    print(f"Added overview chart at I11 with {forms.count()} forms")
-
             except Exception as chart_error:
                 print(f"Overview chart error: {chart_error}")
                 pass
@@ -2183,9 +2473,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             # Sheet 2: Rating Questions Summary
             all_rating_questions = []
             for form in forms:
-                questions = form.questions.filter(question_type__in=['rating', 'rating_10'])
-                for question in questions:
-                    if Answer.objects.filter(question=question).count() > 0:
+                for question in report['questions'].get(form.id, []):
+                    if question.question_type in ['rating', 'rating_10'] and report['question_stats'][question.id]['response_count'] > 0:
                         all_rating_questions.append((form, question))
 
             if all_rating_questions:
@@ -2205,25 +2494,15 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
 
                 current_row = 4
                 for form, question in all_rating_questions:
-                    answers = Answer.objects.filter(question=question)
-                    response_count = answers.count()
-
-                    # Calculate average rating
-                    max_rating = 10 if question.question_type == 'rating_10' else 5
-                    total_rating_sum = 0
-                    valid_ratings = 0
-
-                    for i in range(1, max_rating + 1):
-                        count = answers.filter(answer_text=str(i)).count()
-                        total_rating_sum += i * count
-                        valid_ratings += count
-
-                    avg_rating = total_rating_sum / valid_ratings if valid_ratings > 0 else 0
+                    stats = report['question_stats'][question.id]
+                    response_count = stats['response_count']
+                    max_rating = stats['max_rating']
+                    avg_rating = stats['average_rating']
 
                     # Create distribution summary
                     distribution_summary = []
                     for i in range(max_rating, 0, -1):
-                        count = answers.filter(answer_text=str(i)).count()
+                        count = stats['distribution'].get(str(i), 0)
                         if count > 0:
                             distribution_summary.append(f"{i}★:{count}")
 
@@ -2274,9 +2553,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             # Sheet 3: Choice Questions Summary
             all_choice_questions = []
             for form in forms:
-                questions = form.questions.filter(question_type__in=['radio', 'checkbox', 'yes_no'])
-                for question in questions:
-                    if Answer.objects.filter(question=question).count() > 0:
+                for question in report['questions'].get(form.id, []):
+                    if question.question_type in ['radio', 'checkbox', 'yes_no'] and report['question_stats'][question.id]['response_count'] > 0:
                         all_choice_questions.append((form, question))
 
             if all_choice_questions:
@@ -2296,21 +2574,9 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
 
                 current_row = 4
                 for form, question in all_choice_questions:
-                    answers = Answer.objects.filter(question=question)
-                    response_count = answers.count()
-
-                    # Calculate distribution
-                    if question.question_type == 'checkbox':
-                        distribution = {}
-                        for answer in answers:
-                            options = [opt.strip() for opt in answer.answer_text.split(',') if opt.strip()]
-                            for option in options:
-                                distribution[option] = distribution.get(option, 0) + 1
-                    else:
-                        distribution_data = answers.values('answer_text').annotate(
-                            count=Count('answer_text')
-                        ).order_by('-count')
-                        distribution = {item['answer_text']: item['count'] for item in distribution_data}
+                    stats = report['question_stats'][question.id]
+                    response_count = stats['response_count']
+                    distribution = {option: count for option, count in stats['distribution'].items() if count > 0}
 
                     # Get top answer
                     top_answer = max(distribution, key=distribution.get) if distribution else 'N/A'
@@ -2384,6 +2650,8 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @cached_export('all_analytics_csv')
     def export_analytics_csv(self, request):
         """Export comprehensive analytics for all forms to CSV"""
         try:
@@ -2407,17 +2675,20 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             writer.writerow(['FORMS OVERVIEW'])
             writer.writerow(['Form Title', 'Status', 'Created', 'Total Responses', 'Completion Rate', 'Average Rating'])
 
+            # All figures below come from a handful of grouped queries
+            report = collect_forms_report(forms)
+            forms = report['forms']
+
             for form in forms:
-                analytics, created = FormAnalytics.objects.get_or_create(form=form)
-                analytics.update_analytics()
+                form_stats = report['form_stats'][form.id]
 
                 writer.writerow([
                     form.title,
                     'Active' if form.is_active else 'Inactive',
                     form.created_at.strftime('%Y-%m-%d'),
-                    analytics.total_responses,
-                    f"{analytics.completion_rate:.2f}%",
-                    f"{analytics.average_rating:.2f}"
+                    form_stats['total_responses'],
+                    f"{form_stats['completion_rate']:.2f}%",
+                    f"{form_stats['average_rating']:.2f}"
                 ])
 
             writer.writerow([])  # Empty row
@@ -2427,33 +2698,23 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             writer.writerow(['Form', 'Question', 'Type', 'Responses', 'Average Rating', 'Top Answer'])
 
             for form in forms:
-                questions = form.questions.all().order_by('order')
-                for question in questions:
-                    answers = Answer.objects.filter(question=question)
-                    response_count = answers.count()
-
-                    if question.question_type == 'rating':
-                        # avg_rating = round(answers.aggregate(avg=(Avg('answer_value')))['avg'] or 0)
-                        avg_rating = answers.annotate(
-                                      rating=Cast(KeyTransform('rating', 'answer_value'), FloatField())
-                        ).aggregate(avg=Avg('rating'))['avg'] or 0
+                for question in report['questions'].get(form.id, []):
+                    stats = report['question_stats'][question.id]
+                    response_count = stats['response_count']
 
+                    if question.question_type in ['rating', 'rating_10']:
+                        avg_rating = stats['average_rating']
                         top_answer = f"{avg_rating:.2f}"
-                    elif question.question_type == 'multiple_choice':
+                    elif question.question_type in ['radio', 'checkbox', 'yes_no', 'dropdown']:
                         # Find most common answer
-                        distribution = {}
-                        for option in question.options:
-                            count = answers.filter(selected_option=option).count()
-                            if count > 0:
-                                distribution[option] = count
-
+                        distribution = {k: v for k, v in stats['distribution'].items() if v > 0}
                         if distribution:
                             top_answer = max(distribution, key=distribution.get)
                             top_answer = f"{top_answer} ({distribution[top_answer]})"
                         else:
                             top_answer = "No responses"
                         avg_rating = "N/A"
-                    else:  # text, textarea
+                    else:  # text, textarea, email, phone
                         avg_rating = "N/A"
                         top_answer = "Text responses"
 
@@ -2477,12 +2738,18 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @cached_export('all_analytics_pdf')
     def export_analytics_pdf(self, request):
         """Export comprehensive analytics for all forms to PDF"""
         try:
             user = request.user
             forms = FeedbackForm.objects.all() if user.is_superuser else FeedbackForm.objects.filter(created_by=user)
 
+            # All figures below come from a handful of grouped queries
+            report = collect_forms_report(forms)
+            forms = report['forms']
+
             # Create PDF response
             response = HttpResponse(content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="comprehensive_analytics_{user.username}_{timezone.now().strftime("%Y%m%d")}.pdf"'
@@ -2507,7 +2774,7 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             info_style = styles['Normal']
             story.append(Paragraph(f"<b>Generated:</b> {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}", info_style))
             story.append(Paragraph(f"<b>User:</b> {user.username}", info_style))
-            story.append(Paragraph(f"<b>Total Forms:</b> {forms.count()}", info_style))
+            story.append(Paragraph(f"<b>Total Forms:</b> {report['total_forms']}", info_style))
             story.append(Spacer(1, 20))
 
             # Forms overview section
@@ -2524,15 +2791,14 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             forms_data = [['Form Title', 'Status', 'Created', 'Responses', 'Completion Rate']]
 
             for form in forms:
-                analytics, created = FormAnalytics.objects.get_or_create(form=form)
-                analytics.update_analytics()
+                form_stats = report['form_stats'][form.id]
 
                 forms_data.append([
                     form.title[:25] + '...' if len(form.title) > 25 else form.title,
                     'Active' if form.is_active else 'Inactive',
                     form.created_at.strftime('%Y-%m-%d'),
-                    str(analytics.total_responses),
-                    f"{analytics.completion_rate:.1f}%"
+                    str(form_stats['total_responses']),
+                    f"{form_stats['completion_rate']:.1f}%"
                 ])
 
             forms_table = Table(forms_data, colWidths=[2.5*inch, 1*inch, 1*inch, 1*inch, 1.5*inch])
@@ -2554,9 +2820,9 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             
             
                     # Chart Data
-            total_forms = forms.count()
-            active_forms = forms.filter(is_active=True).count()
-            total_responses = sum(form.responses.count() for form in forms)
+            total_forms = report['total_forms']
+            active_forms = report['active_forms']
+            total_responses = report['total_responses']
 
             chart_data = [[total_forms, active_forms, total_responses]]
             chart_labels = ['Total Forms', 'Active Forms', 'Total Responses']
@@ -2631,16 +2897,12 @@ class FeedbackResponseViewSet(viewsets.ReadOnlyModelViewSet):
             # Question analytics section (summary)
             story.append(Paragraph("Question Analytics Summary", overview_style))
 
-            total_questions = 0
-            total_responses = 0
-            for form in forms:
-                total_questions += form.questions.count()
-                total_responses += FeedbackResponse.objects.filter(form=form).count()
+            total_questions = report['total_questions']
 
             summary_data = [
                 ['Total Questions', str(total_questions)],
                 ['Total Responses', str(total_responses)],
-                ['Average Responses per Form', f"{total_responses / forms.count():.1f}" if forms.count() > 0 else "0"]
+                ['Average Responses per Form', f"{total_responses / total_forms:.1f}" if total_forms > 0 else "0"]
             ]
 
             summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
@@ -2672,25 +2934,31 @@ class DashboardView(APIView):
     """Dashboard view for admin overview"""
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_forms(self, request):
+        """Forms summarised for the user, or None if a superuser asked for an unknown admin"""
+        user = request.user
+        if not user.is_superuser:
+            return FeedbackForm.objects.filter(created_by=user)
+
+        # Superusers see all admins' forms, or one admin's with ?admin_name=
+        admin_name = request.query_params.get('admin_name')
+        if not admin_name:
+            return FeedbackForm.objects.all()
+        try:
+            admin_user = User.objects.get(username=admin_name)
+        except User.DoesNotExist:
+            return None
+        return FeedbackForm.objects.filter(created_by=admin_user)
+
+    @read_from_replica
+    @http_cache.conditional('dashboard', http_cache.dashboard_state)
     def get(self, request):
         user = request.user
 
-        # If superuser — allow filtering by ?admin_id=
         if user.is_superuser:
-            admin_name = request.query_params.get('admin_name')
-            if admin_name:
-                try:
-                    admin_user = User.objects.get(username=admin_name)
-                except User.DoesNotExist:
-                    return Response({"detail": "Admin not found."}, status=404)
-                queryset_user = admin_user
-            else:
-                queryset_user = None  # Means all admins
-
-            if queryset_user:
-                forms = FeedbackForm.objects.filter(created_by=queryset_user)
-            else:
-                forms = FeedbackForm.objects.all()
+            forms = self.get_forms(request)
+            if forms is None:
+                return Response({"detail": "Admin not found."}, status=404)
 
             total_responses = FeedbackResponse.objects.filter(
                 form__in=forms
@@ -2713,7 +2981,7 @@ class DashboardView(APIView):
 
         # 1 If normal admin — only their forms
         else:
-            forms = FeedbackForm.objects.filter(created_by=user)
+            forms = self.get_forms(request)
             total_responses = FeedbackResponse.objects.filter(
                 form__created_by=user
             ).count()
@@ -2751,6 +3019,9 @@ class DashboardView(APIView):
             'total_responses': total_responses,
             'recent_responses': recent_responses,
             'average_completion_rate': round(avg_completion_rate, 2),
+            # Approximate (HyperLogLog), with their standard error
+            'unique_respondents': respondents.respondents_across(forms),
+            'unique_respondents_today': respondents.respondents_across(forms, day=timezone.localdate()),
             'recent_responses_list': recent_responses_list
         }
 
@@ -2758,6 +3029,14 @@ class DashboardView(APIView):
         return Response(serializer.data)
 
 
+class HttpCacheMetricsView(APIView):
+    """Conditional GET hit ratios of the dashboard's read endpoints"""
+    permission_classes = [IsSuperUser]
+
+    def get(self, request):
+        return Response(http_cache.metrics())
+
+
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for managing notifications"""
     serializer_class = NotificationSerializer
@@ -2770,21 +3049,19 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def mark_as_read(self, request, pk=None):
         """Mark a notification as read"""
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
-        return Response({'status': 'marked as read'})
+        unread_count = notifications.mark_as_read(request.user.id, notification.id)
+        return Response({'status': 'marked as read', 'unread_count': unread_count})
     
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """Mark all notifications as read"""
-        self.get_queryset().update(is_read=True)
-        return Response({'status': 'all marked as read'})
+        notifications.mark_all_as_read(request.user.id)
+        return Response({'status': 'all marked as read', 'unread_count': 0})
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications"""
-        count = self.get_queryset().filter(is_read=False).count()
-        return Response({'unread_count': count})
+        return Response({'unread_count': notifications.get_unread_count(request.user.id)})
 
 
 class CustomAuthToken(ObtainAuthToken):